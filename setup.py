@@ -20,6 +20,7 @@ setup(
     long_description_content_type="text/markdown",
     packages=find_packages('src', include=['qoi_compress*']),
     install_requires=required,
+    extras_require={'numba': ['numba']},
     keywords=['qoi', 'png', 'compression', 'image'],
     python_requires='>=3.8'
 )
@@ -1,2 +1,16 @@
 __version__ = "0.0.3"
-__docs__ = "Python implementation of QOI image encoder and decoder"
\ No newline at end of file
+__docs__ = "Python implementation of QOI image encoder and decoder"
+
+
+def __getattr__(name: str):
+    """
+    Public array API: qoi_compress.encode_array(), qoi_compress.decode_array()
+    Imported on first use, so "import qoi_compress" stays light (setup.py reads version from here)
+    """
+    if name == "encode_array":
+        from qoi_compress.qoi_encoder import encode_array
+        return encode_array
+    if name == "decode_array":
+        from qoi_compress.qoi_decoder import decode_array
+        return decode_array
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,272 @@
+"""
+Asyncio wrapper of encoder and decoder: encoding and decoding run in a bounded pool of workers,
+so they do not block the event loop of a service (HTTP handlers, ...)
+
+Usage:
+    from qoi_compress import aio
+
+    qoi_bytes = await aio.encode(img, timeout=5)
+    img_decoded = await aio.decode(qoi_bytes)
+
+or with own settings:
+    async with aio.QoiService(workers=4, max_in_flight=8, max_waiting=100) as service:
+        qoi_bytes = await service.encode(img)
+"""
+import os
+import time
+import weakref
+import asyncio
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, NamedTuple, Optional, Tuple
+import numpy as np
+from qoi_compress.qoi_encoder import encode_array
+from qoi_compress.qoi_decoder import decode_array
+
+
+class ServiceBusy(RuntimeError):
+    """Too many requests are waiting for a free worker"""
+
+
+
+class ServiceMetrics(NamedTuple):
+    """Snapshot of service counters"""
+    in_flight: int  # requests submitted to the pool and not finished yet
+    waiting: int  # requests waiting for a free slot (backpressure)
+    completed: int
+    failed: int  # raised an exception in the worker
+    cancelled: int
+    timed_out: int
+    rejected: int  # rejected with ServiceBusy
+    busy_time: float  # total execution time of completed requests in workers (without queueing), seconds
+
+
+
+def timed_call(func: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    """
+    Run func(*args) in a worker
+
+    :return: result, execution time (seconds)
+    """
+    start_time = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start_time
+
+
+
+class QoiService:
+    """
+    Bounded pool of workers shared by all requests, created on the first request and reused
+
+    Backpressure: at most "max_in_flight" requests of each event loop are submitted to the pool, other requests wait
+    for a free slot; if "max_waiting" requests are already waiting, new requests are rejected with ServiceBusy.
+    A slot is released only when the worker really finishes the job, so cancelled or timed out requests
+    which are already running still occupy their slots and the pool backlog never exceeds "max_in_flight"
+    """
+    def __init__(self,
+                 workers: Optional[int] = None,
+                 max_in_flight: Optional[int] = None,
+                 max_waiting: Optional[int] = None,
+                 timeout: Optional[float] = None,
+                 processes: bool = False,
+                 engine: str = "auto"):
+        """
+        :param workers: number of threads or processes (os.cpu_count() by default)
+        :param max_in_flight: max number of requests of one event loop submitted to the pool (2 * workers by default)
+        :param max_waiting: max number of requests waiting for a slot, None - unlimited
+        :param timeout: default timeout of a request (including waiting for a slot), seconds, None - no timeout
+        :param processes: use pool of processes instead of threads
+                          (compiled numba engine releases the GIL, so threads are enough for it)
+        :param engine: encoder/decoder engine, see qoi_encoder.encode_array()
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or 2 * self.workers
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.processes = processes
+        self.engine = engine
+
+        self._executor: Optional[Executor] = None
+        # semaphores are bound to event loop, service may be shared by loops of several threads
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary())
+        self._in_flight = 0
+        self._waiting = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._timed_out = 0
+        self._rejected = 0
+        self._busy_time = 0.0
+
+
+    @property
+    def metrics(self) -> ServiceMetrics:
+        return ServiceMetrics(self._in_flight, self._waiting, self._completed, self._failed,
+                              self._cancelled, self._timed_out, self._rejected, self._busy_time)
+
+
+    def get_executor(self) -> Executor:
+        if self._executor is None:
+            pool_class = ProcessPoolExecutor if self.processes else ThreadPoolExecutor
+            self._executor = pool_class(max_workers=self.workers)
+        return self._executor
+
+
+    def get_slots(self) -> asyncio.Semaphore:
+        """
+        Semaphore of in-flight requests of the running event loop
+        """
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_in_flight)
+        return slots
+
+
+    async def run(self, func: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Run func(*args) in the pool
+
+        :param timeout: timeout of this request, seconds (service default if None)
+        :raises ServiceBusy: if too many requests are waiting
+        :raises asyncio.TimeoutError: if request is not finished in time
+        """
+        timeout = self.timeout if timeout is None else timeout
+        slots = self.get_slots()
+        if self.max_waiting is not None and slots.locked() and self._waiting >= self.max_waiting:
+            self._rejected += 1
+            raise ServiceBusy(f"{self._waiting} requests are already waiting for a free worker")
+
+        try:
+            future = await asyncio.wait_for(self._run(slots, func, *args), timeout)
+        except asyncio.TimeoutError:
+            self._timed_out += 1
+            raise
+        except asyncio.CancelledError:
+            self._cancelled += 1
+            raise
+        except Exception:
+            self._failed += 1
+            raise
+
+        # exception of the job is raised outside of wait_for(), so its own TimeoutError is not taken for a timeout
+        try:
+            result, busy_time = future.result()
+        except Exception:
+            self._failed += 1
+            raise
+        self._busy_time += busy_time
+        self._completed += 1
+        return result
+
+
+    async def _run(self,
+                   slots: asyncio.Semaphore,
+                   func: Callable[..., Any],
+                   *args: Any) -> "Future[Tuple[Any, float]]":
+        """
+        Wait for a free slot and run the job in the pool
+
+        :return: finished future of timed_call() (exception of the job is not raised here)
+        """
+        self._waiting += 1
+        try:
+            await slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self._in_flight -= 1
+                slots.release()
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = self.get_executor().submit(timed_call, func, *args)
+        except BaseException:
+            release()
+            raise
+        future.add_done_callback(lambda _: self._release_threadsafe(loop, release))
+
+        job = asyncio.wrap_future(future)
+        try:
+            await asyncio.wait([job])
+        except asyncio.CancelledError:
+            job.cancel()  # cancels the job if it is not started yet
+            raise
+        # the done callback may be scheduled after this task is woken up, slot is free before the result is returned
+        release()
+        return future
+
+
+    def _release_threadsafe(self, loop: asyncio.AbstractEventLoop, release: Callable[[], None]) -> None:
+        try:
+            loop.call_soon_threadsafe(release)
+        except RuntimeError:  # event loop is already closed
+            self._in_flight -= 1
+
+
+    async def encode(self, image: np.ndarray, strict: bool = False, timeout: Optional[float] = None) -> bytes:
+        """
+        Encode image into qoi bytes, see qoi_encoder.encode_array()
+        """
+        return await self.run(encode_array, image, self.engine, strict, timeout=timeout)
+
+
+    async def decode(self, qoi_bytes: bytes, strict: bool = False, timeout: Optional[float] = None) -> np.ndarray:
+        """
+        Decode qoi bytes into image, see qoi_decoder.decode_array()
+        """
+        return await self.run(decode_array, qoi_bytes, self.engine, strict, timeout=timeout)
+
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Shut down the pool, next request creates a new one
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+    async def __aenter__(self) -> "QoiService":
+        return self
+
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+
+_default_service: Optional[QoiService] = None
+
+
+def get_default_service() -> QoiService:
+    """
+    Service used by module-level encode() and decode(), thread pool with default settings
+    """
+    global _default_service
+    if _default_service is None:
+        _default_service = QoiService()
+    return _default_service
+
+
+
+async def encode(image: np.ndarray, strict: bool = False, timeout: Optional[float] = None) -> bytes:
+    """
+    Encode image into qoi bytes in the pool of default service
+    """
+    return await get_default_service().encode(image, strict, timeout)
+
+
+
+async def decode(qoi_bytes: bytes, strict: bool = False, timeout: Optional[float] = None) -> np.ndarray:
+    """
+    Decode qoi bytes into image in the pool of default service
+    """
+    return await get_default_service().decode(qoi_bytes, strict, timeout)
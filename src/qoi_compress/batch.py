@@ -0,0 +1,142 @@
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, List, NamedTuple, Optional
+import numpy as np
+from qoi_compress.qoi_encoder import encode_array
+from qoi_compress.qoi_decoder import decode_array
+from qoi_compress.read_png import read_png_array
+from qoi_compress.setup_logger import logger
+
+
+class ConversionResult(NamedTuple):
+    """Result of png -> qoi conversion of a single file"""
+    png_filename: str
+    qoi_filename: str
+    encoding_time: float = 0.0
+    decoding_time: float = 0.0
+    compression_ratio: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+
+def convert_file(png_filename: str,
+                 qoi_filename: str,
+                 verify: bool = True,
+                 engine: str = "auto") -> ConversionResult:
+    """
+    Encode image "png_filename" and save it as "qoi_filename"
+    If "verify", decode qoi image and compare it with original png image
+
+    Never raises, errors are reported in ConversionResult.error
+
+    :return: timings and compression ratio (size of raw pixels / size of qoi file)
+    """
+    try:
+        img = read_png_array(png_filename)
+
+        start_time = time.perf_counter()
+        qoi_bytes = encode_array(img, engine=engine)
+        with open(qoi_filename, 'wb') as file:
+            file.write(qoi_bytes)
+        encoding_time = time.perf_counter() - start_time
+
+        decoding_time = 0.0
+        if verify:
+            start_time = time.perf_counter()
+            img_decoded = decode_array(qoi_bytes, engine=engine)
+            decoding_time = time.perf_counter() - start_time
+            if not np.array_equal(img_decoded, img):
+                raise ValueError("decoded qoi image is not equal to original png image")
+
+        compression_ratio = img.size / len(qoi_bytes)
+
+    except Exception as e:
+        return ConversionResult(png_filename, qoi_filename, error=f"{type(e).__name__}: {e}")
+
+    return ConversionResult(png_filename, qoi_filename, encoding_time, decoding_time, compression_ratio)
+
+
+
+def list_png_files(dir_with_png: str) -> List[str]:
+    """
+    Return sorted names of png files in "dir_with_png"
+    """
+    return sorted(filename for filename in os.listdir(dir_with_png) if Path(filename).suffix == ".png")
+
+
+
+def convert_dir(dir_with_png: str,
+                dir_with_qoi: str,
+                workers: Optional[int] = None,
+                verify: bool = True,
+                engine: str = "auto") -> Iterator[ConversionResult]:
+    """
+    Convert each png file in "dir_with_png" into qoi file in "dir_with_qoi"
+    Files are processed in a pool of "workers" processes (os.cpu_count() by default),
+    results are yielded as soon as they are ready
+
+    :param workers: number of processes, 1 - process files in the current process
+    """
+    os.makedirs(dir_with_qoi, exist_ok=True)
+    tasks = [(os.path.join(dir_with_png, filename),
+              os.path.join(dir_with_qoi, f"{Path(filename).stem}.qoi"))
+             for filename in list_png_files(dir_with_png)]
+
+    if workers == 1:
+        for png_filename, qoi_filename in tasks:
+            yield convert_file(png_filename, qoi_filename, verify, engine)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(convert_file, png_filename, qoi_filename, verify, engine)
+                   for png_filename, qoi_filename in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line interface: python -m qoi_compress.batch <dir_with_png> <dir_with_qoi> [-j N]
+    """
+    parser = argparse.ArgumentParser(prog="python -m qoi_compress.batch",
+                                     description="Convert all png images from directory into qoi images")
+    parser.add_argument("dir_with_png")
+    parser.add_argument("dir_with_qoi")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="number of processes (default: number of CPUs)")
+    parser.add_argument("--no-verify", action="store_true",
+                        help="do not decode qoi images to compare them with png images")
+    parser.add_argument("--engine", default="auto", help="encoder/decoder engine")
+    args = parser.parse_args(argv)
+
+    n_failed = 0
+    results = convert_dir(args.dir_with_png, args.dir_with_qoi,
+                          workers=args.workers, verify=not args.no_verify, engine=args.engine)
+    for result in results:
+        name = Path(result.png_filename).name
+        if result.ok:
+            print(f"{name}: encoding {1000 * result.encoding_time:.1f} ms, "
+                  f"decoding {1000 * result.decoding_time:.1f} ms, "
+                  f"compression ratio {result.compression_ratio:.2f}")
+        else:
+            n_failed += 1
+            print(f"{name}: FAILED, {result.error}", file=sys.stderr)
+
+    if n_failed:
+        logger.error("%d files failed", n_failed)
+        return 1
+    return 0
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
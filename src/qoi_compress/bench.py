@@ -0,0 +1,295 @@
+"""
+Benchmark of qoi encoder and decoder on a fixed corpus of images
+
+Corpus: png images from png_images/ and synthetic images (gradient, noise, flat fill)
+of each resolution from the README table. Every image is encoded and decoded "warmup" times
+without measurement, then "repeats" times with time.perf_counter(), the median time is reported.
+
+Command line interface:
+    python -m qoi_compress.bench --output results.json
+    python -m qoi_compress.bench --baseline results.json --threshold 10  # exit code 1 on regression
+"""
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from qoi_compress.qoi_encoder import encode_array
+from qoi_compress.qoi_decoder import decode_array
+from qoi_compress.read_png import read_png_array
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+# resolutions of README benchmark table, (height, width)
+RESOLUTIONS: Dict[str, Tuple[int, int]] = {
+    "460x460": (460, 460),
+    "1920x1080": (1080, 1920),
+    "3840x2400": (2400, 3840),
+}
+SYNTHETIC_KINDS = ("gradient", "noise", "flat")
+
+
+class BenchResult(NamedTuple):
+    """Benchmark result of a single image"""
+    name: str
+    width: int
+    height: int
+    encoder_engine: str
+    decoder_engine: str
+    encoding_time: float  # median, seconds
+    decoding_time: float
+    encoding_mps: float  # megapixels per second
+    decoding_mps: float
+    compression_ratio: float  # size of raw pixels / size of qoi bytes
+    peak_memory_mb: float  # peak memory allocated during encoding + decoding
+
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        return self.name, self.encoder_engine, self.decoder_engine
+
+
+
+def synthetic_image(kind: str, height: int, width: int, seed: int = 0) -> np.ndarray:
+    """
+    Generate synthetic RGB image, the same for the same arguments
+
+    :param kind: "gradient" - smooth diagonal gradient (small differences),
+                 "noise" - uniform random noise (incompressible),
+                 "flat" - single color fill (runs only)
+    """
+    if kind == "gradient":
+        y = np.linspace(0, 255, height)[:, np.newaxis]
+        x = np.linspace(0, 255, width)[np.newaxis, :]
+        img = np.stack([np.broadcast_to(x, (height, width)),
+                        np.broadcast_to(y, (height, width)),
+                        (x + y) / 2], axis=-1)
+        return img.astype(np.uint8)
+    elif kind == "noise":
+        return np.random.default_rng(seed).integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    elif kind == "flat":
+        return np.full((height, width, 3), (40, 120, 200), dtype=np.uint8)
+    else:
+        raise ValueError(f"Unknown synthetic image kind: {kind}")
+
+
+
+def build_corpus(dir_with_png: Optional[str] = str(BASE_DIR / "png_images"),
+                 resolutions: Optional[List[str]] = None,
+                 kinds: Tuple[str, ...] = SYNTHETIC_KINDS) -> List[Tuple[str, np.ndarray]]:
+    """
+    Build benchmark corpus
+
+    :param dir_with_png: directory with png images, None - synthetic images only
+    :param resolutions: keys of RESOLUTIONS (all by default)
+    :param kinds: kinds of synthetic images, see synthetic_image()
+    :return: list of (name, image)
+    """
+    corpus = []
+    if dir_with_png is not None:
+        for png_filename in sorted(Path(dir_with_png).glob("*.png")):
+            corpus.append((png_filename.name, read_png_array(str(png_filename))))
+
+    for resolution in (resolutions if resolutions is not None else RESOLUTIONS):
+        height, width = RESOLUTIONS[resolution]
+        for kind in kinds:
+            corpus.append((f"{kind}_{resolution}", synthetic_image(kind, height, width)))
+
+    return corpus
+
+
+
+def measure(func: Callable[[], object], warmup: int = 1, repeats: int = 5) -> float:
+    """
+    Run "func" "warmup" times, then "repeats" times with measurement
+
+    :return: median time of a single run, seconds
+    """
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start_time)
+    return statistics.median(times)
+
+
+
+def peak_memory(func: Callable[[], object]) -> int:
+    """
+    Peak memory (bytes) allocated by python and numpy during a single run of "func"
+    """
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+
+def bench_image(name: str,
+                img: np.ndarray,
+                encoder_engine: str = "auto",
+                decoder_engine: str = "auto",
+                warmup: int = 1,
+                repeats: int = 5) -> BenchResult:
+    """
+    Benchmark encoding and decoding of a single image
+
+    :raises ValueError: if decoded image is not equal to original image
+    """
+    qoi_bytes = encode_array(img, engine=encoder_engine)
+    if not np.array_equal(decode_array(qoi_bytes, engine=decoder_engine), img):
+        raise ValueError(f"Decoded image {name} is not equal to original image")
+
+    encoding_time = measure(lambda: encode_array(img, engine=encoder_engine), warmup, repeats)
+    decoding_time = measure(lambda: decode_array(qoi_bytes, engine=decoder_engine), warmup, repeats)
+    peak = peak_memory(lambda: decode_array(encode_array(img, engine=encoder_engine), engine=decoder_engine))
+
+    height, width = img.shape[:2]
+    megapixels = height * width / 1e6
+    return BenchResult(name, width, height, encoder_engine, decoder_engine,
+                       encoding_time, decoding_time,
+                       megapixels / encoding_time if encoding_time else float("inf"),
+                       megapixels / decoding_time if decoding_time else float("inf"),
+                       img.size / len(qoi_bytes), peak / 2**20)
+
+
+
+def run_benchmark(corpus: List[Tuple[str, np.ndarray]],
+                  encoder_engine: str = "auto",
+                  decoder_engine: str = "auto",
+                  warmup: int = 1,
+                  repeats: int = 5,
+                  callback: Optional[Callable[[BenchResult], None]] = None) -> List[BenchResult]:
+    """
+    Benchmark every image of corpus
+
+    :param callback: called with result of each image as soon as it is ready
+    """
+    results = []
+    for name, img in corpus:
+        result = bench_image(name, img, encoder_engine, decoder_engine, warmup, repeats)
+        if callback is not None:
+            callback(result)
+        results.append(result)
+    return results
+
+
+
+def results_to_json(results: List[BenchResult]) -> Dict[str, object]:
+    """
+    Convert results into JSON-serializable dict with info about environment
+    """
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "results": [result._asdict() for result in results],
+    }
+
+
+
+def load_results(json_filename: str) -> List[BenchResult]:
+    """
+    Load results saved by save_results()
+    """
+    with open(json_filename) as file:
+        data = json.load(file)
+    return [BenchResult(**result) for result in data["results"]]
+
+
+
+def save_results(results: List[BenchResult], json_filename: str) -> None:
+    with open(json_filename, 'w') as file:
+        json.dump(results_to_json(results), file, indent=2)
+
+
+
+def compare(results: List[BenchResult], baseline: List[BenchResult], threshold: float = 0.1) -> List[str]:
+    """
+    Compare results with baseline, images missing in baseline are skipped
+
+    :param threshold: allowed relative slowdown (0.1 - 10%)
+    :return: descriptions of regressions, empty list if there are no regressions
+    """
+    baseline_by_key = {result.key: result for result in baseline}
+    regressions = []
+    for result in results:
+        base = baseline_by_key.get(result.key)
+        if base is None:
+            continue
+        for field in ("encoding_time", "decoding_time"):
+            new_time, base_time = getattr(result, field), getattr(base, field)
+            if new_time > base_time * (1 + threshold):
+                regressions.append(f"{result.name}: {field} {1000 * new_time:.2f} ms, "
+                                   f"baseline {1000 * base_time:.2f} ms (+{100 * (new_time / base_time - 1):.0f}%)")
+    return regressions
+
+
+
+def format_result(result: BenchResult) -> str:
+    size = f"{result.width}x{result.height}"
+    return (f"{result.name:<24} {size:<11} "
+            f"encoding {1000 * result.encoding_time:9.2f} ms ({result.encoding_mps:7.2f} MP/s)  "
+            f"decoding {1000 * result.decoding_time:9.2f} ms ({result.decoding_mps:7.2f} MP/s)  "
+            f"ratio {result.compression_ratio:6.2f}  peak {result.peak_memory_mb:8.1f} MB")
+
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line interface: python -m qoi_compress.bench [--output FILE] [--baseline FILE --threshold PERCENT]
+    """
+    parser = argparse.ArgumentParser(prog="python -m qoi_compress.bench",
+                                     description="Benchmark qoi encoder and decoder")
+    parser.add_argument("--engine", default="auto", help="encoder engine")
+    parser.add_argument("--decoder-engine", default="auto", help="decoder engine")
+    parser.add_argument("--png-dir", default=str(BASE_DIR / "png_images"),
+                        help="directory with png images of corpus")
+    parser.add_argument("--no-png", action="store_true", help="synthetic images only")
+    parser.add_argument("--sizes", default=",".join(RESOLUTIONS),
+                        help=f"resolutions of synthetic images, subset of {','.join(RESOLUTIONS)}")
+    parser.add_argument("--kinds", default=",".join(SYNTHETIC_KINDS), help="kinds of synthetic images")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="save results as JSON")
+    parser.add_argument("--baseline", help="JSON results to compare with")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed slowdown, percent")
+    args = parser.parse_args(argv)
+
+    sizes = [size for size in args.sizes.split(",") if size]
+    for size in sizes:
+        if size not in RESOLUTIONS:
+            parser.error(f"unknown size {size}, choose from {','.join(RESOLUTIONS)}")
+    kinds = tuple(kind for kind in args.kinds.split(",") if kind)
+
+    corpus = build_corpus(None if args.no_png else args.png_dir, sizes, kinds)
+    results = run_benchmark(corpus, args.engine, args.decoder_engine, args.warmup, args.repeats,
+                            callback=lambda result: print(format_result(result)))
+
+    if args.output:
+        save_results(results, args.output)
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.threshold / 100)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
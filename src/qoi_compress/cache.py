@@ -0,0 +1,156 @@
+"""
+LRU cache of decoded images
+
+Files are keyed by path + modification time + size, so a modified file is decoded again,
+buffers are keyed by hash of their content. Cached images are read-only, callers get views of them
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, NamedTuple, Optional
+import numpy as np
+from qoi_compress.qoi_decoder import decode_array, decode_file
+
+
+class CacheInfo(NamedTuple):
+    """Counters of cache"""
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    nbytes: int  # size of cached images
+    max_bytes: int
+
+
+
+class DecodedImageCache:
+    """
+    Decoded images under a byte-size budget, least recently used images are evicted first
+
+    Usage:
+        cache = DecodedImageCache(max_bytes=512 * 2**20)
+        img = cache.get_file(qoi_filename)  # read-only uint8 array
+    """
+    def __init__(self, max_bytes: int = 256 * 2**20, engine: str = "auto", strict: bool = False):
+        """
+        :param max_bytes: max total size of cached images, larger images are decoded but not cached
+        :param engine: decoder engine, see qoi_decoder.get_decode_func()
+        :param strict: files follow QOI specification, see qoi_decoder.decode_into()
+        """
+        self.max_bytes = max_bytes
+        self.engine = engine
+        self.strict = strict
+        self.entries: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self.file_keys: Dict[str, Hashable] = {}  # path -> key of its cached version
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.evictions, len(self.entries), self.nbytes, self.max_bytes)
+
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+    def remove_entry(self, key: Hashable, img: np.ndarray) -> None:
+        """
+        Account for removed entry and forget path of removed file version (lock must be held)
+        """
+        self.nbytes -= img.nbytes
+        if isinstance(key, tuple) and key[0] == "file" and self.file_keys.get(key[1]) == key:
+            del self.file_keys[key[1]]
+
+
+    def lookup(self, key: Hashable) -> Optional[np.ndarray]:
+        """
+        :return: read-only view of cached image, None if there is no such image
+        """
+        with self.lock:
+            img = self.entries.get(key)
+            if img is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return img.view()
+
+
+    def put(self, key: Hashable, img: np.ndarray) -> np.ndarray:
+        """
+        Cache image (it becomes read-only), evict least recently used images if budget is exceeded
+
+        :return: read-only view of image
+        """
+        img.flags.writeable = False
+        if img.nbytes > self.max_bytes:
+            return img.view()
+
+        with self.lock:
+            old_img = self.entries.pop(key, None)
+            if old_img is not None:
+                self.nbytes -= old_img.nbytes
+            self.entries[key] = img
+            self.nbytes += img.nbytes
+            if isinstance(key, tuple) and key[0] == "file":
+                self.file_keys[key[1]] = key
+            while self.nbytes > self.max_bytes:
+                evicted_key, evicted = self.entries.popitem(last=False)
+                self.remove_entry(evicted_key, evicted)
+                self.evictions += 1
+        return img.view()
+
+
+    def discard(self, key: Hashable) -> None:
+        with self.lock:
+            img = self.entries.pop(key, None)
+            if img is not None:
+                self.remove_entry(key, img)
+
+
+    def get_file(self, qoi_filename: str) -> np.ndarray:
+        """
+        Decoded image of qoi file, the file is decoded only if it is not cached or was modified
+
+        :return: read-only uint8 array with shape=(height, width, channels)
+        """
+        path = os.path.realpath(qoi_filename)
+        stat = os.stat(path)
+        key = ("file", path, stat.st_mtime_ns, stat.st_size, self.strict)
+        img = self.lookup(key)
+        if img is not None:
+            return img
+
+        with self.lock:
+            old_key = self.file_keys.get(path)
+        if old_key is not None and old_key != key:
+            self.discard(old_key)  # file was modified
+        return self.put(key, decode_file(path, engine=self.engine, strict=self.strict))
+
+
+    def get_bytes(self, qoi_bytes: bytes) -> np.ndarray:
+        """
+        Decoded image of qoi bytes (any buffer), keyed by hash of content
+
+        :return: read-only uint8 array with shape=(height, width, channels)
+        """
+        key = ("buffer", hashlib.blake2b(qoi_bytes, digest_size=16).digest(), self.strict)
+        img = self.lookup(key)
+        if img is not None:
+            return img
+        return self.put(key, decode_array(qoi_bytes, self.engine, self.strict))
+
+
+    def clear(self) -> None:
+        """
+        Drop all images, counters are kept
+        """
+        with self.lock:
+            self.entries.clear()
+            self.file_keys.clear()
+            self.nbytes = 0
@@ -0,0 +1,183 @@
+"""
+Entropy-coded container: image is split into horizontal blocks, each block is encoded
+as an independent qoi stream and compressed by a stdlib compressor (zlib, lzma or bz2).
+Qoi chunks are byte-aligned and repetitive, so a general-purpose compressor shrinks them further,
+while blocks are still decompressed and decoded in parallel
+
+Container layout (big-endian):
+    magic "qoiZ", width (4 bytes), height (4 bytes), channels (1 byte), colorspace (1 byte),
+    codec (1 byte), rows per block (4 bytes), number of blocks N (4 bytes),
+    N + 1 offsets of compressed blocks from the beginning of container (8 bytes each),
+    N sizes of qoi streams before compression (8 bytes each),
+    N compressed qoi streams
+"""
+import bz2
+import lzma
+import zlib
+import struct
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+import numpy as np
+from qoi_compress.qoi_encoder import encode_array
+from qoi_compress.qoi_decoder import decode_into
+from qoi_compress.stripes import check_stream_shape, parallel_map
+
+COMPRESSED_MAGIC = b"qoiZ"
+COMPRESSED_HEADER = struct.Struct(">4sIIBBBII")
+COMPRESSED_OFFSET = struct.Struct(">Q")
+
+CODECS = ("zlib", "lzma", "bz2")
+
+
+class CompressedHeader(NamedTuple):
+    """Header of entropy-coded container"""
+    width: int
+    height: int
+    channels: int
+    colorspace: int
+    codec: str
+    block_rows: int
+    offsets: Tuple[int, ...]
+    raw_sizes: Tuple[int, ...]  # sizes of qoi streams of blocks
+
+    @property
+    def n_blocks(self) -> int:
+        return len(self.offsets) - 1
+
+    def block_bounds(self, i: int) -> Tuple[int, int]:
+        """First and last+1 image rows of block "i" """
+        return i * self.block_rows, min((i + 1) * self.block_rows, self.height)
+
+
+
+def get_compress_func(codec: str, level: Optional[int] = None) -> Callable[[bytes], bytes]:
+    """
+    :param codec: "zlib", "lzma" or "bz2"
+    :param level: compression level (zlib: 0-9, lzma: 0-9, bz2: 1-9), default level of codec if None
+    """
+    if codec == "zlib":
+        return lambda data: zlib.compress(data, -1 if level is None else level)
+    elif codec == "lzma":
+        return lambda data: lzma.compress(data, preset=level)
+    elif codec == "bz2":
+        return lambda data: bz2.compress(data, 9 if level is None else level)
+    else:
+        raise ValueError(f"Unknown codec {codec}, choose from {CODECS}")
+
+
+
+DECOMPRESS_FUNCS: Dict[str, Callable[[memoryview], bytes]] = {
+    "zlib": zlib.decompress,
+    "lzma": lzma.decompress,
+    "bz2": bz2.decompress,
+}
+
+
+
+def encode_compressed(image: np.ndarray,
+                      codec: str = "zlib",
+                      level: Optional[int] = None,
+                      block_rows: int = 256,
+                      workers: Optional[int] = None,
+                      engine: str = "auto",
+                      strict: bool = False) -> bytes:
+    """
+    Encode image into entropy-coded container, blocks are encoded and compressed in parallel threads
+    (stdlib compressors and compiled numba engine release the GIL)
+
+    :param image: input image, shape=(height, width, 3) or shape=(height, width, 4)
+    :param codec: "zlib", "lzma" or "bz2"
+    :param level: compression level, see get_compress_func()
+    :param block_rows: number of image rows in each block
+    :param workers: number of threads (os.cpu_count() by default)
+    :param engine: encoder engine, see qoi_encoder.encode_array()
+    :param strict: follow QOI specification, see qoi_encoder.encode_array()
+    :return: content of container
+    """
+    if block_rows < 1:
+        raise ValueError(f"Rows per block must be positive, got {block_rows}")
+    compress = get_compress_func(codec, level)
+    height, width, channels = image.shape
+    bounds = [(y0, min(y0 + block_rows, height)) for y0 in range(0, height, block_rows)]
+
+    def encode_block(rows: Tuple[int, int]) -> Tuple[int, bytes]:
+        qoi_bytes = encode_array(image[rows[0]:rows[1]], engine, strict)
+        return len(qoi_bytes), compress(qoi_bytes)
+
+    blocks = parallel_map(encode_block, bounds, workers)
+
+    offset = COMPRESSED_HEADER.size + (2 * len(blocks) + 1) * COMPRESSED_OFFSET.size
+    offsets = [offset]
+    for _, block in blocks:
+        offset += len(block)
+        offsets.append(offset)
+
+    header = COMPRESSED_HEADER.pack(COMPRESSED_MAGIC, width, height, channels, 0,
+                                    CODECS.index(codec), block_rows, len(blocks))
+    index = b"".join(COMPRESSED_OFFSET.pack(value) for value in offsets + [raw_size for raw_size, _ in blocks])
+    return b"".join([header, index] + [block for _, block in blocks])
+
+
+
+def read_compressed_header(data: bytes) -> CompressedHeader:
+    """
+    Read header of entropy-coded container
+    """
+    if len(data) < COMPRESSED_HEADER.size or bytes(data[:4]) != COMPRESSED_MAGIC:
+        raise ValueError("There is no magic bytes of entropy-coded container in the file header")
+
+    _, width, height, channels, colorspace, codec, block_rows, n_blocks = COMPRESSED_HEADER.unpack_from(data)
+    if codec >= len(CODECS):
+        raise ValueError(f"Unknown codec in container header: {codec}")
+    if block_rows < 1 or n_blocks != -(-height // block_rows):
+        raise ValueError(f"Invalid rows per block {block_rows} or number of blocks {n_blocks} "
+                         f"for image height {height}")
+    values = tuple(COMPRESSED_OFFSET.unpack_from(data, COMPRESSED_HEADER.size + i * COMPRESSED_OFFSET.size)[0]
+                   for i in range(2 * n_blocks + 1))
+
+    return CompressedHeader(width, height, channels, colorspace, CODECS[codec], block_rows,
+                            values[:n_blocks + 1], values[n_blocks + 1:])
+
+
+
+def get_block(data: bytes, header: CompressedHeader, i: int) -> bytes:
+    """
+    Decompress block "i", it is a valid qoi file itself
+    """
+    qoi_bytes = DECOMPRESS_FUNCS[header.codec](memoryview(data)[header.offsets[i]:header.offsets[i + 1]])
+    if len(qoi_bytes) != header.raw_sizes[i]:
+        raise ValueError(f"Block {i} is decompressed into {len(qoi_bytes)} bytes, expected {header.raw_sizes[i]}")
+    return qoi_bytes
+
+
+
+def decode_compressed(data: bytes,
+                      workers: Optional[int] = None,
+                      engine: str = "auto",
+                      strict: bool = False) -> np.ndarray:
+    """
+    Decode entropy-coded container, blocks are decompressed and decoded in parallel threads
+
+    :param workers: number of threads (os.cpu_count() by default)
+    :param engine: decoder engine, see qoi_decoder.get_decode_func()
+    :param strict: blocks follow QOI specification, see qoi_decoder.decode_into()
+    :return: decoded image, uint8 array with shape=(height, width, channels)
+    """
+    header = read_compressed_header(data)
+    img_decoded = np.empty((header.height, header.width, header.channels), dtype=np.uint8)
+
+    def decode_block(i: int) -> None:
+        y0, y1 = header.block_bounds(i)
+        qoi_bytes = get_block(data, header, i)
+        check_stream_shape(qoi_bytes, (y1 - y0, header.width, header.channels), f"Block {i}")
+        decode_into(qoi_bytes, img_decoded[y0:y1], engine, strict)
+
+    parallel_map(decode_block, range(header.n_blocks), workers)
+    return img_decoded
+
+
+
+def compressed_to_qoi(data: bytes, engine: str = "auto", strict: bool = False) -> bytes:
+    """
+    Convert entropy-coded container into plain qoi file
+    """
+    return encode_array(decode_compressed(data, engine=engine, strict=strict), engine, strict)
@@ -1,11 +1,13 @@
 import os
+import logging
 from typing import Optional
 from pathlib import Path
 import numpy as np
 from qoi_compress.qoi_encoder import run_encoder
 from qoi_compress.qoi_decoder import run_decoder
 from qoi_compress.read_png import read_png
-from qoi_compress.setup_logger import logger
+from qoi_compress.batch import convert_dir
+from qoi_compress.setup_logger import logger, enable_logging
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
@@ -31,29 +33,41 @@ def run_single_experiment(png_filename: str, qoi_filename: str) -> None:
         logger.debug("OK, decoded qoi image is equal to original png image")
     else:
         logger.error(f"Decoding failed, qoi image {qoi_filename} is not equal to original png image {png_filename}")
-        logger.debug(f"Decoding failed at indexes {np.where(img_decoded != orig_img)[0]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Decoding failed at indexes {np.where(img_decoded != orig_img)[0]}")
         raise Exception("Error in encoding/decoding algorithm, qoi image is not equal to original png image")
     
 
 
-def run_multiple_experiments(dir_with_png: str, dir_with_qoi: str) -> None:
+def run_multiple_experiments(dir_with_png: str, dir_with_qoi: str, workers: Optional[int] = 1) -> None:
     """ 
-    Launch run_single_experiment() for each png file in "dir_with_png"
+    Run encoding and decoding check (like run_single_experiment()) for each png file in "dir_with_png"
+    A failed file does not stop processing of other files
+
+    :param workers: number of processes, None - number of CPUs
+    :raises Exception: if any of decoded qoi images is not equal to original png image
     """
-    for filename in os.listdir(dir_with_png):
-        if Path(filename).suffix == ".png":
-            name = Path(filename).stem
-            png_file = os.path.join(dir_with_png, filename)
-            qoi_file = os.path.join(dir_with_qoi, f"{name}.qoi")
-                
-            run_single_experiment(png_file, qoi_file)
-            print('------------------------------------- \n')
+    failed = []
+    for result in convert_dir(dir_with_png, dir_with_qoi, workers=workers):
+        name = Path(result.png_filename).name
+        if result.ok:
+            logger.info("Image %s: encoding time %.3f ms, decoding time %.3f ms, compression ratio %.2f",
+                        name, 1000 * result.encoding_time, 1000 * result.decoding_time, result.compression_ratio)
+        else:
+            logger.error("Image %s failed: %s", name, result.error)
+            failed.append(name)
+        print('------------------------------------- \n')
+        
+    if failed:
+        raise Exception(f"Error in encoding/decoding algorithm for images: {', '.join(failed)}")
 
 
 
 
 
 if __name__ == '__main__':    
+    enable_logging("DEBUG")
+    
     # png_filename = str(BASE_DIR / "png_images/doge.png")
     # qoi_filename = str(BASE_DIR / 'qoi_images/tmp.qoi')
     # run_single_experiment(png_filename, qoi_filename)
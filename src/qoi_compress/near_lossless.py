@@ -0,0 +1,212 @@
+"""
+Near-lossless encoder: every channel of decoded pixel differs from original by at most "max_error"
+(alpha is kept exact). Pixel is snapped to the previous pixel (QOI_RUN) or to the hash array candidate
+(QOI_INDEX) when it is close enough, channel differences are clamped into QOI_DIFF_SMALL / QOI_DIFF_MED
+ranges, so noisy images need much less QOI_RGB chunks
+
+Output is a regular qoi stream, it is decoded by any decoder of this project
+(with strict=True if it was encoded with strict=True)
+"""
+import math
+import time
+from typing import List, Tuple, Union
+import numpy as np
+from qoi_compress.numba_engine import NUMBA_AVAILABLE
+from qoi_compress.qoi_encoder import EncoderState, max_encoded_size, qoi_end, qoi_header
+from qoi_compress.read_png import read_png_array
+from qoi_compress.setup_logger import logger
+
+
+def near_lossless_kernel(image: Union[np.ndarray, memoryview],
+                         out: Union[np.ndarray, memoryview],
+                         state: Union[np.ndarray, List[int]],
+                         height: int,
+                         width: int,
+                         channels: int,
+                         strict: bool,
+                         max_error: int) -> Tuple[int, int]:
+    """
+    Near-lossless QOI encoder algorithm
+    Previous pixel and hash array are the ones the decoder will have, i.e. of decoded (not original) pixels
+
+    :param image: uint8 array (or its memoryview), shape=(height, width, channels)
+    :param out: preallocated uint8 buffer, see qoi_encoder.max_encoded_size()
+    :param state: EncoderState.values (or list of its values), updated in place
+    :param height: image height
+    :param width: image width
+    :param channels: 3 or 4 (RGBA), alpha of 3-channel image is 0 (255 if "strict")
+    :param strict: follow QOI specification, see qoi_encoder.EncoderState
+    :param max_error: max absolute difference of decoded and original channel values
+    :return: number of written bytes, sum of squared errors of decoded pixels
+    """
+    default_alpha = 255 if strict else 0
+    prev_r, prev_g, prev_b, prev_a = state[0], state[1], state[2], state[3]
+    run_length = state[4]
+    pos = 0
+    sse = 0
+
+    for y in range(height):
+        for x in range(width):
+            r = int(image[y, x, 0])
+            g = int(image[y, x, 1])
+            b = int(image[y, x, 2])
+            a = int(image[y, x, 3]) if channels == 4 else default_alpha
+
+            if (a == prev_a and abs(r - prev_r) <= max_error
+                    and abs(g - prev_g) <= max_error and abs(b - prev_b) <= max_error):
+                sse += (r - prev_r) ** 2 + (g - prev_g) ** 2 + (b - prev_b) ** 2
+                run_length += 1
+                if run_length == 62:
+                    out[pos] = 0b11000000 | (run_length - 1)
+                    pos += 1
+                    run_length = 0
+                continue
+            if run_length > 0:
+                out[pos] = 0b11000000 | (run_length - 1)
+                pos += 1
+                run_length = 0
+                # decoder puts run pixel into hash array
+                state[5 + (prev_r * 3 + prev_g * 5 + prev_b * 7 + prev_a * 11) % 64] = (
+                    (prev_r << 24) | (prev_g << 16) | (prev_b << 8) | prev_a)
+
+            hash_index = (r * 3 + g * 5 + b * 7 + a * 11) % 64
+            px = state[5 + hash_index]
+            new_r, new_g, new_b, new_a = (px >> 24) & 0xFF, (px >> 16) & 0xFF, (px >> 8) & 0xFF, px & 0xFF
+            if (new_a == a and abs(new_r - r) <= max_error
+                    and abs(new_g - g) <= max_error and abs(new_b - b) <= max_error):
+                out[pos] = hash_index
+                pos += 1
+
+            elif a != prev_a:
+                new_r, new_g, new_b, new_a = r, g, b, a
+                out[pos] = 0b11111111
+                out[pos + 1] = r
+                out[pos + 2] = g
+                out[pos + 3] = b
+                out[pos + 4] = a
+                pos += 5
+
+            else:
+                new_a = a
+                dr, dg, db = r - prev_r, g - prev_g, b - prev_b
+                if strict:  # wrap around
+                    dr = ((dr + 128) & 0xFF) - 128
+                    dg = ((dg + 128) & 0xFF) - 128
+                    db = ((db + 128) & 0xFF) - 128
+                # allowed differences: decoded value stays within max_error of original and within 0...255
+                lo_r, hi_r = dr + max(r - max_error, 0) - r, dr + min(r + max_error, 255) - r
+                lo_g, hi_g = dg + max(g - max_error, 0) - g, dg + min(g + max_error, 255) - g
+                lo_b, hi_b = db + max(b - max_error, 0) - b, db + min(b + max_error, 255) - b
+
+                if lo_r <= 1 and hi_r >= -2 and lo_g <= 1 and hi_g >= -2 and lo_b <= 1 and hi_b >= -2:
+                    dr = min(max(dr, lo_r, -2), hi_r, 1)
+                    dg = min(max(dg, lo_g, -2), hi_g, 1)
+                    db = min(max(db, lo_b, -2), hi_b, 1)
+                    new_r, new_g, new_b = (prev_r + dr) & 0xFF, (prev_g + dg) & 0xFF, (prev_b + db) & 0xFF
+                    out[pos] = 0b01000000 | ((dr + 2) << 4) | ((dg + 2) << 2) | (db + 2)
+                    pos += 1
+                else:
+                    med = False
+                    if lo_g <= 31 and hi_g >= -32:
+                        dg = min(max(dg, lo_g, -32), hi_g, 31)
+                        med = (max(lo_r, dg - 8) <= min(hi_r, dg + 7)
+                               and max(lo_b, dg - 8) <= min(hi_b, dg + 7))
+                    if med:
+                        dr = min(max(dr, lo_r, dg - 8), hi_r, dg + 7)
+                        db = min(max(db, lo_b, dg - 8), hi_b, dg + 7)
+                        new_r, new_g, new_b = (prev_r + dr) & 0xFF, (prev_g + dg) & 0xFF, (prev_b + db) & 0xFF
+                        out[pos] = 0b10000000 | (dg + 32)
+                        out[pos + 1] = ((dr - dg + 8) << 4) | (db - dg + 8)
+                        pos += 2
+                    else:
+                        new_r, new_g, new_b = r, g, b
+                        out[pos] = 0b11111110
+                        out[pos + 1] = r
+                        out[pos + 2] = g
+                        out[pos + 3] = b
+                        pos += 4
+
+            sse += (new_r - r) ** 2 + (new_g - g) ** 2 + (new_b - b) ** 2
+            prev_r, prev_g, prev_b, prev_a = new_r, new_g, new_b, new_a
+            state[5 + (new_r * 3 + new_g * 5 + new_b * 7 + new_a * 11) % 64] = (
+                (new_r << 24) | (new_g << 16) | (new_b << 8) | new_a)
+
+    if run_length > 0:
+        out[pos] = 0b11000000 | (run_length - 1)
+        pos += 1
+
+    state[0], state[1], state[2], state[3], state[4] = prev_r, prev_g, prev_b, prev_a, 0
+    return pos, sse
+
+
+
+if NUMBA_AVAILABLE:
+    from numba import njit  # type: ignore
+    near_lossless_kernel = njit(cache=True, nogil=True)(near_lossless_kernel)
+
+
+
+def psnr(sse: float, n_values: int) -> float:
+    """
+    Peak signal-to-noise ratio of 8-bit values, dB (inf if there are no errors)
+
+    :param sse: sum of squared errors
+    :param n_values: number of compared values
+    """
+    if sse == 0:
+        return math.inf
+    return 10 * math.log10(255 ** 2 * n_values / sse)
+
+
+
+def encode_near_lossless(image: np.ndarray, max_error: int = 2, strict: bool = False) -> Tuple[bytes, float]:
+    """
+    Encode image into qoi bytes, every channel of decoded image differs from original by at most "max_error"
+
+    :param image: uint8 array, shape=(height, width, 3) or shape=(height, width, 4), alpha is encoded losslessly
+    :param max_error: max absolute error of R, G, B values, 0 - lossless
+    :param strict: follow QOI specification, see qoi_encoder.encode_array()
+    :return: content of qoi file, PSNR of decoded image (dB)
+    """
+    image = np.asarray(image)
+    if image.ndim != 3 or image.shape[2] not in (3, 4) or image.dtype != np.uint8:
+        raise ValueError(f"Image must be uint8 array with shape (height, width, 3 or 4), got {image.shape}")
+    if not 0 <= max_error <= 255:
+        raise ValueError(f"Max error must be in range 0...255, got {max_error}")
+    height, width, channels = image.shape
+    state = EncoderState(strict)
+    out = np.empty(max_encoded_size(height * width, channels), dtype=np.uint8)
+
+    if NUMBA_AVAILABLE:
+        n_bytes, sse = near_lossless_kernel(image, out, state.values, height, width, channels, strict, max_error)
+    else:  # python ints and memoryview indexing are much faster than numpy scalars
+        values = state.values.tolist()
+        n_bytes, sse = near_lossless_kernel(np.ascontiguousarray(image).data, out.data,
+                                            values, height, width, channels, strict, max_error)
+
+    qoi_bytes = qoi_header(image) + out[:n_bytes].tobytes() + qoi_end()
+    return qoi_bytes, psnr(sse, height * width * 3)
+
+
+
+def run_near_lossless_encoder(png_filename: str,
+                              qoi_filename: str,
+                              max_error: int = 2,
+                              strict: bool = False) -> Tuple[str, float, float]:
+    """
+    Encode image "png_filename" with near-lossless encoder and save it as "qoi_filename"
+
+    :return: qoi filename, encoding time, PSNR of decoded image (dB)
+    """
+    img = read_png_array(png_filename)
+
+    start_time = time.perf_counter()
+    qoi_bytes, img_psnr = encode_near_lossless(img, max_error, strict)
+    with open(qoi_filename, 'wb') as file:
+        file.write(qoi_bytes)
+    time_elapsed = time.perf_counter() - start_time
+
+    logger.debug("Image encoded and saved as %s", qoi_filename)
+    logger.debug("Encoding time: %.3f ms, PSNR: %.2f dB", 1000 * time_elapsed, img_psnr)
+
+    return qoi_filename, time_elapsed, img_psnr
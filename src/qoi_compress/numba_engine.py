@@ -0,0 +1,255 @@
+from typing import Optional, Tuple
+import numpy as np
+from qoi_compress.qoi_encoder import EncoderState
+from qoi_compress.qoi_decoder import DecoderState
+
+try:
+    from numba import njit  # type: ignore
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+
+def require_numba() -> None:
+    """
+    :raises ImportError: if numba is not installed
+    """
+    if not NUMBA_AVAILABLE:
+        raise ImportError("numba engine requires numba, install it with: pip install qoi_compress[numba]")
+
+
+
+def encode_kernel(image: np.ndarray, 
+                  out: np.ndarray, 
+                  state: np.ndarray, 
+                  flush: bool, 
+                  channels: int, 
+                  strict: bool) -> int:
+    """
+    QOI encoder algorithm over arrays, same chunks as qoi_encoder.encode_chunks()
+
+    :param image: uint8 array, shape=(height, width, channels), any strides (it is read in place)
+    :param out: preallocated uint8 array, large enough to store channels + 1 bytes per pixel + 1 byte
+    :param state: EncoderState.values, updated in place
+    :param flush: write unfinished run at the end
+    :param channels: 3 or 4 (RGBA), alpha of 3-channel image is 0 (255 if "strict")
+    :param strict: follow QOI specification, see EncoderState
+    :return: number of written bytes
+    """
+    default_alpha = 255 if strict else 0
+    height, width = image.shape[0], image.shape[1]
+    hash_array = state[5:]
+    prev_r, prev_g, prev_b, prev_a = state[0], state[1], state[2], state[3]
+    prev_px = (prev_r << 24) | (prev_g << 16) | (prev_b << 8) | prev_a
+    run_length = state[4]
+    pos = 0
+
+    for y in range(height):
+        for x in range(width):
+            r = int(image[y, x, 0])
+            g = int(image[y, x, 1])
+            b = int(image[y, x, 2])
+            a = int(image[y, x, 3]) if channels == 4 else default_alpha
+            px = (r << 24) | (g << 16) | (b << 8) | a
+
+            if px == prev_px:
+                run_length += 1
+                if run_length == 62:
+                    out[pos] = 0b11000000 | (run_length - 1)
+                    pos += 1
+                    run_length = 0
+                continue
+            if run_length > 0:
+                out[pos] = 0b11000000 | (run_length - 1)
+                pos += 1
+                run_length = 0
+
+            dr = r - prev_r
+            dg = g - prev_g
+            db = b - prev_b
+            da = a - prev_a
+            if strict:  # wrap around
+                dr = ((dr + 128) & 0xFF) - 128
+                dg = ((dg + 128) & 0xFF) - 128
+                db = ((db + 128) & 0xFF) - 128
+            prev_r, prev_g, prev_b, prev_a = r, g, b, a
+            prev_px = px
+
+            hash_index = (r * 3 + g * 5 + b * 7 + a * 11) % 64
+            if hash_array[hash_index] == px and (strict or px != 0):  # black slot is an empty slot in legacy mode
+                out[pos] = hash_index
+                pos += 1
+                continue
+            hash_array[hash_index] = px
+
+            if da != 0:
+                out[pos] = 0b11111111
+                out[pos + 1] = r
+                out[pos + 2] = g
+                out[pos + 3] = b
+                out[pos + 4] = a
+                pos += 5
+                continue
+
+            dr_dg = dr - dg
+            db_dg = db - dg
+            if -2 <= dr <= 1 and -2 <= dg <= 1 and -2 <= db <= 1:
+                out[pos] = 0b01000000 | ((dr + 2) << 4) | ((dg + 2) << 2) | (db + 2)
+                pos += 1
+            elif -32 <= dg <= 31 and -8 <= dr_dg <= 7 and -8 <= db_dg <= 7:
+                out[pos] = 0b10000000 | (dg + 32)
+                out[pos + 1] = ((dr_dg + 8) << 4) | (db_dg + 8)
+                pos += 2
+            else:
+                out[pos] = 0b11111110
+                out[pos + 1] = r
+                out[pos + 2] = g
+                out[pos + 3] = b
+                pos += 4
+
+    if flush and run_length > 0:
+        out[pos] = 0b11000000 | (run_length - 1)
+        pos += 1
+        run_length = 0
+
+    state[0], state[1], state[2], state[3], state[4] = prev_r, prev_g, prev_b, prev_a, run_length
+    return pos
+
+
+
+def decode_kernel(data: np.ndarray, 
+                  pos: int, 
+                  end: int, 
+                  out: np.ndarray, 
+                  state: np.ndarray, 
+                  channels: int) -> Tuple[int, int]:
+    """
+    QOI decoder algorithm over flat arrays, same pixels as qoi_decoder.decode_chunks()
+    Stops when "out" is full or at the first chunk which is not complete in data[pos:end]
+
+    :param data: uint8 array with content of qoi file (or its part)
+    :param pos: position of the first chunk
+    :param end: position right after the last available chunk
+    :param out: flat uint8 array, "channels" bytes per pixel
+    :param state: DecoderState.values, updated in place
+    :param channels: 3 or 4 (RGBA)
+    :return: position of the first not decoded chunk, number of written bytes
+    """
+    n_out = out.shape[0]
+    hash_array = state[5:]
+    r, g, b, a, run_length = state[0], state[1], state[2], state[3], state[4]
+    out_pos = 0
+
+    while True:
+        while run_length > 0 and out_pos + channels <= n_out:
+            out[out_pos] = r
+            out[out_pos + 1] = g
+            out[out_pos + 2] = b
+            if channels == 4:
+                out[out_pos + 3] = a
+            out_pos += channels
+            run_length -= 1
+
+        if pos >= end or out_pos + channels > n_out:
+            break
+
+        byte = int(data[pos])
+        tag = byte >> 6
+
+        if byte == 0b11111110:
+            if pos + 4 > end:
+                break
+            r, g, b = int(data[pos + 1]), int(data[pos + 2]), int(data[pos + 3])
+            pos += 4
+        elif byte == 0b11111111:
+            if pos + 5 > end:
+                break
+            r, g, b, a = int(data[pos + 1]), int(data[pos + 2]), int(data[pos + 3]), int(data[pos + 4])
+            pos += 5
+        elif tag == 0b11:
+            run_length = (byte & 0b111111) + 1
+            hash_array[(r * 3 + g * 5 + b * 7 + a * 11) % 64] = (r << 24) | (g << 16) | (b << 8) | a
+            pos += 1
+            continue
+        elif tag == 0b00:
+            px = hash_array[byte]
+            r, g, b, a = (px >> 24) & 0xFF, (px >> 16) & 0xFF, (px >> 8) & 0xFF, px & 0xFF
+            pos += 1
+        elif tag == 0b01:
+            r = (r + ((byte >> 4) & 0b11) - 2) & 0xFF
+            g = (g + ((byte >> 2) & 0b11) - 2) & 0xFF
+            b = (b + (byte & 0b11) - 2) & 0xFF
+            pos += 1
+        else:
+            if pos + 2 > end:
+                break
+            dg = (byte & 0b111111) - 32
+            byte2 = int(data[pos + 1])
+            r = (r + dg + (byte2 >> 4) - 8) & 0xFF
+            g = (g + dg) & 0xFF
+            b = (b + dg + (byte2 & 0b1111) - 8) & 0xFF
+            pos += 2
+
+        hash_array[(r * 3 + g * 5 + b * 7 + a * 11) % 64] = (r << 24) | (g << 16) | (b << 8) | a
+
+        out[out_pos] = r
+        out[out_pos + 1] = g
+        out[out_pos + 2] = b
+        if channels == 4:
+            out[out_pos + 3] = a
+        out_pos += channels
+
+    state[0], state[1], state[2], state[3], state[4] = r, g, b, a, run_length
+    return pos, out_pos
+
+
+
+if NUMBA_AVAILABLE:
+    encode_kernel = njit(cache=True, nogil=True)(encode_kernel)
+    decode_kernel = njit(cache=True, nogil=True)(decode_kernel)
+
+
+
+def encode_chunks_numba(image: np.ndarray, 
+                        state: Optional[EncoderState] = None, 
+                        flush: bool = True) -> np.ndarray:
+    """
+    Compiled QOI encoder, produces the same chunks as qoi_encoder.encode_chunks()
+
+    :param image: input image, shape=(height, width, channels), or array of pixels, shape=(n, channels),
+                  channels = 3 or 4 (RGBA), uint8 array with any strides is not copied
+    :param state: encoder state after the previous pixels, updated in place (new state by default)
+    :param flush: finish unfinished run at the end of image
+    :return: 1d uint8 array of encoded chunks (without qoi header and end bytes)
+    """
+    require_numba()
+    if state is None:
+        state = EncoderState()
+    if image.ndim == 2:
+        image = image[np.newaxis]
+    channels = 4 if image.shape[-1] >= 4 else 3
+    image = image[..., :channels]
+    if image.dtype != np.uint8:
+        image = image.astype(np.uint8)
+    out = np.empty((channels + 1) * image.shape[0] * image.shape[1] + 1, dtype=np.uint8)
+    pos = encode_kernel(image, out, state.values, flush, channels, state.strict)
+    return out[:pos]
+
+
+
+def decode_chunks_numba(qoi_bytes: bytes, 
+                        pos: int, 
+                        end: int, 
+                        out: memoryview, 
+                        state: Optional[DecoderState] = None,
+                        channels: int = 3) -> Tuple[int, int]:
+    """
+    Compiled QOI decoder, same interface as qoi_decoder.decode_chunks()
+    """
+    require_numba()
+    if state is None:
+        state = DecoderState()
+    data = np.frombuffer(qoi_bytes, dtype=np.uint8)
+    pos, out_pos = decode_kernel(data, pos, end, np.frombuffer(out, dtype=np.uint8), state.values, channels)
+    return int(pos), int(out_pos)
@@ -0,0 +1,178 @@
+from typing import Optional, Tuple
+import numpy as np
+from qoi_compress.qoi_encoder import ChunkType, EncoderState
+
+
+
+def split_runs(is_run: np.ndarray, run_length: int = 0, flush: bool = True) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Split sequences of repeated pixels into QOI_RUN chunks (at most 62 pixels per chunk)
+
+    :param is_run: bool mask, True for pixels equal to the previous pixel
+    :param run_length: length of unfinished run before the first pixel
+    :param flush: finish the run at the end of "is_run"
+    :return: 1) run_ends - indexes of the last pixel of each QOI_RUN chunk 
+                (-1 for unfinished run before the first pixel)
+             2) run_lengths - run-length of each QOI_RUN chunk (1-62)
+             3) length of unfinished run after the last pixel
+    """
+    n = len(is_run)
+    run_idx = np.flatnonzero(is_run)
+    
+    # unfinished run before the first pixel is finished by the first pixel
+    head_ends = np.empty(0, dtype=np.int64)
+    if run_length > 0 and (n == 0 or not is_run[0]):
+        if n > 0 or flush:
+            head_ends = np.array([-1])
+        else:
+            return head_ends, head_ends, run_length
+    head_lengths = np.full(len(head_ends), run_length, dtype=np.int64)
+    
+    if len(run_idx) == 0:
+        return head_ends, head_lengths, 0
+
+    # first pixel of each sequence of repeated pixels
+    is_start = np.ones(len(run_idx), dtype=bool)
+    is_start[1:] = run_idx[1:] != run_idx[:-1] + 1
+    group = np.cumsum(is_start) - 1
+    position = run_idx - run_idx[is_start][group]  # position of pixel inside its sequence
+    if run_idx[0] == 0:
+        position[group == 0] += run_length  # the first sequence continues unfinished run
+
+    is_last = np.ones(len(run_idx), dtype=bool)
+    is_last[:-1] = is_start[1:]
+    is_end = is_last | ((position + 1) % 62 == 0)
+    
+    # the last run is continued by the next pixels
+    tail_length = 0
+    if not flush and run_idx[-1] == n - 1:
+        tail_length = int((position[-1] + 1) % 62)
+        if tail_length:
+            is_end[-1] = False
+
+    return (np.concatenate([head_ends, run_idx[is_end]]), 
+            np.concatenate([head_lengths, position[is_end] % 62 + 1]),
+            tail_length)
+
+
+
+def find_index_hits(packed: np.ndarray, 
+                    hash_index: np.ndarray, 
+                    hash_array: np.ndarray, 
+                    black_is_empty: bool = True) -> np.ndarray:
+    """
+    Find pixels which can be encoded as QOI_INDEX chunk
+
+    The hash array slot of a pixel always holds the last previous pixel with the same hash,
+    so pixel is an index hit if it is equal to the previous pixel in its hash group.
+
+    :param packed: pixels (which are not part of a run) packed into single int
+    :param hash_index: hash values of these pixels
+    :param hash_array: hash array before the first pixel, updated in place
+    :param black_is_empty: black pixel is never an index hit, black slot is treated as an empty slot
+    :return: bool mask of index hits
+    """
+    # slots of hash array go first, as if they were the previous pixels
+    all_packed = np.concatenate([hash_array, packed])
+    all_hash = np.concatenate([np.arange(64), hash_index])
+    
+    order = np.argsort(all_hash, kind='stable')
+    sorted_hash = all_hash[order]
+    sorted_packed = all_packed[order]
+
+    is_hit = np.zeros(len(all_packed), dtype=bool)
+    is_hit[order[1:]] = ((sorted_hash[1:] == sorted_hash[:-1])
+                         & (sorted_packed[1:] == sorted_packed[:-1]))
+    if black_is_empty:
+        is_hit[order[1:]] &= sorted_packed[1:] != 0
+    
+    # last pixel of each hash group goes to the hash array
+    is_group_end = np.ones(len(all_packed), dtype=bool)
+    is_group_end[:-1] = sorted_hash[1:] != sorted_hash[:-1]
+    hash_array[:] = sorted_packed[is_group_end]
+    
+    return is_hit[64:]
+
+
+
+def encode_chunks_numpy(image: np.ndarray, 
+                        state: Optional[EncoderState] = None, 
+                        flush: bool = True) -> np.ndarray:
+    """
+    Vectorized QOI encoder algorithm, produces the same chunks as qoi_encoder.encode_chunks()
+
+    :param image: input image, shape=(height, width, channels), or array of pixels, shape=(n, channels),
+                  channels = 3 or 4 (RGBA)
+    :param state: encoder state after the previous pixels, updated in place (new state by default)
+    :param flush: finish unfinished run at the end of image
+    :return: 1d uint8 array of encoded chunks (without qoi header and end bytes)
+    """
+    if state is None:
+        state = EncoderState()
+    channels = min(image.shape[-1], 4)
+    n = int(np.prod(image.shape[:-1]))
+    pixels = np.full((n, 4), 255 if state.strict else 0, dtype=np.int64)  # alpha of 3-channel image
+    # int64 copy of pixels (strided image is copied directly, without intermediate contiguous copy)
+    pixels.reshape(image.shape[:-1] + (4,))[..., :channels] = image[..., :channels]
+
+    prev_pixels = np.empty_like(pixels)
+    prev_pixels[0:1] = state.prev_pixel
+    prev_pixels[1:] = pixels[:-1]
+    diff = pixels - prev_pixels
+    if state.strict:
+        diff = (diff + 128) % 256 - 128  # wrap around, see qoi_encoder.wrap_diff()
+    packed = (pixels[:, 0] << 24) | (pixels[:, 1] << 16) | (pixels[:, 2] << 8) | pixels[:, 3]
+
+    is_run = np.all(diff == 0, axis=1)
+    run_ends, run_lengths, state.run_length = split_runs(is_run, state.run_length, flush)
+    if n > 0:
+        state.prev_pixel[:] = pixels[-1]
+
+    # classify pixels which are not part of a run
+    idx = np.flatnonzero(~is_run)
+    r, g, b, a = pixels[idx, 0], pixels[idx, 1], pixels[idx, 2], pixels[idx, 3]
+    dr, dg, db = diff[idx, 0], diff[idx, 1], diff[idx, 2]
+    dr_dg = dr - dg
+    db_dg = db - dg
+    hash_index = (r * 3 + g * 5 + b * 7 + a * 11) % 64
+
+    is_index = find_index_hits(packed[idx], hash_index, state.hash_array, black_is_empty=not state.strict)
+    is_rgba = ~is_index & (diff[idx, 3] != 0)
+    is_small = ~is_index & ~is_rgba & (dr >= -2) & (dr <= 1) & (dg >= -2) & (dg <= 1) & (db >= -2) & (db <= 1)
+    is_med = (~is_index & ~is_rgba & ~is_small & (dg >= -32) & (dg <= 31)
+              & (dr_dg >= -8) & (dr_dg <= 7) & (db_dg >= -8) & (db_dg <= 7))
+    is_rgb = ~(is_index | is_rgba | is_small | is_med)
+
+    # chunk size of every pixel, chunks are placed in the order of pixels,
+    # chunk of unfinished run before the first pixel is placed first (index -1 is shifted to 0)
+    chunk_size = np.zeros(n + 1, dtype=np.int64)
+    chunk_size[run_ends + 1] = 1
+    chunk_size[idx + 1] = np.where(is_rgba, 5, np.where(is_rgb, 4, np.where(is_med, 2, 1)))
+    offsets = np.cumsum(chunk_size) - chunk_size
+    chunks = np.empty(int(offsets[-1] + chunk_size[-1]), dtype=np.uint8)
+
+    chunks[offsets[run_ends + 1]] = ChunkType.QOI_RUN.value | (run_lengths - 1)
+
+    pos = offsets[idx + 1]
+    chunks[pos[is_index]] = ChunkType.QOI_INDEX.value | hash_index[is_index]
+
+    chunks[pos[is_small]] = (ChunkType.QOI_DIFF_SMALL.value | ((dr[is_small] + 2) << 4)
+                             | ((dg[is_small] + 2) << 2) | (db[is_small] + 2))
+
+    chunks[pos[is_med]] = ChunkType.QOI_DIFF_MED.value | (dg[is_med] + 32)
+    chunks[pos[is_med] + 1] = ((dr_dg[is_med] + 8) << 4) | (db_dg[is_med] + 8)
+
+    rgb_pos = pos[is_rgb]
+    chunks[rgb_pos] = ChunkType.QOI_RGB.value
+    chunks[rgb_pos + 1] = r[is_rgb]
+    chunks[rgb_pos + 2] = g[is_rgb]
+    chunks[rgb_pos + 3] = b[is_rgb]
+
+    rgba_pos = pos[is_rgba]
+    chunks[rgba_pos] = ChunkType.QOI_RGBA.value
+    chunks[rgba_pos + 1] = r[is_rgba]
+    chunks[rgba_pos + 2] = g[is_rgba]
+    chunks[rgba_pos + 3] = b[is_rgba]
+    chunks[rgba_pos + 4] = a[is_rgba]
+
+    return chunks
@@ -0,0 +1,305 @@
+"""
+Streaming PNG -> QOI transcoder: PNG is parsed chunk by chunk, IDAT data is inflated incrementally
+(zlib.decompressobj), scanlines are unfiltered one by one and fed to streaming.StreamEncoder.
+Only the previous and the current scanline and a small block of rows are kept in memory,
+so images of any size are converted without decoding the whole image
+
+Supported: 8-bit grayscale, gray+alpha, RGB, RGBA, palette and 1/2/4-bit grayscale and palette images,
+transparency (tRNS), not interlaced. Channels of output are the same as of read_png.read_png_array()
+(RGBA if image has alpha channel or transparency, RGB otherwise)
+"""
+import time
+import zlib
+import struct
+from typing import BinaryIO, NamedTuple, Optional, Tuple, Union
+import numpy as np
+from qoi_compress.numba_engine import NUMBA_AVAILABLE
+from qoi_compress.streaming import StreamEncoder
+from qoi_compress.setup_logger import logger
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_CHUNK_HEADER = struct.Struct(">I4s")
+PNG_IHDR = struct.Struct(">IIBBBBB")
+INFLATE_SIZE = 1 << 16  # max number of bytes inflated at once
+
+# color type -> number of samples per pixel
+COLOR_TYPE_SAMPLES = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+class PngHeader(NamedTuple):
+    """IHDR chunk of PNG image"""
+    width: int
+    height: int
+    bit_depth: int
+    color_type: int
+    interlace: int
+
+    @property
+    def bytes_per_pixel(self) -> int:
+        """Distance to the "left" byte of filters (1 for images with less than 8 bits per pixel)"""
+        return max(COLOR_TYPE_SAMPLES[self.color_type] * self.bit_depth // 8, 1)
+
+    @property
+    def stride(self) -> int:
+        """Size of scanline without filter type byte"""
+        return (self.width * COLOR_TYPE_SAMPLES[self.color_type] * self.bit_depth + 7) // 8
+
+
+
+def unfilter_row(filter_type: int,
+                 row: Union[np.ndarray, memoryview],
+                 prev: Union[np.ndarray, memoryview],
+                 bpp: int) -> None:
+    """
+    Reverse PNG filter of scanline in place
+
+    :param filter_type: 0 - None, 1 - Sub, 2 - Up, 3 - Average, 4 - Paeth
+    :param row: filtered scanline without filter type byte, int32 array (signed arithmetic of paeth predictor 
+                is much faster than uint8 values casted to uint64 by numba), updated in place
+    :param prev: unfiltered previous scanline (zeros for the first one), int32 array
+                 (memoryviews of arrays without numba)
+    :param bpp: bytes per pixel
+    """
+    n = len(row)
+    if filter_type == 1:
+        for i in range(bpp, n):
+            row[i] = (int(row[i]) + int(row[i - bpp])) & 0xFF
+    elif filter_type == 2:
+        for i in range(n):
+            row[i] = (int(row[i]) + int(prev[i])) & 0xFF
+    elif filter_type == 3:
+        for i in range(bpp):
+            row[i] = (int(row[i]) + (int(prev[i]) >> 1)) & 0xFF
+        for i in range(bpp, n):
+            row[i] = (int(row[i]) + ((int(row[i - bpp]) + int(prev[i])) >> 1)) & 0xFF
+    elif filter_type == 4:
+        for i in range(bpp):
+            row[i] = (int(row[i]) + int(prev[i])) & 0xFF  # left and upper-left are 0, predictor is "up"
+        for i in range(bpp, n):
+            left, up, up_left = int(row[i - bpp]), int(prev[i]), int(prev[i - bpp])
+            p = left + up - up_left
+            p_left, p_up, p_up_left = abs(p - left), abs(p - up), abs(p - up_left)
+            if p_left <= p_up and p_left <= p_up_left:
+                predictor = left
+            elif p_up <= p_up_left:
+                predictor = up
+            else:
+                predictor = up_left
+            row[i] = (int(row[i]) + predictor) & 0xFF
+
+
+
+if NUMBA_AVAILABLE:
+    from numba import njit  # type: ignore
+    unfilter_row = njit(cache=True, nogil=True)(unfilter_row)
+
+
+
+def read_png_chunk(stream: BinaryIO) -> Tuple[bytes, bytes]:
+    """
+    Read next chunk of PNG file, CRC is checked
+
+    :return: chunk type, chunk data
+    """
+    header = stream.read(PNG_CHUNK_HEADER.size)
+    if len(header) < PNG_CHUNK_HEADER.size:
+        raise ValueError("Unexpected end of PNG file")
+    length, chunk_type = PNG_CHUNK_HEADER.unpack(header)
+    data = stream.read(length)
+    crc = stream.read(4)
+    if len(data) < length or len(crc) < 4:
+        raise ValueError("Unexpected end of PNG file")
+    if zlib.crc32(data, zlib.crc32(chunk_type)) != struct.unpack(">I", crc)[0]:
+        raise ValueError(f"CRC mismatch in PNG chunk {chunk_type!r}")
+    return chunk_type, data
+
+
+
+def read_png_header(stream: BinaryIO) -> PngHeader:
+    """
+    Read PNG signature and IHDR chunk
+
+    :raises ValueError: if image can not be transcoded by streaming transcoder
+    """
+    if stream.read(len(PNG_SIGNATURE)) != PNG_SIGNATURE:
+        raise ValueError("There is no magic bytes of PNG image")
+    chunk_type, data = read_png_chunk(stream)
+    if chunk_type != b"IHDR" or len(data) != PNG_IHDR.size:
+        raise ValueError("PNG image must start with IHDR chunk")
+    width, height, bit_depth, color_type, compression, filter_method, interlace = PNG_IHDR.unpack(data)
+
+    if color_type not in COLOR_TYPE_SAMPLES or compression != 0 or filter_method != 0:
+        raise ValueError(f"Invalid PNG header: color type {color_type}, compression {compression}, "
+                         f"filter method {filter_method}")
+    if bit_depth != 8 and not (color_type in (0, 3) and bit_depth in (1, 2, 4)):
+        raise ValueError(f"Bit depth {bit_depth} of PNG image with color type {color_type} "
+                         f"is not supported by streaming transcoder")
+    if interlace != 0:
+        raise ValueError("Interlaced PNG images are not supported by streaming transcoder")
+    return PngHeader(width, height, bit_depth, color_type, interlace)
+
+
+
+class RowConverter:
+    """
+    Convert unfiltered scanlines of PNG image into RGB or RGBA pixels
+    """
+    def __init__(self, header: PngHeader, palette: Optional[bytes], transparency: Optional[bytes]):
+        """
+        :param palette: content of PLTE chunk (required for palette images)
+        :param transparency: content of tRNS chunk
+        """
+        self.color_type = header.color_type
+        self.width = header.width
+        self.bit_depth = header.bit_depth
+        self.transparent: Optional[np.ndarray] = None  # gray or RGB color which is fully transparent
+        self.palette: Optional[np.ndarray] = None  # palette index -> RGBA or RGB
+
+        if header.color_type == 3:
+            if palette is None:
+                raise ValueError("Palette PNG image has no PLTE chunk")
+            colors = np.zeros((256, 3), dtype=np.uint8)
+            colors[:len(palette) // 3] = np.frombuffer(palette, dtype=np.uint8)[:len(palette) // 3 * 3].reshape(-1, 3)
+            if transparency is not None:
+                alpha = np.full((256, 1), 255, dtype=np.uint8)
+                alpha[:len(transparency), 0] = np.frombuffer(transparency, dtype=np.uint8)
+                colors = np.hstack((colors, alpha))
+            self.palette = colors
+        elif header.color_type in (0, 2) and transparency is not None:
+            # 16-bit samples, only the low byte is used by images with less than 16 bits
+            self.transparent = np.frombuffer(transparency, dtype=">u2").astype(np.uint8)
+
+        has_alpha = header.color_type in (4, 6) or transparency is not None
+        self.channels = 4 if has_alpha else 3
+
+
+    def convert(self, row: np.ndarray, out: np.ndarray) -> None:
+        """
+        :param row: unfiltered scanline, any integer dtype
+        :param out: output row, shape=(width, channels)
+        """
+        if self.bit_depth < 8:  # several pixels in byte, the leftmost pixel in the high bits
+            bits = np.unpackbits(row.astype(np.uint8))[:self.width * self.bit_depth].reshape(self.width, self.bit_depth)
+            samples = (bits @ (1 << np.arange(self.bit_depth - 1, -1, -1))).astype(np.uint8)[:, np.newaxis]
+        else:
+            samples = row.reshape(self.width, -1)
+
+        if self.palette is not None:  # palette image
+            out[:] = self.palette[samples[:, 0]]
+            return
+
+        if self.color_type in (0, 4):
+            gray = samples[:, :1]
+            if self.bit_depth < 8:
+                gray = gray * (255 // ((1 << self.bit_depth) - 1))  # scale to 0...255
+            out[:, :3] = gray  # gray is replicated to R, G, B
+        else:
+            out[:, :3] = samples[:, :3]
+
+        if self.color_type in (4, 6):
+            out[:, 3] = samples[:, -1]
+        elif self.channels == 4:
+            out[:, 3] = np.where(np.all(samples == self.transparent, axis=1), 0, 255)
+
+
+
+def transcode_png(stream: BinaryIO,
+                  sink: BinaryIO,
+                  rows_per_feed: int = 16,
+                  engine: str = "auto",
+                  strict: bool = False) -> int:
+    """
+    Convert PNG image read from "stream" into qoi image written to "sink" without decoding the whole image,
+    memory usage is about "rows_per_feed" rows of image
+
+    :param stream: readable binary stream with PNG image
+    :param sink: writable binary stream
+    :param rows_per_feed: number of rows passed to encoder at once
+    :param engine: encoder engine, see streaming.get_stateful_encode_func()
+    :param strict: follow QOI specification, see qoi_encoder.encode_array()
+    :return: number of written bytes
+    :raises ValueError: if PNG image is invalid or not supported (16-bit, interlaced)
+    """
+    header = read_png_header(stream)
+    bpp, stride = header.bytes_per_pixel, header.stride
+    palette: Optional[bytes] = None
+    transparency: Optional[bytes] = None
+
+    chunk_type, data = read_png_chunk(stream)
+    while chunk_type != b"IDAT":
+        if chunk_type == b"IEND":
+            raise ValueError("PNG image has no IDAT chunks")
+        elif chunk_type == b"PLTE":
+            palette = data
+        elif chunk_type == b"tRNS":
+            transparency = data
+        chunk_type, data = read_png_chunk(stream)
+
+    converter = RowConverter(header, palette, transparency)
+    block = np.empty((rows_per_feed, header.width, converter.channels), dtype=np.uint8)
+    prev = np.zeros(stride, dtype=np.int32)
+    row = np.zeros(stride, dtype=np.int32)
+    prev_buffer: Union[np.ndarray, memoryview] = prev
+    row_buffer: Union[np.ndarray, memoryview] = row
+    if not NUMBA_AVAILABLE:  # python ints and memoryview indexing are much faster than numpy scalars
+        prev_buffer, row_buffer = prev.data, row.data
+
+    inflater = zlib.decompressobj()
+    pending = bytearray()  # inflated bytes of unfinished scanlines
+    rows_done = 0
+    n_block = 0
+
+    with StreamEncoder(sink, header.width, header.height, engine, converter.channels, strict) as encoder:
+        while chunk_type == b"IDAT":
+            while data:
+                pending += inflater.decompress(data, INFLATE_SIZE)
+                data = inflater.unconsumed_tail
+
+                pos = 0
+                while len(pending) - pos > stride and rows_done < header.height:
+                    filter_type = pending[pos]
+                    if filter_type > 4:
+                        raise ValueError(f"Invalid filter type {filter_type} of PNG scanline {rows_done}")
+                    row[:] = np.frombuffer(pending, dtype=np.uint8, count=stride, offset=pos + 1)
+                    unfilter_row(filter_type, row_buffer, prev_buffer, bpp)
+                    converter.convert(row, block[n_block])
+                    prev, row = row, prev
+                    prev_buffer, row_buffer = row_buffer, prev_buffer
+                    pos += stride + 1
+                    rows_done += 1
+                    n_block += 1
+                    if n_block == rows_per_feed:
+                        encoder.feed_rows(block)
+                        n_block = 0
+                del pending[:pos]
+
+            chunk_type, data = read_png_chunk(stream)
+
+        if n_block:
+            encoder.feed_rows(block[:n_block])
+        if rows_done != header.height:
+            raise ValueError(f"PNG image data ends after {rows_done} rows of {header.height}")
+    return encoder.bytes_written
+
+
+
+def run_png_transcoder(png_filename: str,
+                       qoi_filename: str,
+                       rows_per_feed: int = 16,
+                       engine: str = "auto",
+                       strict: bool = False) -> Tuple[str, float]:
+    """
+    Convert image "png_filename" into qoi image "qoi_filename" with streaming transcoder,
+    the whole image is never kept in memory (see transcode_png())
+
+    :return: qoi filename, transcoding time
+    """
+    start_time = time.perf_counter()
+    with open(png_filename, 'rb') as stream, open(qoi_filename, 'wb') as sink:
+        transcode_png(stream, sink, rows_per_feed, engine, strict)
+    time_elapsed = time.perf_counter() - start_time
+
+    logger.debug("Image transcoded and saved as %s", qoi_filename)
+    logger.debug("Transcoding time: %.3f ms", 1000 * time_elapsed)
+
+    return qoi_filename, time_elapsed
@@ -0,0 +1,76 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Iterable, List, NamedTuple, Optional, Union
+from qoi_compress.qoi_decoder import QOI_HEADER, QOI_HEADER_SIZE, QoiBuffer
+
+PathOrBuffer = Union[str, "os.PathLike[str]", bytes, bytearray, memoryview, BinaryIO]
+
+
+class QoiInfo(NamedTuple):
+    """Image info from qoi header"""
+    width: int
+    height: int
+    channels: int
+    colorspace: int
+    file_size: Optional[int]  # None for streams of unknown size
+
+
+
+def parse_header(header: QoiBuffer, file_size: Optional[int]) -> QoiInfo:
+    """
+    :raises ValueError: if "header" is not a qoi header
+    """
+    if len(header) < QOI_HEADER_SIZE:
+        raise ValueError("File is too small to contain QOI header")
+    magic, width, height, channels, colorspace = QOI_HEADER.unpack_from(header)
+    if magic != b'qoif':
+        raise ValueError("There is no magic QOI bytes in the file header")
+    return QoiInfo(width, height, channels, colorspace, file_size)
+
+
+
+def probe(source: PathOrBuffer) -> QoiInfo:
+    """
+    Read image info from qoi header only, without decoding the image
+
+    :param source: path to qoi file, buffer with qoi bytes or binary stream
+                   (header is read from the current position of stream)
+    :raises ValueError: if source is not a qoi image
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return parse_header(f.read(QOI_HEADER_SIZE), os.fstat(f.fileno()).st_size)
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        with memoryview(source) as data:
+            return parse_header(data.cast('B')[:QOI_HEADER_SIZE], data.nbytes)
+
+    file_size = None
+    try:
+        file_size = os.fstat(source.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        pass
+    return parse_header(source.read(QOI_HEADER_SIZE), file_size)
+
+
+
+def probe_many(paths: Iterable[PathOrBuffer],
+               workers: int = 16,
+               skip_errors: bool = False) -> List[Optional[QoiInfo]]:
+    """
+    Read qoi headers of many files in a pool of threads (reading is I/O bound)
+
+    :param workers: number of threads
+    :param skip_errors: return None for files which can't be probed instead of raising the error
+    :return: image infos in the order of "paths"
+    """
+    def probe_one(source: PathOrBuffer) -> Optional[QoiInfo]:
+        try:
+            return probe(source)
+        except (OSError, ValueError):
+            if skip_errors:
+                return None
+            raise
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(probe_one, paths))
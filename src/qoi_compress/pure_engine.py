@@ -0,0 +1,277 @@
+"""
+Dependency-free engine: pure python, no numpy, so it runs on PyPy and in minimal deployments
+(this module imports only the standard library)
+
+Encoder packs pixels into ints r << 24 | g << 16 | b << 8 | a, its hash array is a flat array('I'),
+chunk bytes are taken from precomputed lookup tables. Bitstream is the same as of other engines,
+in legacy and strict modes
+
+Usage without numpy:
+    qoi_bytes = encode_pixels(pixels, width, height, channels)  # pixels: bytes, r g b (a) per pixel
+    height, width, channels, pixels = decode_pixels(qoi_bytes)
+"""
+import mmap
+import struct
+from array import array
+from typing import Tuple, Union
+
+QOI_HEADER = struct.Struct(">4sIIBB")  # magic, width, height, channels, colorspace
+QOI_END = bytes([0, 0, 0, 0, 0, 0, 0, 1])
+
+# any buffer of bytes (same as qoi_decoder.QoiBuffer, which can not be imported without numpy)
+BytesBuffer = Union[bytes, bytearray, memoryview, array, mmap.mmap]
+
+
+def make_lookup_table(low: int, high: int, offset: int, size: int) -> bytes:
+    """
+    Lookup table of channel difference d (stored at index d + offset):
+    d - low for low <= d <= high, 0xFF (does not fit) otherwise
+    """
+    return bytes(d - low if low <= d <= high else 0xFF for d in range(-offset, size - offset))
+
+
+# difference -> bits of QOI_DIFF_SMALL (index d + 255)
+DIFF_SMALL_LUT = make_lookup_table(-2, 1, 255, 511)
+# green difference -> bits of QOI_DIFF_MED (index dg + 255)
+DIFF_MED_G_LUT = make_lookup_table(-32, 31, 255, 511)
+# dr - dg, db - dg -> bits of QOI_DIFF_MED (index d + 510)
+DIFF_MED_RB_LUT = make_lookup_table(-8, 7, 510, 1021)
+# difference modulo 256 -> difference in range [-128, 127] (strict mode)
+WRAP_LUT = array('i', (d if d < 128 else d - 256 for d in range(256)))
+
+# QOI_DIFF_SMALL byte -> differences, QOI_DIFF_MED second byte -> dr - dg, db - dg
+DECODE_SMALL_R = array('i', (((byte >> 4) & 0b11) - 2 for byte in range(256)))
+DECODE_SMALL_G = array('i', (((byte >> 2) & 0b11) - 2 for byte in range(256)))
+DECODE_SMALL_B = array('i', ((byte & 0b11) - 2 for byte in range(256)))
+DECODE_MED_RB = array('i', ((byte >> 4) - 8 for byte in range(256)))
+
+
+class PureState:
+    """
+    Decoder state without numpy, same layout as qoi_decoder.DecoderState.values:
+    previous pixel (r, g, b, a), unfinished run, hash array (64 packed pixels)
+    """
+    __slots__ = ("strict", "values")
+
+    def __init__(self, strict: bool = False):
+        self.strict = strict
+        self.values = [0] * (5 + 64)
+        if strict:
+            self.values[3] = 255
+
+
+
+def encode_chunks_pure(pixels: BytesBuffer, channels: int = 3, strict: bool = False) -> bytearray:
+    """
+    QOI encoder algorithm over packed pixels, same chunks as qoi_encoder.encode_chunks()
+
+    :param pixels: any buffer with r, g, b (, a) bytes of each pixel
+    :param channels: 3 or 4 (RGBA), alpha of 3-channel image is 0 (255 if "strict")
+    :param strict: follow QOI specification, see qoi_encoder.EncoderState
+    :return: encoded chunks
+    """
+    data = memoryview(pixels).cast('B')
+    n = len(data)
+    out = bytearray()
+    append = out.append
+    hash_array = array('I', bytes(4 * 64))
+    diff_small = DIFF_SMALL_LUT
+    diff_med_g = DIFF_MED_G_LUT
+    diff_med_rb = DIFF_MED_RB_LUT
+    wrap = WRAP_LUT
+    rgba = channels == 4
+    default_alpha = 255 if strict else 0
+    prev_r = prev_g = prev_b = 0
+    prev_a = default_alpha
+    prev_px = prev_a
+    run_length = 0
+
+    for i in range(0, n, channels):
+        r = data[i]
+        g = data[i + 1]
+        b = data[i + 2]
+        a = data[i + 3] if rgba else default_alpha
+        px = (r << 24) | (g << 16) | (b << 8) | a
+
+        if px == prev_px:
+            run_length += 1
+            if run_length == 62:
+                append(0b11111101)  # QOI_RUN of 62 pixels
+                run_length = 0
+            continue
+        if run_length:
+            append(0b10111111 + run_length)  # QOI_RUN, 0b11000000 | (run_length - 1)
+            run_length = 0
+
+        if strict:
+            dr = wrap[(r - prev_r) & 0xFF]
+            dg = wrap[(g - prev_g) & 0xFF]
+            db = wrap[(b - prev_b) & 0xFF]
+        else:
+            dr = r - prev_r
+            dg = g - prev_g
+            db = b - prev_b
+        da = a - prev_a
+        prev_r, prev_g, prev_b, prev_a, prev_px = r, g, b, a, px
+
+        hash_index = (r * 3 + g * 5 + b * 7 + a * 11) & 63
+        if hash_array[hash_index] == px and (strict or px):  # black slot is an empty slot in legacy mode
+            append(hash_index)
+            continue
+        hash_array[hash_index] = px
+
+        if da:
+            out += bytes((0b11111111, r, g, b, a))
+            continue
+
+        small_r, small_g, small_b = diff_small[dr + 255], diff_small[dg + 255], diff_small[db + 255]
+        if small_r | small_g | small_b < 4:
+            append(0b01000000 | (small_r << 4) | (small_g << 2) | small_b)
+            continue
+
+        med_g = diff_med_g[dg + 255]
+        if med_g != 0xFF:
+            med_r, med_b = diff_med_rb[dr - dg + 510], diff_med_rb[db - dg + 510]
+            if med_r | med_b < 16:
+                append(0b10000000 | med_g)
+                append((med_r << 4) | med_b)
+                continue
+
+        out += bytes((0b11111110, r, g, b))
+
+    if run_length:
+        append(0b10111111 + run_length)
+    return out
+
+
+
+def decode_chunks_pure(data: BytesBuffer,
+                       pos: int,
+                       end: int,
+                       out: Union[bytearray, memoryview],
+                       state: PureState,
+                       channels: int = 3) -> Tuple[int, int]:
+    """
+    QOI decoder algorithm over packed pixels, same pixels as qoi_decoder.decode_chunks()
+    Stops when "out" is full or at the first chunk which is not complete in data[pos:end]
+
+    :param data: content of qoi file (or its part), any buffer
+    :param pos: position of the first chunk
+    :param end: position right after the last available chunk
+    :param out: flat writable buffer, "channels" bytes per pixel
+    :param state: PureState or qoi_decoder.DecoderState, updated in place
+    :param channels: 3 or 4 (RGBA)
+    :return: position of the first not decoded chunk, number of written bytes
+    """
+    values = state.values
+    r, g, b, a, run_length = [int(value) for value in values[:5]]
+    # hash array of (r, g, b, a) tuples: unpacking a tuple is cheaper than shifts of a packed pixel
+    hash_array = [((px >> 24) & 0xFF, (px >> 16) & 0xFF, (px >> 8) & 0xFF, px & 0xFF)
+                  for px in [int(value) for value in values[5:]]]
+    small_r, small_g, small_b, med_rb = DECODE_SMALL_R, DECODE_SMALL_G, DECODE_SMALL_B, DECODE_MED_RB
+    rgba = channels == 4
+    n_out = len(out)
+    out_pos = 0
+
+    if run_length:  # unfinished run from the previous portion of data
+        n_pixels = min(run_length, n_out // channels)
+        out[0:channels * n_pixels] = bytes((r, g, b, a)[:channels]) * n_pixels
+        out_pos = channels * n_pixels
+        run_length -= n_pixels
+
+    out_limit = n_out - channels + 1  # there is space for one more pixel while out_pos < out_limit
+    while pos < end and out_pos < out_limit:
+        byte = data[pos]
+        if byte < 0b01000000:  # QOI_INDEX
+            r, g, b, a = hash_array[byte]
+            pos += 1
+        elif byte < 0b10000000:  # QOI_DIFF_SMALL
+            r = (r + small_r[byte]) & 0xFF
+            g = (g + small_g[byte]) & 0xFF
+            b = (b + small_b[byte]) & 0xFF
+            pos += 1
+        elif byte < 0b11000000:  # QOI_DIFF_MED
+            if pos + 2 > end:
+                break
+            dg = byte - 0b10100000  # (byte & 0b111111) - 32
+            byte2 = data[pos + 1]
+            r = (r + dg + med_rb[byte2]) & 0xFF
+            g = (g + dg) & 0xFF
+            b = (b + dg + (byte2 & 0b1111) - 8) & 0xFF
+            pos += 2
+        elif byte == 0b11111110:  # QOI_RGB
+            if pos + 4 > end:
+                break
+            r, g, b = data[pos + 1], data[pos + 2], data[pos + 3]
+            pos += 4
+        elif byte == 0b11111111:  # QOI_RGBA
+            if pos + 5 > end:
+                break
+            r, g, b, a = data[pos + 1], data[pos + 2], data[pos + 3], data[pos + 4]
+            pos += 5
+        else:  # QOI_RUN, the rest of run is left in state if "out" is full
+            run_length = byte - 0b10111111
+            hash_array[(r * 3 + g * 5 + b * 7 + a * 11) & 63] = (r, g, b, a)
+            n_pixels = min(run_length, (n_out - out_pos) // channels)
+            run_end = out_pos + channels * n_pixels
+            out[out_pos:run_end] = bytes((r, g, b, a)[:channels]) * n_pixels
+            out_pos = run_end
+            run_length -= n_pixels
+            pos += 1
+            continue
+
+        hash_array[(r * 3 + g * 5 + b * 7 + a * 11) & 63] = (r, g, b, a)
+        out[out_pos] = r
+        out[out_pos + 1] = g
+        out[out_pos + 2] = b
+        if rgba:
+            out[out_pos + 3] = a
+        out_pos += channels
+
+    values[:5] = [r, g, b, a, run_length]
+    values[5:] = [(px[0] << 24) | (px[1] << 16) | (px[2] << 8) | px[3] for px in hash_array]
+    return pos, out_pos
+
+
+
+def encode_pixels(pixels: BytesBuffer, width: int, height: int, channels: int = 3, strict: bool = False) -> bytes:
+    """
+    Encode raw pixels into qoi bytes (header, chunks and end bytes)
+
+    :param pixels: any buffer with r, g, b (, a) bytes of each pixel, row by row
+                   (e.g. PIL.Image.tobytes() of RGB or RGBA image)
+    :param strict: follow QOI specification, see qoi_encoder.encode_array()
+    :return: content of qoi file
+    """
+    if channels not in (3, 4):
+        raise ValueError(f"Number of channels must be 3 or 4, got {channels}")
+    with memoryview(pixels) as data:
+        if data.nbytes != width * height * channels:
+            raise ValueError(f"Expected {width * height * channels} bytes of pixels, got {data.nbytes}")
+        chunks = encode_chunks_pure(data, channels, strict)
+    return b"".join([QOI_HEADER.pack(b"qoif", width, height, channels, 0), chunks, QOI_END])
+
+
+
+def decode_pixels(qoi_bytes: BytesBuffer, strict: bool = False) -> Tuple[int, int, int, bytearray]:
+    """
+    Decode qoi bytes into raw pixels
+
+    :param strict: file follows QOI specification, see qoi_decoder.decode_into()
+    :return: height, width, channels, pixels (r, g, b (, a) bytes of each pixel, row by row)
+    """
+    if len(qoi_bytes) < QOI_HEADER.size:
+        raise ValueError("File is too small to contain QOI header")
+    magic, width, height, channels, _ = QOI_HEADER.unpack_from(qoi_bytes)
+    if magic != b"qoif":
+        raise ValueError("There is no magic QOI bytes in the file header")
+    if channels not in (3, 4):
+        raise ValueError(f"Invalid number of channels in qoi header: {channels}")
+
+    pixels = bytearray(width * height * channels)
+    with memoryview(qoi_bytes) as data:
+        _, n_bytes = decode_chunks_pure(data.cast('B'), QOI_HEADER.size, len(data) - len(QOI_END),
+                                        pixels, PureState(strict), channels)
+    if n_bytes != len(pixels):
+        raise ValueError(f"Decoded {n_bytes // channels} pixels, but image size is {height}x{width}")
+    return height, width, channels, pixels
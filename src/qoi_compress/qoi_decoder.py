@@ -1,12 +1,30 @@
+import mmap
 import time
-from typing import Tuple
+import struct
+from typing import Callable, Optional, Tuple, Union, TYPE_CHECKING
 from pathlib import Path
 import numpy as np
 from qoi_compress.qoi_encoder import Pixel, ChunkType
 from qoi_compress.setup_logger import logger
 
+if TYPE_CHECKING:
+    from qoi_compress.cache import DecodedImageCache
+    from qoi_compress.stats import QoiStats
+
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
+QOI_HEADER_SIZE = 14
+QOI_END_SIZE = 8
+QOI_HEADER = struct.Struct(">4sIIBB")  # magic, width, height, channels, colorspace
+
+# content of qoi file (or its part) in any buffer, e.g. memory-mapped file
+QoiBuffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+# lookup tables: byte -> channel differences
+DIFF_SMALL_TABLE = [(((byte >> 4) & 0b11) - 2, ((byte >> 2) & 0b11) - 2, (byte & 0b11) - 2) 
+                    for byte in range(256)]
+DIFF_MED_TABLE = [((byte >> 4) - 8, (byte & 0b1111) - 8) for byte in range(256)]
+
 
 
 def decode_byte_part(byte: int, right_offset: int, bits_num: int) -> int:
@@ -57,19 +75,14 @@ def decode_diff_med(byte1: int, byte2: int) -> Tuple[int, ...]:
 
 
 
-def read_qoi_header(qoi_bytes: bytes) -> Tuple[int, ...]:
+def read_qoi_header(qoi_bytes: QoiBuffer) -> Tuple[int, ...]:
     """
     Read qoi header and return info about image
+    Works with any buffer (bytes, memoryview, mmap, ...) without copying it
     """
-    assert qoi_bytes[:4] == b'qoif', "There is no magic QOI bytes in the file header"
-    
-    width_bytes = qoi_bytes[4:8]
-    height_bytes = qoi_bytes[8:12]
-    channels = qoi_bytes[12]
-    colorspace = qoi_bytes[13]
-    
-    width = int.from_bytes(width_bytes, byteorder='big')
-    height = int.from_bytes(height_bytes, byteorder='big')
+    assert len(qoi_bytes) >= QOI_HEADER_SIZE, "File is too small to contain QOI header"
+    magic, width, height, channels, colorspace = QOI_HEADER.unpack_from(qoi_bytes)
+    assert magic == b'qoif', "There is no magic QOI bytes in the file header"
         
     return height, width, channels, colorspace
 
@@ -86,7 +99,9 @@ def decode(filename: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int, int]
     with open(filename, 'rb') as f:
         qoi_bytes = f.read()
         
-    height, width, _, _ = read_qoi_header(qoi_bytes)
+    height, width, channels, _ = read_qoi_header(qoi_bytes)
+    if channels != 3:
+        raise ValueError(f"Only 3-channel images are supported, got {channels} channels (use decode_array())")
     n = width * height
     m = len(qoi_bytes) - 8  # offset 8 - qoi end bytes
     
@@ -161,24 +176,295 @@ def decode(filename: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int, int]
             
     
     
-def run_decoder(qoi_filename: str) -> Tuple[np.ndarray, float]:
+class DecoderState:
+    """
+    State of QOI decoder between portions of qoi bytes, 
+    stored in a single int64 array to be passed to compiled engines:
+    previous pixel (r, g, b, a), number of pixels left in unfinished run, 
+    hash array (64 pixels packed into r << 24 | g << 16 | b << 8 | a)
+    
+    Strict state follows QOI specification: initial previous pixel is (0, 0, 0, 255)
+    """
+    def __init__(self, strict: bool = False):
+        self.strict = strict
+        self.values = np.zeros(5 + 64, dtype=np.int64)
+        if strict:
+            self.values[3] = 255
+        
+    @property
+    def prev_pixel(self) -> np.ndarray:
+        return self.values[0:4]
+    
+    @property
+    def run_length(self) -> int:
+        return int(self.values[4])
+        
+    @property
+    def hash_array(self) -> np.ndarray:
+        return self.values[5:]
+
+
+
+def decode_chunks(qoi_bytes: QoiBuffer, 
+                  pos: int, 
+                  end: int, 
+                  out: memoryview, 
+                  state: Optional[DecoderState] = None,
+                  channels: int = 3) -> Tuple[int, int]:
+    """
+    Table-driven QOI decoder algorithm, writes decoded pixels straight into "out"
+    Stops when "out" is full or at the first chunk which is not complete in qoi_bytes[pos:end]
+    
+    :param qoi_bytes: content of qoi file (or its part)
+    :param pos: position of the first chunk
+    :param end: position right after the last available chunk
+    :param out: flat writable uint8 buffer, "channels" bytes per pixel
+    :param state: decoder state after the previous chunks, updated in place (new state by default)
+    :param channels: 3 or 4 (RGBA)
+    :return: position of the first not decoded chunk, number of written bytes
+    """
+    if state is None:
+        state = DecoderState()
+    qoi_rgb = ChunkType.QOI_RGB.value
+    qoi_rgba = ChunkType.QOI_RGBA.value
+    rgba = channels == 4
+    r, g, b, a, run_length = state.values[:5].tolist()
+    hash_array = [((px >> 24) & 0xFF, (px >> 16) & 0xFF, (px >> 8) & 0xFF, px & 0xFF) 
+                  for px in state.hash_array.tolist()]
+    n_out = len(out)
+    out_pos = 0
+    
+    if run_length:  # unfinished run from the previous portion of qoi bytes
+        n_pixels = min(run_length, n_out // channels)
+        out[0:channels * n_pixels] = bytes((r, g, b, a)[:channels]) * n_pixels
+        out_pos = channels * n_pixels
+        run_length -= n_pixels
+    
+    out_limit = n_out - channels + 1  # there is space for one more pixel while out_pos < out_limit
+    while pos < end and out_pos < out_limit:
+        byte = qoi_bytes[pos]
+        tag = byte >> 6
+        
+        if byte == qoi_rgb:
+            if pos + 4 > end:
+                break
+            r, g, b = qoi_bytes[pos+1], qoi_bytes[pos+2], qoi_bytes[pos+3]
+            pos += 4
+
+        elif byte == qoi_rgba:
+            if pos + 5 > end:
+                break
+            r, g, b, a = qoi_bytes[pos+1], qoi_bytes[pos+2], qoi_bytes[pos+3], qoi_bytes[pos+4]
+            pos += 5
+            
+        elif tag == 0b11:  # QOI_RUN, the rest of run is left in state if "out" is full
+            run_length = (byte & 0b111111) + 1
+            hash_array[(r * 3 + g * 5 + b * 7 + a * 11) % 64] = (r, g, b, a)
+            n_pixels = min(run_length, (n_out - out_pos) // channels)
+            run_end = out_pos + channels * n_pixels
+            out[out_pos:run_end] = bytes((r, g, b, a)[:channels]) * n_pixels
+            out_pos = run_end
+            run_length -= n_pixels
+            pos += 1
+            continue
+        
+        elif tag == 0b00:  # QOI_INDEX
+            r, g, b, a = hash_array[byte]
+            pos += 1
+            
+        elif tag == 0b01:  # QOI_DIFF_SMALL
+            dr, dg, db = DIFF_SMALL_TABLE[byte]
+            r, g, b = (r + dr) & 0xFF, (g + dg) & 0xFF, (b + db) & 0xFF
+            pos += 1
+            
+        else:  # QOI_DIFF_MED
+            if pos + 2 > end:
+                break
+            dg = (byte & 0b111111) - 32
+            dr_dg, db_dg = DIFF_MED_TABLE[qoi_bytes[pos+1]]
+            r, g, b = (r + dg + dr_dg) & 0xFF, (g + dg) & 0xFF, (b + dg + db_dg) & 0xFF
+            pos += 2
+            
+        hash_array[(r * 3 + g * 5 + b * 7 + a * 11) % 64] = (r, g, b, a)
+        
+        out[out_pos] = r
+        out[out_pos+1] = g
+        out[out_pos+2] = b
+        if rgba:
+            out[out_pos+3] = a
+        out_pos += channels
+        
+    state.values[:5] = (r, g, b, a, run_length)
+    state.hash_array[:] = [(px[0] << 24) | (px[1] << 16) | (px[2] << 8) | px[3] for px in hash_array]
+    return pos, out_pos
+
+
+
+def resolve_engine(engine: str) -> str:
+    """
+    Replace decoder engine "auto" with the fastest available engine:
+    "numba" if numba is installed, "python" otherwise
+    """
+    if engine != "auto":
+        return engine
+    from qoi_compress.numba_engine import NUMBA_AVAILABLE
+    return "numba" if NUMBA_AVAILABLE else "python"
+
+
+
+def get_decode_func(engine: str = "auto") -> Callable[..., Tuple[int, int]]:
+    """
+    Return function which decodes qoi chunks, see decode_chunks()
+
+    :param engine: "python" - table-driven decoder (decode_chunks), 
+                   "numba" - compiled decoder (numba_engine.decode_chunks_numba),
+                   "pure" - packed-int decoder without numpy (pure_engine.decode_chunks_pure), for PyPy,
+                   "auto" - fastest available engine
+    """
+    engine = resolve_engine(engine)
+    if engine == "numba":
+        from qoi_compress.numba_engine import decode_chunks_numba
+        return decode_chunks_numba
+    elif engine == "pure":
+        from qoi_compress.pure_engine import decode_chunks_pure
+        return decode_chunks_pure
+    elif engine == "python":
+        return decode_chunks
+    else:
+        raise ValueError(f"Unknown decoder engine: {engine}")
+
+
+
+def prepare_output(out: Optional[np.ndarray], height: int, width: int, channels: int = 3) -> np.ndarray:
+    """
+    Return uint8 array with shape=(height, width, channels) to decode image into
+    
+    :param out: None - allocate new array, 
+                array with shape=(height, width, channels) - use it,
+                any other C-contiguous uint8 array which is large enough - use its beginning
+                (so the same buffer can be reused for images of different size)
+    """
+    shape = (height, width, channels)
+    if out is None:
+        return np.empty(shape, dtype=np.uint8)
+    if out.dtype != np.uint8 or not out.flags.c_contiguous or not out.flags.writeable:
+        raise ValueError("Output array must be writable C-contiguous uint8 array")
+    if out.shape == shape:
+        return out
+    if out.size < height * width * channels:
+        raise ValueError(f"Output array of size {out.size} is too small for image {height}x{width}x{channels}")
+    return out.reshape(-1)[:height * width * channels].reshape(shape)
+
+
+
+def decode_into(qoi_bytes: QoiBuffer, 
+                out: Optional[np.ndarray] = None, 
+                engine: str = "auto",
+                strict: bool = False) -> np.ndarray:
+    """
+    Decode content of qoi file into preallocated image "out"
+    
+    :param qoi_bytes: content of qoi file, any buffer (bytes, memoryview, mmap, ...), it is not copied
+    :param out: output array, see prepare_output()
+    :param engine: decoder engine, see get_decode_func()
+    :param strict: file follows QOI specification (written by qoi.h or by encoder with strict=True)
+    :return: decoded image, uint8 array with shape=(height, width, channels) (view of "out")
+    """
+    height, width, channels, _ = read_qoi_header(qoi_bytes)
+    if channels not in (3, 4):
+        raise ValueError(f"Invalid number of channels in qoi header: {channels}")
+    img_decoded = prepare_output(out, height, width, channels)
+    
+    decode_func = get_decode_func(engine)
+    with memoryview(qoi_bytes) as data, img_decoded.data as out_data:
+        _, n_bytes = decode_func(data.cast('B'), QOI_HEADER_SIZE, len(data) - QOI_END_SIZE, 
+                                 out_data.cast('B'), DecoderState(strict), channels)
+    
+    if n_bytes != img_decoded.size:
+        raise ValueError(f"Decoded {n_bytes // channels} pixels, but image size is {height}x{width}")
+    
+    return img_decoded
+
+
+
+def decode_array(qoi_bytes: QoiBuffer, 
+                 engine: str = "auto", 
+                 strict: bool = False, 
+                 out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Decode content of qoi file into image, no files involved
+    
+    :param qoi_bytes: content of qoi file, any buffer (bytes, bytearray, memoryview, mmap, ...), it is not copied
+    :param engine: decoder engine, see get_decode_func()
+    :param strict: file follows QOI specification, see decode_into()
+    :param out: output array to reuse, see prepare_output()
+    :return: decoded image, uint8 array with shape=(height, width, channels)
+    """
+    return decode_into(qoi_bytes, out, engine, strict)
+
+
+
+def decode_to_array(qoi_bytes: QoiBuffer, engine: str = "auto", strict: bool = False) -> np.ndarray:
+    """
+    Same as decode_array()
+    """
+    return decode_array(qoi_bytes, engine, strict)
+
+
+
+def decode_file(qoi_filename: str, 
+                out: Optional[np.ndarray] = None, 
+                engine: str = "auto",
+                strict: bool = False) -> np.ndarray:
+    """
+    Decode qoi file through memory mapping, file content is never copied into memory
+    
+    :param out: output array, see prepare_output()
+    :param engine: decoder engine, see get_decode_func()
+    :param strict: file follows QOI specification, see decode_into()
+    :return: decoded image, uint8 array with shape=(height, width, channels)
+    """
+    with open(qoi_filename, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as qoi_map:
+            return decode_into(qoi_map, out, engine, strict)
+            
+    
+    
+def run_decoder(qoi_filename: str, 
+                engine: str = "auto", 
+                out: Optional[np.ndarray] = None,
+                strict: bool = False,
+                stats: Optional["QoiStats"] = None,
+                cache: Optional["DecodedImageCache"] = None) -> Tuple[np.ndarray, float]:
     """
     Run qoi decode algorithm on image "qoi_filename" 
+
+    :param engine: decoder engine, see get_decode_func()
+    :param out: output array to reuse, see prepare_output()
+    :param strict: file follows QOI specification, see decode_into()
+    :param stats: statistics to fill in place (chunks and timing of phase "decode"),
+                  chunks are counted after decoding, so decoding time does not depend on it
+    :param cache: cache of decoded images, image is decoded only if it is not cached yet
+                  (engine and strict of cache are used, "out" is ignored, decoded image is read-only)
+    :return: decoded image (uint8 array with shape=(height, width, channels)) and decoding time
     """
-    start_time = time.time()
-    R_decoded, G_decoded, B_decoded, height, width = decode(qoi_filename)
-    end_time = time.time()
+    start_time = time.perf_counter()
+    if cache is not None:
+        img_decoded = cache.get_file(qoi_filename)
+    else:
+        img_decoded = decode_file(qoi_filename, out, engine, strict)
+    end_time = time.perf_counter()
     
     time_elapsed = end_time - start_time
-
-    # reshape decoded 1d arrays into image with 3 channels
-    img_decoded = np.zeros((height, width, 3), dtype=int)
-    img_decoded[:, :, 0] = R_decoded.reshape((height, width))
-    img_decoded[:, :, 1] = G_decoded.reshape((height, width))
-    img_decoded[:, :, 2] = B_decoded.reshape((height, width))
+    if stats is not None:
+        from qoi_compress.stats import collect_stats
+        with open(qoi_filename, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as qoi_map:
+                collect_stats(qoi_map, stats)
+        stats.timings["decode"] = time_elapsed
     
-    logger.debug(f"File {qoi_filename} decoded")
-    logger.debug(f"Decoding time: {1000 * time_elapsed:.3f} ms")
+    logger.debug("File %s decoded", qoi_filename)
+    logger.debug("Decoding time: %.3f ms", 1000 * time_elapsed)
         
     return img_decoded, time_elapsed
 
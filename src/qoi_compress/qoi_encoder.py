@@ -2,14 +2,20 @@ import os
 import io
 import time
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, TYPE_CHECKING
 from enum import Enum
 import numpy as np
-from qoi_compress.read_png import read_png
+from qoi_compress.readers import read_image
 from qoi_compress.setup_logger import logger
 
+if TYPE_CHECKING:
+    from qoi_compress.stats import QoiStats
+
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
+QOI_HEADER_SIZE = 14
+QOI_END_SIZE = 8
+
 
 class ChunkType(int, Enum):
     """Tags for qoi chuncks"""
@@ -18,6 +24,7 @@ class ChunkType(int, Enum):
     QOI_DIFF_MED = 0b10000000
     QOI_INDEX = 0b00000000
     QOI_RGB = 0b11111110
+    QOI_RGBA = 0b11111111
     EMPTY_BYTE = 0b00000000
     
     
@@ -34,19 +41,66 @@ class MagicBytes(int, Enum):
 class Pixel:
     """
     Class to store pixel channels values
+    Pixels of 3-channel images have alpha = 0, so alpha does not affect their hash
     """
-    def __init__(self, r: int, g: int, b: int):
+    __slots__ = ("r", "g", "b", "a")
+    
+    def __init__(self, r: int, g: int, b: int, a: int = 0):
         self.r = r
         self.g = g
         self.b = b
+        self.a = a
         
     def __eq__(self, other):
-        return (self.r == other.r) and (self.g == other.g) and (self.b == other.b)
+        return (self.r == other.r) and (self.g == other.g) and (self.b == other.b) and (self.a == other.a)
         
     def hash_value(self) -> int:
         """Hash function for QOI_INDEX"""
-        return (self.r * 3 + self.g * 5 + self.b * 7) % 64
-        # return (self.r * 3 + self.g * 5 + self.b * 7 + 255 * 11) % 64  # to compare
+        return (self.r * 3 + self.g * 5 + self.b * 7 + self.a * 11) % 64
+
+
+
+def wrap_diff(diff: int) -> int:
+    """
+    Channel difference modulo 256 in range [-128, 127], as in QOI specification
+    (e.g. 0 - 255 = 1, so pixel 0 after pixel 255 is encoded as a small difference)
+    """
+    return (diff + 128) % 256 - 128
+
+
+
+class EncoderState:
+    """
+    State of QOI encoder between portions of pixels (e.g. image rows), 
+    stored in a single int64 array to be passed to compiled engines:
+    previous pixel (r, g, b, a), length of unfinished run, 
+    hash array (64 pixels packed into r << 24 | g << 16 | b << 8 | a)
+    
+    Strict state follows QOI specification: initial previous pixel is (0, 0, 0, 255), 
+    alpha of 3-channel image is 255, channel differences wrap around modulo 256, 
+    black pixel can be an index hit
+    """
+    def __init__(self, strict: bool = False):
+        self.strict = strict
+        self.values = np.zeros(5 + 64, dtype=np.int64)
+        if strict:
+            self.values[3] = 255
+        
+    @property
+    def prev_pixel(self) -> np.ndarray:
+        return self.values[0:4]
+    
+    @property
+    def run_length(self) -> int:
+        return int(self.values[4])
+    
+    @run_length.setter
+    def run_length(self, value: int) -> None:
+        self.values[4] = value
+        
+    @property
+    def hash_array(self) -> np.ndarray:
+        return self.values[5:]
 
 
 
@@ -180,6 +234,27 @@ def encode_rgb(r_value: int, g_value: int, b_value: int) -> List[int]:
     
     return chunk
 
+
+
+def encode_rgba(r_value: int, g_value: int, b_value: int, a_value: int) -> List[int]:
+    """
+    Encode QOI_RGBA chunk
+
+    :param R: 8-bit red channel value
+    :param G: 8-bit green channel value
+    :param B: 8-bit blue channel value
+    :param A: 8-bit alpha channel value
+    :return: list of bytes encoding QOI_RGBA chunk
+    """
+    chunk = [ChunkType.QOI_RGBA.value]
+
+    for channel in [r_value, g_value, b_value, a_value]:
+        byte = ChunkType.EMPTY_BYTE.value
+        byte = encode_byte_part(value=channel, bits_num=8, right_offset=0, byte=byte)
+        chunk.append(byte)
+    
+    return chunk
+
     
 
 def write_chunk(chunk: List[int], file_content: io.BufferedWriter) -> None:
@@ -189,147 +264,323 @@ def write_chunk(chunk: List[int], file_content: io.BufferedWriter) -> None:
     :param chunk: list of bytes
     :param file: buffered binary stream of file
     """
-    for byte_val in chunk:
-        val_binary = byte_val.to_bytes(length=1, byteorder='big')
-        file_content.write(val_binary)
+    file_content.write(bytes(chunk))
 
 
 
-def write_qoi_header(image: np.ndarray, file_content: io.BufferedWriter) -> None:
+def put_chunk(chunk: List[int], buffer: bytearray, pos: int) -> int:
     """
-    Write qoi header bytes to file
+    Put bytes from single chunk to preallocated buffer
 
-    :param image: input image
-    :param f: buffered binary stream of file
+    :param chunk: list of bytes
+    :param buffer: preallocated output buffer
+    :param pos: position in buffer where chunk starts
+    :return: position in buffer right after the chunk
+    """
+    end = pos + len(chunk)
+    buffer[pos:end] = chunk
+    return end
+
+
+
+def qoi_header(image: np.ndarray) -> bytes:
+    """
+    Build qoi header bytes for given image
+
+    :param image: input image, shape=(height, width, channels)
     """
     height, width, channels = image.shape
-    
+    return make_qoi_header(height, width, channels)
+
+
+
+def make_qoi_header(height: int, width: int, channels: int) -> bytes:
+    """
+    Build qoi header bytes for image of given size
+    """
     channels = int(channels)
     colorspace = 0  # TODO
     magic_chunk = [MagicBytes.MAGIC_Q.value, MagicBytes.MAGIC_O.value, 
                    MagicBytes.MAGIC_I.value, MagicBytes.MAGIC_F.value]
     
-    height_binary = height.to_bytes(length=4, byteorder='big')
-    width_binary = width.to_bytes(length=4, byteorder='big')
+    height_binary = int(height).to_bytes(length=4, byteorder='big')
+    width_binary = int(width).to_bytes(length=4, byteorder='big')
     
-    write_chunk(magic_chunk, file_content)
-    file_content.write(width_binary)
-    file_content.write(height_binary)
-    file_content.write(channels.to_bytes(length=1, byteorder='big'))
-    file_content.write(colorspace.to_bytes(length=1, byteorder='big'))
+    return (bytes(magic_chunk) + width_binary + height_binary
+            + channels.to_bytes(length=1, byteorder='big')
+            + colorspace.to_bytes(length=1, byteorder='big'))
+
+
+
+def write_qoi_header(image: np.ndarray, file_content: io.BufferedWriter) -> None:
+    """
+    Write qoi header bytes to file
+
+    :param image: input image
+    :param f: buffered binary stream of file
+    """
+    file_content.write(qoi_header(image))
     
     
 
-def write_qoi_end(file_content: io.BufferedWriter) -> None:
+def qoi_end() -> bytes:
     """
-    Write qoi end bytes to file
+    Build qoi end bytes
     """
     end_chunk = [MagicBytes.FILE_END_0.value for i in range(7)]
     end_chunk.append(MagicBytes.FILE_END_1.value)
-    
-    write_chunk(end_chunk, file_content)
+    return bytes(end_chunk)
 
 
 
+def write_qoi_end(file_content: io.BufferedWriter) -> None:
+    """
+    Write qoi end bytes to file
+    """
+    file_content.write(qoi_end())
 
-def encode(R: List[int], 
-           G: List[int], 
-           B: List[int], 
-           file: io.BufferedWriter) -> None:
+
+
+def max_encoded_size(n_pixels: int, channels: int = 3) -> int:
+    """
+    Upper bound of qoi file size (header + chunks + end bytes) for image with "n_pixels" pixels,
+    each pixel takes at most one QOI_RGB chunk (QOI_RGBA chunk for 4-channel image)
+    """
+    return QOI_HEADER_SIZE + (channels + 1) * n_pixels + QOI_END_SIZE
+
+
+
+
+def encode_chunks(R: List[int], 
+                  G: List[int], 
+                  B: List[int], 
+                  buffer: bytearray,
+                  pos: int = 0,
+                  A: Optional[List[int]] = None,
+                  strict: bool = False) -> int:
     """
     QOI encoder algorithm
 
     :param R: list with R-channel values
     :param G: list with G-channel values
     :param B: list with B-channel values
-    :param file: encoded bytes
+    :param buffer: preallocated output buffer, large enough to store 4 bytes per pixel (5 bytes for RGBA)
+    :param pos: position in buffer where the first chunk is written
+    :param A: list with A-channel values for 4-channel image, None for 3-channel image
+    :param strict: follow QOI specification (see EncoderState), 
+                   by default black pixel is never an index hit and differences do not wrap around
+    :return: position in buffer right after the last written chunk
     """
     is_run = False
     run_length = 0
     hash_array = [Pixel(0, 0, 0) for i in range(64)]
-    cur_pixel = Pixel(0, 0, 0)
+    default_alpha = 255 if strict else 0
+    cur_pixel = Pixel(0, 0, 0, default_alpha)
     n = len(R)
 
     for i in range(n):
         prev_pixel = cur_pixel
-        cur_pixel = Pixel(R[i], G[i], B[i])
+        cur_pixel = Pixel(R[i], G[i], B[i], default_alpha if A is None else A[i])
         
         if cur_pixel == prev_pixel:
             is_run = True
             run_length += 1
             if run_length == 62:
                 run_chunk = encode_run(run_length)
-                write_chunk(run_chunk, file)
+                pos = put_chunk(run_chunk, buffer, pos)
                 run_length = 0
                 is_run = False        
             continue
         elif is_run:
             run_chunk = encode_run(run_length)
-            write_chunk(run_chunk, file)
+            pos = put_chunk(run_chunk, buffer, pos)
             run_length = 0
             is_run = False
         
         hash_index = cur_pixel.hash_value()
         
-        if hash_array[hash_index] == Pixel(0, 0, 0):
+        if not strict and hash_array[hash_index] == Pixel(0, 0, 0):
             hash_array[hash_index] = cur_pixel
             
         elif hash_array[hash_index] == cur_pixel:
             index_chunk = encode_index(hash_index)
-            write_chunk(index_chunk, file)
+            pos = put_chunk(index_chunk, buffer, pos)
             continue
         else:
             hash_array[hash_index] = cur_pixel  # update hash_index array 
+
+        if cur_pixel.a != prev_pixel.a:
+            rgba_chunk = encode_rgba(cur_pixel.r, cur_pixel.g, cur_pixel.b, cur_pixel.a)
+            pos = put_chunk(rgba_chunk, buffer, pos)
+            continue
             
         dr = cur_pixel.r - prev_pixel.r
         dg = cur_pixel.g - prev_pixel.g
         db = cur_pixel.b - prev_pixel.b
+        if strict:
+            dr, dg, db = wrap_diff(dr), wrap_diff(dg), wrap_diff(db)
                     
         if (-2 <= dr <= 1) and (-2 <= dg <= 1) and (-2 <= db <= 1):
             diff_small_chunk = encode_diff_small(dr, dg, db)
-            write_chunk(diff_small_chunk, file)
+            pos = put_chunk(diff_small_chunk, buffer, pos)
             continue
         
         if (-32 <= dg <= 31) and (-8 <= (dr-dg) <= 7) and (-8 <= (db-dg) <= 7):
             diff_med_chunk = encode_diff_med(dr, dg, db)
-            write_chunk(diff_med_chunk, file)
+            pos = put_chunk(diff_med_chunk, buffer, pos)
             continue
             
         rgb_chunk = encode_rgb(cur_pixel.r, cur_pixel.g, cur_pixel.b)
-        write_chunk(rgb_chunk, file)
+        pos = put_chunk(rgb_chunk, buffer, pos)
 
     # last run processing
     if is_run:
         run_chunk = encode_run(run_length)
-        write_chunk(run_chunk, file)
+        pos = put_chunk(run_chunk, buffer, pos)
         run_length = 0
         is_run = False
         
+    return pos
+
+
+
+def encode(R: List[int], 
+           G: List[int], 
+           B: List[int], 
+           file: io.BufferedWriter,
+           A: Optional[List[int]] = None) -> None:
+    """
+    QOI encoder algorithm, writes encoded chunks and qoi end bytes to file
+
+    :param R: list with R-channel values
+    :param G: list with G-channel values
+    :param B: list with B-channel values
+    :param file: encoded bytes
+    :param A: list with A-channel values for 4-channel image, None for 3-channel image
+    """
+    buffer = bytearray(5 * len(R))
+    pos = encode_chunks(R, G, B, buffer, A=A)
+    file.write(memoryview(buffer)[:pos])
     write_qoi_end(file)
+
+
+
+def resolve_engine(engine: str) -> str:
+    """
+    Replace encoder engine "auto" with the fastest available engine:
+    "numba" if numba is installed, "numpy" otherwise
+    """
+    if engine != "auto":
+        return engine
+    from qoi_compress.numba_engine import NUMBA_AVAILABLE
+    return "numba" if NUMBA_AVAILABLE else "numpy"
+
+
+
+def encode_array(image: np.ndarray, engine: str = "auto", strict: bool = False) -> bytes:
+    """
+    Encode image into qoi bytes (header, chunks and end bytes), no files involved
+    The whole stream is built in a single preallocated buffer
+
+    :param image: uint8 array (or PIL image), shape=(height, width, 3) or shape=(height, width, 4) for RGBA image,
+                  C-contiguous or strided (e.g. crop or channels view of a bigger array).
+                  Only "numba" engine reads it in place without copying, other engines make copies:
+                  "numpy" - int64 array of pixels (32 bytes per pixel) and temporary arrays of the same size,
+                  "pure" - contiguous copy of a strided image, "python" - lists of channel values
+    :param engine: "python" - per-pixel encoder (encode_chunks), 
+                   "numpy" - vectorized encoder (numpy_engine.encode_chunks_numpy),
+                   "numba" - compiled encoder (numba_engine.encode_chunks_numba),
+                   "pure" - packed-int encoder without numpy (pure_engine.encode_chunks_pure), for PyPy,
+                   "auto" - fastest available engine
+    :param strict: produce the same bytes as the reference encoder from QOI specification (qoi.h),
+                   such files must be decoded with strict=True
+    :return: content of qoi file
+    """
+    image = np.asarray(image)
+    if image.ndim != 3 or image.shape[2] not in (3, 4):
+        raise ValueError(f"Image must have shape (height, width, 3) or (height, width, 4), got {image.shape}")
+    if image.dtype != np.uint8:
+        raise ValueError(f"Image must be uint8 array, got {image.dtype}")
+    engine = resolve_engine(engine)
+    if engine == "numpy":
+        from qoi_compress.numpy_engine import encode_chunks_numpy
+        return qoi_header(image) + encode_chunks_numpy(image, EncoderState(strict)).tobytes() + qoi_end()
+    elif engine == "numba":
+        from qoi_compress.numba_engine import encode_chunks_numba
+        return qoi_header(image) + encode_chunks_numba(image, EncoderState(strict)).tobytes() + qoi_end()
+    elif engine == "pure":
+        from qoi_compress.pure_engine import encode_chunks_pure
+        chunks = encode_chunks_pure(np.ascontiguousarray(image).data, image.shape[2], strict)
+        return qoi_header(image) + bytes(chunks) + qoi_end()
+    elif engine != "python":
+        raise ValueError(f"Unknown encoder engine: {engine}")
     
+    height, width, channels = image.shape
+    R = np.ravel(image[:, :, 0]).tolist()
+    G = np.ravel(image[:, :, 1]).tolist()
+    B = np.ravel(image[:, :, 2]).tolist()
+    A = np.ravel(image[:, :, 3]).tolist() if channels == 4 else None
+    
+    buffer = bytearray(max_encoded_size(height * width, channels))
+    pos = put_chunk(list(qoi_header(image)), buffer, 0)
+    pos = encode_chunks(R, G, B, buffer, pos, A, strict)
+    pos = put_chunk(list(qoi_end()), buffer, pos)
+    
+    return bytes(memoryview(buffer)[:pos])
+
+
+
+def encode_to_bytes(image: np.ndarray, engine: str = "auto", strict: bool = False) -> bytes:
+    """
+    Same as encode_array()
+    """
+    return encode_array(image, engine, strict)
 
 
 
-def run_encoder(png_filename: str, qoi_filename: str) -> Tuple[str, float]:
+def run_encoder(png_filename: str, 
+                qoi_filename: str, 
+                engine: str = "auto", 
+                strict: bool = False,
+                stats: Optional["QoiStats"] = None,
+                checkpoint_rows: Optional[int] = None,
+                raw_shape: Optional[Tuple[int, int, int]] = None) -> Tuple[str, float]:
     """
     Run qoi encode algorithm on image "png_filename"
     Save encoded qoi image as "qoi_filename"
+
+    Input format is detected by the first bytes of file: png, .npy, PPM/PAM are supported, 
+    .npy and PPM/PAM files are memory-mapped and encoded without copying (see readers.read_image())
+
+    :param engine: encoder engine, see encode_array()
+    :param strict: follow QOI specification, see encode_array()
+    :param stats: statistics to fill in place (chunks and timings of phases "read_png", "encode", "write"),
+                  chunks are counted after encoding, so encoding time does not depend on it
+    :param checkpoint_rows: append checkpoint index every "checkpoint_rows" rows 
+                            for region.decode_region() and region.decode_thumbnail()
+    :param raw_shape: (height, width, channels) of raw pixels file without header
     """    
-    img, R, G, B = read_png(png_filename)
-    
-    # create empty qoi file with header (or replace existing)
-    file = open(qoi_filename, 'wb')
-    write_qoi_header(img, file)
-    file.close()
+    read_time = time.perf_counter()
+    img = read_image(png_filename, raw_shape)
     
-    start_time = time.time()
-    with open(qoi_filename, 'ab') as file:
-        encode(R, G, B, file)
-    end_time = time.time()
+    start_time = time.perf_counter()
+    qoi_bytes = encode_array(img, engine=engine, strict=strict)
+    if checkpoint_rows is not None:
+        from qoi_compress.region import add_checkpoints
+        qoi_bytes = add_checkpoints(qoi_bytes, checkpoint_rows, strict=strict)
+    write_time = time.perf_counter()
+    with open(qoi_filename, 'wb') as file:
+        file.write(qoi_bytes)
+    end_time = time.perf_counter()
         
     time_elapsed = end_time - start_time
-    logger.debug(f"Image encoded and saved as {qoi_filename}")
-    logger.debug(f"Encoding time: {1000 * time_elapsed:.3f} ms")
+    if stats is not None:
+        from qoi_compress.stats import collect_stats
+        collect_stats(qoi_bytes, stats)
+        stats.timings.update(read_png=start_time - read_time, encode=write_time - start_time, 
+                             write=end_time - write_time)
+    logger.debug("Image encoded and saved as %s", qoi_filename)
+    logger.debug("Encoding time: %.3f ms", 1000 * time_elapsed)
         
     return qoi_filename, time_elapsed
     
@@ -1,7 +1,22 @@
 from typing import Tuple, List
 import numpy as np
-import matplotlib.pyplot as plt  # type: ignore
-from PIL import Image  # type: ignore
+
+
+def read_png_array(path_to_png: str) -> np.ndarray:
+    """
+    Read .png image without splitting it into channels
+    Images with alpha channel (or transparency) are read as RGBA, other images as RGB
+    
+    :return: img - uint8 array, shape=(heigth, width, 3) or shape=(heigth, width, 4) for RGBA image
+    """
+    from PIL import Image  # type: ignore  # imported on first use, it is slow to import
+
+    with Image.open(path_to_png) as img:
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+        mode = "RGBA" if has_alpha else "RGB"
+        if img.mode != mode:
+            return np.asarray(img.convert(mode))
+        return np.asarray(img)
 
 
 def read_png(path_to_png: str, 
@@ -11,12 +26,11 @@ def read_png(path_to_png: str,
     Read .png image and return flatten array of each channel
     Draw image and flatten image if required
     
-    :return: 1) img - original image, shape=(heigth, width, 3)
+    :return: 1) img - original image, shape=(heigth, width, 3) or shape=(heigth, width, 4)
              2) R_flat - flatten 1d array of R-cahnnel pixel values, shape=(heigth*width,)
              3) G_flat, B_flat - analogically to R_flat
     """
-    img = np.asarray(Image.open(path_to_png))
-    img = img[:, :, :3]
+    img = read_png_array(path_to_png)
     
     R = img[:, :, 0].astype(int)
     G = img[:, :, 1].astype(int)
@@ -26,6 +40,8 @@ def read_png(path_to_png: str,
     B_flat = np.ravel(B)
     
     height, width = img.shape[0], img.shape[1]
+    if draw_img or draw_flatten_img:
+        import matplotlib.pyplot as plt  # type: ignore  # only for debug plots, it is slow to import
     if draw_img:
         plt.imshow(img)
         plt.title(f"Image {height}x{width}")
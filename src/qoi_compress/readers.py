@@ -0,0 +1,177 @@
+"""
+Input readers: images are memory-mapped and returned as uint8 views of the file,
+so the encoder reads pixels straight from the page cache without intermediate copies
+
+Supported formats (detected by the first bytes of file):
+    .npy - uint8 array with shape (height, width, 3) or (height, width, 4)
+    PPM (P6) and PAM (P7) with maxval 255
+    PNG - decoded by PIL (not memory-mapped)
+    raw RGB/RGBA dumps - no header, shape must be given
+    any other format of PIL (JPEG, BMP, ...) - if format is not detected and shape of raw dump is not given
+
+Other formats are added with register_reader()
+"""
+import mmap
+from typing import Callable, List, NamedTuple, Optional, Tuple, Union
+import numpy as np
+from qoi_compress.read_png import read_png_array
+
+NPY_MAGIC = b"\x93NUMPY"
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+DETECT_SIZE = 16  # number of first bytes of file passed to "detect" functions
+
+
+class ImageReader(NamedTuple):
+    """Reader of image format"""
+    name: str
+    detect: Callable[[bytes], bool]  # first DETECT_SIZE bytes of file -> is it this format
+    read: Callable[[str], np.ndarray]  # path -> uint8 array, shape=(height, width, channels)
+
+
+
+def map_file(path: str, offset: int, shape: Tuple[int, ...]) -> np.ndarray:
+    """
+    Memory-map part of file as read-only uint8 array (without copying)
+    """
+    array = np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=shape)
+    return np.asarray(array)  # plain ndarray view, memory map is kept alive by it
+
+
+
+def read_npy(path: str) -> np.ndarray:
+    """
+    Memory-map .npy file
+    """
+    return np.asarray(np.load(path, mmap_mode='r', allow_pickle=False))
+
+
+
+def read_raw(path: str, shape: Tuple[int, int, int]) -> np.ndarray:
+    """
+    Memory-map raw dump of pixels (r, g, b (, a) bytes of each pixel, row by row, no header)
+
+    :param shape: (height, width, channels)
+    """
+    height, width, channels = shape
+    with open(path, 'rb') as file:
+        file.seek(0, 2)
+        file_size = file.tell()
+    if file_size != height * width * channels:
+        raise ValueError(f"Raw file {path} has {file_size} bytes, expected {height * width * channels} "
+                         f"for image {height}x{width}x{channels}")
+    return map_file(path, 0, shape)
+
+
+
+def parse_pnm_header(data: Union[bytes, bytearray, mmap.mmap]) -> Tuple[int, int, int, int]:
+    """
+    Parse header of PPM (P6) or PAM (P7) image
+
+    :return: height, width, channels, size of header
+    """
+    magic = bytes(data[:2])
+    if magic == b"P6":
+        values: List[int] = []
+        pos = 2
+        while len(values) < 3:
+            while pos < len(data) and data[pos:pos + 1].isspace():
+                pos += 1
+            if data[pos:pos + 1] == b"#":  # comment till the end of line
+                pos = data.find(b"\n", pos)
+                if pos < 0:
+                    raise ValueError("Invalid PPM header")
+                continue
+            start = pos
+            while pos < len(data) and data[pos:pos + 1].isdigit():
+                pos += 1
+            if start == pos:
+                raise ValueError("Invalid PPM header")
+            values.append(int(data[start:pos]))
+        width, height, maxval = values
+        channels = 3
+        header_size = pos + 1  # single whitespace after maxval
+    elif magic == b"P7":
+        end = data.find(b"ENDHDR\n")
+        if end < 0:
+            raise ValueError("Invalid PAM header")
+        fields = {}
+        for line in bytes(data[3:end]).splitlines():
+            if line and not line.startswith(b"#"):
+                key, _, value = line.partition(b" ")
+                fields[key] = value.strip()
+        width, height = int(fields[b"WIDTH"]), int(fields[b"HEIGHT"])
+        channels, maxval = int(fields[b"DEPTH"]), int(fields[b"MAXVAL"])
+        header_size = end + len(b"ENDHDR\n")
+    else:
+        raise ValueError("There is no magic bytes of PPM or PAM image")
+
+    if maxval != 255:
+        raise ValueError(f"Only 8-bit PPM/PAM images are supported, maxval is {maxval}")
+    if channels not in (3, 4):
+        raise ValueError(f"Only RGB and RGBA PAM images are supported, depth is {channels}")
+    return height, width, channels, header_size
+
+
+
+def read_ppm(path: str) -> np.ndarray:
+    """
+    Memory-map PPM (P6) or PAM (P7) image
+    """
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            height, width, channels, header_size = parse_pnm_header(data)
+    return map_file(path, header_size, (height, width, channels))
+
+
+
+READERS: List[ImageReader] = [
+    ImageReader("npy", lambda head: head.startswith(NPY_MAGIC), read_npy),
+    ImageReader("ppm", lambda head: head[:2] in (b"P6", b"P7") and head[2:3].isspace(), read_ppm),
+    ImageReader("png", lambda head: head.startswith(PNG_MAGIC), read_png_array),
+]
+
+
+
+def register_reader(name: str, detect: Callable[[bytes], bool], read: Callable[[str], np.ndarray]) -> None:
+    """
+    Add reader of image format, it is tried before the built-in readers
+
+    :param detect: first DETECT_SIZE bytes of file -> True if file has this format
+    :param read: path -> uint8 array, shape=(height, width, 3) or (height, width, 4)
+    """
+    READERS.insert(0, ImageReader(name, detect, read))
+
+
+
+def detect_format(path: str) -> Optional[str]:
+    """
+    :return: name of reader of file, None if format is unknown
+    """
+    with open(path, 'rb') as file:
+        head = file.read(DETECT_SIZE)
+    for reader in READERS:
+        if reader.detect(head):
+            return reader.name
+    return None
+
+
+
+def read_image(path: str, raw_shape: Optional[Tuple[int, int, int]] = None) -> np.ndarray:
+    """
+    Read image of any supported format, format is detected by the first bytes of file
+
+    :param raw_shape: (height, width, channels) of raw dump, used if format is not detected
+                      (file is read by PIL if it is None)
+    :return: uint8 array, shape=(height, width, 3) or (height, width, 4), memory-mapped when possible
+    :raises ValueError: if format is unknown to PIL too and raw_shape is not given
+    """
+    name = detect_format(path)
+    for reader in READERS:
+        if reader.name == name:
+            return reader.read(path)
+    if raw_shape is not None:
+        return read_raw(path, raw_shape)
+    try:
+        return read_png_array(path)  # PIL detects other formats itself
+    except OSError as error:  # PIL.UnidentifiedImageError
+        raise ValueError(f"Unknown format of {path}, raw_shape must be given for raw pixels") from error
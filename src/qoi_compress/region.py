@@ -0,0 +1,325 @@
+"""
+Decoding of image region and thumbnail with a checkpoint index
+
+Checkpoint is the decoder state at the beginning of every K-th row: position of the next chunk,
+previous pixel, unfinished run and hash array. Decoding can start from any checkpoint,
+so rows before the nearest checkpoint are never decoded
+
+Checkpoint index is stored as a trailer after qoi end bytes (plain decoders stop at the last pixel
+and ignore it) or in a sidecar file "<qoi_filename>.idx". Layout of index (big-endian):
+    magic "qoiC", rows per checkpoint (4 bytes), number of checkpoints N (4 bytes),
+    size (8 bytes) and CRC-32 (4 bytes) of qoi stream the index was built for,
+    N checkpoints: position (8 bytes), previous pixel (4 bytes), run length (1 byte), hash array (64 x 4 bytes)
+Trailer is followed by its size (8 bytes) and magic "qoiC"
+
+Index is checked against qoi stream when it is read, so a stale sidecar of a rewritten image is rejected
+"""
+import os
+import mmap
+import struct
+import zlib
+from typing import NamedTuple, Optional
+import numpy as np
+from qoi_compress.qoi_decoder import (DecoderState, QOI_END_SIZE, QOI_HEADER_SIZE, QoiBuffer,
+                                      get_decode_func, read_qoi_header)
+
+CHECKPOINTS_MAGIC = b"qoiC"
+CHECKPOINTS_HEADER = struct.Struct(">4sIIQI")
+CHECKPOINTS_FOOTER = struct.Struct(">Q4s")
+CHECKPOINT_DTYPE = np.dtype([("pos", ">u8"), ("pixel", "u1", 4), ("run", "u1"), ("hash", ">u4", 64)])
+SIDECAR_SUFFIX = ".idx"
+
+
+class CheckpointIndex(NamedTuple):
+    """Decoder states at rows 0, K, 2K, ..."""
+    rows_per_checkpoint: int
+    checkpoints: np.ndarray  # structured array of CHECKPOINT_DTYPE
+    stream_size: int  # size of qoi stream (without trailer)
+    stream_crc: int  # CRC-32 of qoi stream
+
+
+
+def pack_checkpoints(index: CheckpointIndex) -> bytes:
+    return (CHECKPOINTS_HEADER.pack(CHECKPOINTS_MAGIC, index.rows_per_checkpoint, len(index.checkpoints),
+                                    index.stream_size, index.stream_crc)
+            + index.checkpoints.tobytes())
+
+
+
+def unpack_checkpoints(data: QoiBuffer) -> CheckpointIndex:
+    """
+    :raises ValueError: if data is not a checkpoint index
+    """
+    if len(data) < CHECKPOINTS_HEADER.size or bytes(data[:4]) != CHECKPOINTS_MAGIC:
+        raise ValueError("There is no magic bytes of checkpoint index")
+    _, rows_per_checkpoint, n_checkpoints, stream_size, stream_crc = CHECKPOINTS_HEADER.unpack_from(data)
+    if rows_per_checkpoint < 1:
+        raise ValueError(f"Invalid rows per checkpoint in checkpoint index: {rows_per_checkpoint}")
+    if len(data) != CHECKPOINTS_HEADER.size + n_checkpoints * CHECKPOINT_DTYPE.itemsize:
+        raise ValueError("Checkpoint index is truncated")
+    checkpoints = np.frombuffer(data, dtype=CHECKPOINT_DTYPE, offset=CHECKPOINTS_HEADER.size)
+    return CheckpointIndex(rows_per_checkpoint, checkpoints, stream_size, stream_crc)
+
+
+
+def trailer_size(qoi_bytes: QoiBuffer) -> int:
+    """
+    Size of checkpoint trailer at the end of qoi bytes (with its footer), 0 if there is no trailer
+    """
+    if len(qoi_bytes) < CHECKPOINTS_FOOTER.size or bytes(qoi_bytes[-4:]) != CHECKPOINTS_MAGIC:
+        return 0
+    size, _ = CHECKPOINTS_FOOTER.unpack_from(qoi_bytes, len(qoi_bytes) - CHECKPOINTS_FOOTER.size)
+    return size + CHECKPOINTS_FOOTER.size
+
+
+
+def strip_checkpoints(qoi_bytes: QoiBuffer) -> memoryview:
+    """
+    Plain qoi stream without checkpoint trailer (without copying)
+    """
+    return memoryview(qoi_bytes)[:len(qoi_bytes) - trailer_size(qoi_bytes)]
+
+
+
+class CheckpointReader:
+    """
+    Decoder of qoi stream row by row, which can jump to a checkpoint
+    """
+    def __init__(self, qoi_bytes: QoiBuffer, engine: str = "auto", strict: bool = False):
+        self.height, self.width, self.channels, _ = read_qoi_header(qoi_bytes)
+        if self.channels not in (3, 4):
+            raise ValueError(f"Invalid number of channels in qoi header: {self.channels}")
+        self.data = strip_checkpoints(qoi_bytes).cast('B')
+        self.row_size = self.width * self.channels
+        self.end = len(self.data) - QOI_END_SIZE
+        self.decode_func = get_decode_func(engine)
+        self.state = DecoderState(strict)
+        self.pos = QOI_HEADER_SIZE
+        self.row = 0
+        self.scratch: Optional[np.ndarray] = None
+
+
+    def release(self) -> None:
+        """
+        Release buffer of qoi bytes (mmap can't be closed while it is exported)
+        """
+        self.data.release()
+
+
+    def __enter__(self) -> "CheckpointReader":
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.release()
+
+
+    def checkpoint(self) -> np.ndarray:
+        """
+        Current decoder state as a checkpoint
+        """
+        checkpoint = np.zeros((), dtype=CHECKPOINT_DTYPE)
+        checkpoint["pos"] = self.pos
+        checkpoint["pixel"] = self.state.prev_pixel
+        checkpoint["run"] = self.state.run_length
+        checkpoint["hash"] = self.state.hash_array
+        return checkpoint
+
+
+    def seek(self, checkpoint: np.ndarray, row: int) -> None:
+        """
+        Restore decoder state from checkpoint of "row"
+        """
+        self.pos = int(checkpoint["pos"])
+        self.state.prev_pixel[:] = checkpoint["pixel"]
+        self.state.values[4] = checkpoint["run"]
+        self.state.hash_array[:] = checkpoint["hash"]
+        self.row = row
+
+
+    def read_rows(self, out: np.ndarray) -> None:
+        """
+        Decode next len(out) rows into "out" (uint8 array, shape=(n_rows, width, channels), C-contiguous)
+        """
+        n_rows = len(out)
+        if self.row + n_rows > self.height:
+            raise ValueError(f"Rows {self.row}...{self.row + n_rows - 1} are out of image of height {self.height}")
+        with out.data as out_data:
+            self.pos, n_bytes = self.decode_func(self.data, self.pos, self.end, out_data.cast('B'),
+                                                 self.state, self.channels)
+        if n_bytes != n_rows * self.row_size:
+            raise ValueError(f"Unexpected end of qoi stream at row {self.row + n_bytes // max(self.row_size, 1)}")
+        self.row += n_rows
+
+
+    def skip_rows(self, n_rows: int, block_rows: int = 64) -> None:
+        """
+        Decode next "n_rows" rows into a temporary block and drop them
+        """
+        if self.scratch is None:
+            self.scratch = np.empty((block_rows, self.width, self.channels), dtype=np.uint8)
+        while n_rows > 0:
+            n = min(n_rows, len(self.scratch))
+            self.read_rows(self.scratch[:n])
+            n_rows -= n
+
+
+    def goto_row(self, row: int, index: Optional[CheckpointIndex]) -> None:
+        """
+        Move to "row": jump to the nearest checkpoint before it (if it is ahead) and skip the remaining rows
+        """
+        if index is not None:
+            i = min(row // index.rows_per_checkpoint, len(index.checkpoints) - 1)
+            checkpoint_row = i * index.rows_per_checkpoint
+            if checkpoint_row > self.row or row < self.row:
+                self.seek(index.checkpoints[i], checkpoint_row)
+        if row < self.row:
+            raise ValueError(f"Can not go back to row {row} without checkpoint index")
+        self.skip_rows(row - self.row)
+
+
+
+def build_checkpoints(qoi_bytes: QoiBuffer,
+                      rows_per_checkpoint: int = 64,
+                      engine: str = "auto",
+                      strict: bool = False) -> CheckpointIndex:
+    """
+    Decode qoi bytes and record decoder state every "rows_per_checkpoint" rows
+
+    :param strict: file follows QOI specification, see qoi_decoder.decode_into()
+    """
+    if rows_per_checkpoint < 1:
+        raise ValueError(f"Rows per checkpoint must be positive, got {rows_per_checkpoint}")
+    with strip_checkpoints(qoi_bytes) as qoi_stream:
+        stream_size, stream_crc = len(qoi_stream), zlib.crc32(qoi_stream)
+    with CheckpointReader(qoi_bytes, engine, strict) as reader:
+        checkpoints = np.zeros(-(-reader.height // rows_per_checkpoint), dtype=CHECKPOINT_DTYPE)
+        for i in range(len(checkpoints)):
+            checkpoints[i] = reader.checkpoint()
+            reader.skip_rows(min(rows_per_checkpoint, reader.height - reader.row), rows_per_checkpoint)
+    return CheckpointIndex(rows_per_checkpoint, checkpoints, stream_size, stream_crc)
+
+
+
+def add_checkpoints(qoi_bytes: QoiBuffer,
+                    rows_per_checkpoint: int = 64,
+                    engine: str = "auto",
+                    strict: bool = False) -> bytes:
+    """
+    Append checkpoint trailer to qoi bytes (an old trailer is replaced)
+
+    :return: qoi bytes with trailer, still readable by any qoi decoder
+    """
+    qoi_stream = strip_checkpoints(qoi_bytes)
+    index_bytes = pack_checkpoints(build_checkpoints(qoi_stream, rows_per_checkpoint, engine, strict))
+    return b"".join([qoi_stream, index_bytes, CHECKPOINTS_FOOTER.pack(len(index_bytes), CHECKPOINTS_MAGIC)])
+
+
+
+def write_checkpoints(qoi_filename: str,
+                      rows_per_checkpoint: int = 64,
+                      sidecar: bool = False,
+                      engine: str = "auto",
+                      strict: bool = False) -> None:
+    """
+    Add checkpoint index to existing qoi file
+
+    :param sidecar: write index into "<qoi_filename>.idx" and keep qoi file unchanged,
+                    otherwise append index to qoi file as a trailer
+    """
+    with open(qoi_filename, 'rb') as file:
+        qoi_bytes = file.read()
+    if sidecar:
+        index = build_checkpoints(strip_checkpoints(qoi_bytes), rows_per_checkpoint, engine, strict)
+        with open(qoi_filename + SIDECAR_SUFFIX, 'wb') as file:
+            file.write(pack_checkpoints(index))
+    else:
+        with open(qoi_filename, 'wb') as file:
+            file.write(add_checkpoints(qoi_bytes, rows_per_checkpoint, engine, strict))
+
+
+
+def read_checkpoints(qoi_bytes: QoiBuffer, qoi_filename: Optional[str] = None) -> Optional[CheckpointIndex]:
+    """
+    Read checkpoint index from trailer of qoi bytes or from sidecar file of "qoi_filename"
+
+    :return: None if there is no index
+    :raises ValueError: if index is malformed or was built for another qoi stream
+    """
+    size = trailer_size(qoi_bytes)
+    if size:
+        end = len(qoi_bytes) - CHECKPOINTS_FOOTER.size
+        index = unpack_checkpoints(bytes(qoi_bytes[end - size + CHECKPOINTS_FOOTER.size:end]))
+    elif qoi_filename is not None and os.path.exists(qoi_filename + SIDECAR_SUFFIX):
+        with open(qoi_filename + SIDECAR_SUFFIX, 'rb') as file:
+            index = unpack_checkpoints(file.read())
+    else:
+        return None
+
+    with strip_checkpoints(qoi_bytes) as qoi_stream:
+        if len(qoi_stream) != index.stream_size or zlib.crc32(qoi_stream) != index.stream_crc:
+            raise ValueError("Checkpoint index does not match qoi stream (image was changed after indexing)")
+    return index
+
+
+
+def decode_region(qoi_filename: str,
+                  y0: int,
+                  y1: Optional[int] = None,
+                  x0: int = 0,
+                  x1: Optional[int] = None,
+                  engine: str = "auto",
+                  strict: bool = False) -> np.ndarray:
+    """
+    Decode region [y0, y1) x [x0, x1) of qoi image
+    Decoding starts from the nearest checkpoint before row y0 (from the first row if there is no index)
+    and stops at row y1
+
+    :param engine: decoder engine, see qoi_decoder.get_decode_func()
+    :param strict: file follows QOI specification, see qoi_decoder.decode_into()
+    :return: uint8 array, shape=(y1 - y0, x1 - x0, channels)
+    """
+    with open(qoi_filename, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as qoi_map:
+            index = read_checkpoints(qoi_map, qoi_filename)
+            with CheckpointReader(qoi_map, engine, strict) as reader:
+                y1 = reader.height if y1 is None else y1
+                x1 = reader.width if x1 is None else x1
+                if not (0 <= y0 <= y1 <= reader.height and 0 <= x0 <= x1 <= reader.width):
+                    raise ValueError(f"Invalid region [{y0}, {y1}) x [{x0}, {x1}) "
+                                     f"of image {reader.height}x{reader.width}")
+
+                rows = np.empty((y1 - y0, reader.width, reader.channels), dtype=np.uint8)
+                if y1 > y0:
+                    reader.goto_row(y0, index)
+                    reader.read_rows(rows)
+
+    if x0 == 0 and x1 == rows.shape[1]:
+        return rows
+    return np.ascontiguousarray(rows[:, x0:x1])
+
+
+
+def decode_thumbnail(qoi_filename: str, scale: int, engine: str = "auto", strict: bool = False) -> np.ndarray:
+    """
+    Decode every "scale"-th row and column of qoi image (nearest neighbour downscaling)
+    With checkpoint index every "rows_per_checkpoint" <= scale rows only the rows
+    from the nearest checkpoint to each thumbnail row are decoded
+
+    :return: uint8 array, shape=(ceil(height / scale), ceil(width / scale), channels), equal to img[::scale, ::scale]
+    """
+    if scale < 1:
+        raise ValueError(f"Scale must be positive, got {scale}")
+    with open(qoi_filename, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as qoi_map:
+            index = read_checkpoints(qoi_map, qoi_filename)
+            with CheckpointReader(qoi_map, engine, strict) as reader:
+                row = np.empty((1, reader.width, reader.channels), dtype=np.uint8)
+                thumbnail = np.empty((-(-reader.height // scale), -(-reader.width // scale), reader.channels),
+                                     dtype=np.uint8)
+                for i, y in enumerate(range(0, reader.height, scale)):
+                    reader.goto_row(y, index)
+                    reader.read_rows(row)
+                    thumbnail[i] = row[0, ::scale]
+
+    return thumbnail
@@ -0,0 +1,314 @@
+"""
+Frame sequence container (video, screen capture): every frame is an independent qoi stream,
+frames between keyframes are encoded as a delta against the previous frame.
+Consecutive frames of static content are nearly identical, so their deltas are mostly zeros
+and are encoded by long QOI_RUN chunks
+
+Delta modes:
+    "none" - every frame is a keyframe
+    "xor" - delta = frame ^ previous frame
+    "sub" - delta = frame - previous frame (modulo 256)
+
+Container layout (big-endian):
+    magic "qoiV", width (4 bytes), height (4 bytes), channels (1 byte), colorspace (1 byte),
+    delta mode (1 byte), keyframe interval (4 bytes),
+    N qoi streams,
+    N + 1 offsets of frame streams from the beginning of container (8 bytes each),
+    offset of the first offset (8 bytes), number of frames N (4 bytes), magic "qoiV"
+
+Index of offsets is written after the frames, so frames are written to a stream
+as soon as they are captured (see SequenceWriter)
+"""
+import io
+import struct
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import numpy as np
+from qoi_compress.qoi_encoder import encode_array
+from qoi_compress.qoi_decoder import decode_into
+from qoi_compress.stripes import parallel_map
+
+SEQUENCE_MAGIC = b"qoiV"
+SEQUENCE_HEADER = struct.Struct(">4sIIBBBI")
+SEQUENCE_FOOTER = struct.Struct(">QI4s")
+SEQUENCE_OFFSET = struct.Struct(">Q")
+
+DELTA_MODES = ("none", "xor", "sub")
+
+
+class SequenceHeader(NamedTuple):
+    """Header and index of frame sequence container"""
+    width: int
+    height: int
+    channels: int
+    colorspace: int
+    delta: str
+    keyframe_interval: int
+    offsets: Tuple[int, ...]
+
+    @property
+    def n_frames(self) -> int:
+        return len(self.offsets) - 1
+
+    def is_keyframe(self, i: int) -> bool:
+        return self.delta == "none" or i % self.keyframe_interval == 0
+
+    def keyframe_of(self, i: int) -> int:
+        """Keyframe from which decoding of frame "i" starts"""
+        return i if self.delta == "none" else i - i % self.keyframe_interval
+
+
+
+def frame_delta(frame: np.ndarray, prev_frame: np.ndarray, delta: str) -> np.ndarray:
+    """
+    Delta of frame against previous frame, inverse of apply_delta()
+    """
+    if delta == "xor":
+        return np.bitwise_xor(frame, prev_frame)
+    elif delta == "sub":
+        return np.subtract(frame, prev_frame, dtype=np.uint8)
+    else:
+        raise ValueError(f"Unknown delta mode: {delta}")
+
+
+
+def apply_delta(delta_frame: np.ndarray, prev_frame: np.ndarray, delta: str) -> None:
+    """
+    Restore frame from its delta in place
+    """
+    if delta == "xor":
+        np.bitwise_xor(delta_frame, prev_frame, out=delta_frame)
+    elif delta == "sub":
+        np.add(delta_frame, prev_frame, out=delta_frame, dtype=np.uint8)
+    else:
+        raise ValueError(f"Unknown delta mode: {delta}")
+
+
+
+class SequenceWriter:
+    """
+    Encode frames one by one and write them to "sink" as soon as they are fed
+
+    Usage:
+        with open(filename, 'wb') as file, SequenceWriter(file, width, height) as writer:
+            for frame in ...:
+                writer.add_frame(frame)
+    """
+    def __init__(self,
+                 sink: BinaryIO,
+                 width: int,
+                 height: int,
+                 channels: int = 3,
+                 delta: str = "xor",
+                 keyframe_interval: int = 30,
+                 engine: str = "auto",
+                 strict: bool = False):
+        """
+        :param sink: writable binary stream, header is written right away
+        :param channels: 3 or 4 (RGBA)
+        :param delta: "none", "xor" or "sub", see DELTA_MODES
+        :param keyframe_interval: every keyframe_interval-th frame is a keyframe (encoded without delta),
+                                  frames can be decoded independently starting from the nearest keyframe
+        :param engine: encoder engine, see qoi_encoder.encode_array()
+        :param strict: follow QOI specification, see qoi_encoder.encode_array()
+        """
+        if channels not in (3, 4):
+            raise ValueError(f"Number of channels must be 3 or 4, got {channels}")
+        if delta not in DELTA_MODES:
+            raise ValueError(f"Unknown delta mode {delta}, choose from {DELTA_MODES}")
+        if keyframe_interval < 1:
+            raise ValueError(f"Keyframe interval must be positive, got {keyframe_interval}")
+        self.sink = sink
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.delta = delta
+        self.keyframe_interval = keyframe_interval
+        self.engine = engine
+        self.strict = strict
+        self.bytes_written = 0
+        self.offsets: List[int] = []
+        self.prev_frame: Optional[np.ndarray] = None
+        self.finished = False
+
+        self.write(SEQUENCE_HEADER.pack(SEQUENCE_MAGIC, width, height, channels, 0,
+                                        DELTA_MODES.index(delta), keyframe_interval))
+
+
+    @property
+    def n_frames(self) -> int:
+        return len(self.offsets)
+
+
+    def write(self, data) -> None:
+        self.sink.write(data)
+        self.bytes_written += len(data)
+
+
+    def add_frame(self, frame: np.ndarray) -> None:
+        """
+        Encode next frame
+
+        :param frame: uint8 array, shape=(height, width, channels)
+        """
+        if self.finished:
+            raise ValueError("Writer is already finished")
+        frame = np.asarray(frame)
+        if frame.shape != (self.height, self.width, self.channels):
+            raise ValueError(f"Frame must have shape {(self.height, self.width, self.channels)}, got {frame.shape}")
+
+        if self.delta == "none" or self.n_frames % self.keyframe_interval == 0:
+            qoi_bytes = encode_array(frame, self.engine, self.strict)
+        else:
+            assert self.prev_frame is not None  # the first frame is a keyframe
+            qoi_bytes = encode_array(frame_delta(frame, self.prev_frame, self.delta), self.engine, self.strict)
+        if self.delta != "none":
+            self.prev_frame = frame.copy()  # caller may reuse its buffer for the next frame
+
+        self.offsets.append(self.bytes_written)
+        self.write(qoi_bytes)
+
+
+    def finish(self) -> None:
+        """
+        Write index of frames
+        """
+        if self.finished:
+            return
+        index_offset = self.bytes_written
+        self.write(b"".join(SEQUENCE_OFFSET.pack(offset) for offset in self.offsets + [index_offset]))
+        self.write(SEQUENCE_FOOTER.pack(index_offset, self.n_frames, SEQUENCE_MAGIC))
+        self.prev_frame = None
+        self.finished = True
+
+
+    def __enter__(self) -> "SequenceWriter":
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.finish()
+
+
+
+def encode_sequence(frames: Iterable[np.ndarray],
+                    delta: str = "xor",
+                    keyframe_interval: int = 30,
+                    engine: str = "auto",
+                    strict: bool = False) -> bytes:
+    """
+    Encode frames into sequence container
+
+    :param frames: uint8 arrays of the same shape, (height, width, 3) or (height, width, 4)
+    :param delta: "none", "xor" or "sub", see DELTA_MODES
+    :param keyframe_interval: every keyframe_interval-th frame is encoded without delta
+    :return: content of container
+    """
+    frames = iter(frames)
+    first_frame = np.asarray(next(frames, None))
+    if first_frame.ndim != 3:
+        raise ValueError("Sequence must contain at least one frame with shape (height, width, channels)")
+    height, width, channels = first_frame.shape
+
+    sink = io.BytesIO()
+    with SequenceWriter(sink, width, height, channels, delta, keyframe_interval, engine, strict) as writer:
+        writer.add_frame(first_frame)
+        for frame in frames:
+            writer.add_frame(frame)
+    return sink.getvalue()
+
+
+
+def read_sequence_header(data: bytes) -> SequenceHeader:
+    """
+    Read header and index of frames of sequence container
+    """
+    if (len(data) < SEQUENCE_HEADER.size + SEQUENCE_FOOTER.size
+            or bytes(data[:4]) != SEQUENCE_MAGIC or bytes(data[-4:]) != SEQUENCE_MAGIC):
+        raise ValueError("There is no magic bytes of sequence container in the file header")
+
+    _, width, height, channels, colorspace, delta, keyframe_interval = SEQUENCE_HEADER.unpack_from(data)
+    index_offset, n_frames, _ = SEQUENCE_FOOTER.unpack_from(data, len(data) - SEQUENCE_FOOTER.size)
+    if delta >= len(DELTA_MODES):
+        raise ValueError(f"Unknown delta mode in sequence header: {delta}")
+    if keyframe_interval < 1:
+        raise ValueError(f"Invalid keyframe interval in sequence header: {keyframe_interval}")
+    offsets = tuple(SEQUENCE_OFFSET.unpack_from(data, index_offset + i * SEQUENCE_OFFSET.size)[0]
+                    for i in range(n_frames + 1))
+
+    return SequenceHeader(width, height, channels, colorspace, DELTA_MODES[delta], keyframe_interval, offsets)
+
+
+
+def get_frame_stream(data: bytes, header: SequenceHeader, i: int) -> memoryview:
+    """
+    Return qoi stream of frame "i" (without copying), it is a valid qoi file itself
+    (the frame itself for keyframes, delta against the previous frame otherwise)
+    """
+    return memoryview(data)[header.offsets[i]:header.offsets[i + 1]]
+
+
+
+def decode_sequence(data: bytes,
+                    start: int = 0,
+                    stop: Optional[int] = None,
+                    workers: Optional[int] = None,
+                    engine: str = "auto",
+                    strict: bool = False) -> np.ndarray:
+    """
+    Decode frames start...stop-1 of sequence container
+    Frame streams are decoded in parallel (starting from the keyframe of "start"),
+    then deltas are applied to the previous frames
+
+    :param workers: number of threads (os.cpu_count() by default)
+    :param engine: decoder engine, see qoi_decoder.get_decode_func()
+    :return: decoded frames, uint8 array with shape=(stop - start, height, width, channels)
+    """
+    header = read_sequence_header(data)
+    if stop is None:
+        stop = header.n_frames
+    if not 0 <= start <= stop <= header.n_frames:
+        raise ValueError(f"Invalid frames range [{start}, {stop}) for sequence of {header.n_frames} frames")
+
+    first = header.keyframe_of(start) if stop > start else start
+    frames = np.empty((stop - first, header.height, header.width, header.channels), dtype=np.uint8)
+
+    def decode_frame_stream(i: int) -> None:
+        decode_into(get_frame_stream(data, header, i), frames[i - first], engine, strict)
+
+    parallel_map(decode_frame_stream, range(first, stop), workers)
+    for i in range(first + 1, stop):
+        if not header.is_keyframe(i):
+            apply_delta(frames[i - first], frames[i - first - 1], header.delta)
+
+    return frames[start - first:]
+
+
+
+def decode_frame(data: bytes, i: int, engine: str = "auto", strict: bool = False) -> np.ndarray:
+    """
+    Decode a single frame "i" (frames from the nearest keyframe up to "i" are decoded)
+
+    :return: uint8 array, shape=(height, width, channels)
+    """
+    header = read_sequence_header(data)
+    if not 0 <= i < header.n_frames:
+        raise IndexError(f"Frame {i} is out of range, sequence has {header.n_frames} frames")
+    return decode_sequence(data, i, i + 1, workers=1, engine=engine, strict=strict)[0]
+
+
+
+def iter_frames(data: bytes, engine: str = "auto", strict: bool = False) -> Iterator[np.ndarray]:
+    """
+    Yield decoded frames one by one, only the previous frame is kept in memory
+    """
+    header = read_sequence_header(data)
+    prev_frame: Optional[np.ndarray] = None
+    for i in range(header.n_frames):
+        frame = np.empty((header.height, header.width, header.channels), dtype=np.uint8)
+        decode_into(get_frame_stream(data, header, i), frame, engine, strict)
+        if not header.is_keyframe(i):
+            assert prev_frame is not None  # the first frame is a keyframe
+            apply_delta(frame, prev_frame, header.delta)
+        yield frame
+        prev_frame = frame
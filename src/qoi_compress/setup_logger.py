@@ -1,10 +1,27 @@
+import os
 import logging
 
+LOG_FORMAT = '%(levelname)s - %(filename)s - %(funcName)s: %(message)s'
+
+# library is silent by default, see enable_logging()
 logger = logging.getLogger("qoi_logger")
-loglevel = "DEBUG"
-logger.setLevel(loglevel)
-handler = logging.StreamHandler()
-handler.setLevel(loglevel)
-format = '%(levelname)s - %(filename)s - %(funcName)s: %(message)s'
-handler.setFormatter(logging.Formatter(format))
-logger.addHandler(handler)
+logger.addHandler(logging.NullHandler())
+
+
+def enable_logging(loglevel: str = "DEBUG") -> logging.Handler:
+    """
+    Print log messages of qoi_compress with level "loglevel" and above to stderr
+    Logging can also be enabled with environment variable QOI_COMPRESS_LOGLEVEL=DEBUG
+
+    :return: added handler (can be removed with logger.removeHandler())
+    """
+    logger.setLevel(loglevel)
+    handler = logging.StreamHandler()
+    handler.setLevel(loglevel)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    logger.addHandler(handler)
+    return handler
+
+
+if os.environ.get("QOI_COMPRESS_LOGLEVEL"):
+    enable_logging(os.environ["QOI_COMPRESS_LOGLEVEL"].upper())
@@ -0,0 +1,134 @@
+"""
+Statistics of qoi stream: number and size of chunks of each type, run-length histogram,
+index hit rate and timings of processing phases
+
+Statistics are collected from encoded bytes after encoding (or before decoding),
+so encoder and decoder engines do not pay anything when statistics are not requested
+"""
+from typing import Dict, Optional, Union
+import numpy as np
+from qoi_compress.numba_engine import NUMBA_AVAILABLE
+from qoi_compress.qoi_decoder import QOI_END_SIZE, QOI_HEADER_SIZE, QoiBuffer, read_qoi_header
+from qoi_compress.region import trailer_size
+
+# chunk types in the order of counters
+OPCODES = ("QOI_RUN", "QOI_INDEX", "QOI_DIFF_SMALL", "QOI_DIFF_MED", "QOI_RGB", "QOI_RGBA")
+RUN, INDEX, DIFF_SMALL, DIFF_MED, RGB, RGBA = range(len(OPCODES))
+
+
+class QoiStats:
+    """
+    Statistics of a single qoi stream, filled in place by run_encoder(), run_decoder() and collect_stats()
+    """
+    def __init__(self):
+        self.counts = np.zeros(len(OPCODES), dtype=np.int64)  # number of chunks of each type
+        self.sizes = np.zeros(len(OPCODES), dtype=np.int64)  # bytes taken by chunks of each type
+        self.run_lengths = np.zeros(63, dtype=np.int64)  # run_lengths[k] - number of QOI_RUN chunks of length k
+        self.n_pixels = 0
+        self.timings: Dict[str, float] = {}  # seconds spent in each phase, e.g. "read_png", "encode", "write"
+
+
+    @property
+    def opcode_counts(self) -> Dict[str, int]:
+        return dict(zip(OPCODES, self.counts.tolist()))
+
+
+    @property
+    def opcode_bytes(self) -> Dict[str, int]:
+        return dict(zip(OPCODES, self.sizes.tolist()))
+
+
+    @property
+    def run_pixels(self) -> int:
+        """Number of pixels encoded by QOI_RUN chunks"""
+        return int(np.dot(self.run_lengths, np.arange(63)))
+
+
+    @property
+    def index_hit_rate(self) -> float:
+        """Part of pixels outside runs which are encoded as QOI_INDEX"""
+        n_lookups = self.n_pixels - self.run_pixels
+        return int(self.counts[INDEX]) / n_lookups if n_lookups else 0.0
+
+
+    def to_dict(self) -> Dict[str, object]:
+        """JSON-serializable representation"""
+        return {
+            "n_pixels": self.n_pixels,
+            "opcode_counts": self.opcode_counts,
+            "opcode_bytes": self.opcode_bytes,
+            "run_lengths": {k: n for k, n in enumerate(self.run_lengths.tolist()) if n},
+            "index_hit_rate": self.index_hit_rate,
+            "timings": dict(self.timings),
+        }
+
+
+    def __repr__(self) -> str:
+        return f"QoiStats({self.to_dict()})"
+
+
+
+def count_chunks(data: Union[np.ndarray, memoryview],
+                 pos: int,
+                 end: int,
+                 counts: np.ndarray,
+                 sizes: np.ndarray,
+                 run_lengths: np.ndarray) -> int:
+    """
+    Walk through chunks data[pos:end] and update counters in place
+
+    :return: number of pixels encoded by these chunks
+    """
+    n_pixels = 0
+    while pos < end:
+        byte = data[pos]
+        tag = byte >> 6
+        if byte == 0b11111110:
+            opcode, size = RGB, 4
+        elif byte == 0b11111111:
+            opcode, size = RGBA, 5
+        elif tag == 0b11:
+            opcode, size = RUN, 1
+            run_length = (byte & 0b111111) + 1
+            run_lengths[run_length] += 1
+            n_pixels += run_length - 1
+        elif tag == 0b00:
+            opcode, size = INDEX, 1
+        elif tag == 0b01:
+            opcode, size = DIFF_SMALL, 1
+        else:
+            opcode, size = DIFF_MED, 2
+        counts[opcode] += 1
+        sizes[opcode] += size
+        n_pixels += 1
+        pos += size
+    return n_pixels
+
+
+
+if NUMBA_AVAILABLE:
+    from numba import njit  # type: ignore
+    count_chunks = njit(cache=True, nogil=True)(count_chunks)
+
+
+
+def collect_stats(qoi_bytes: QoiBuffer, stats: Optional[QoiStats] = None) -> QoiStats:
+    """
+    Collect statistics of chunks of qoi file
+
+    :param qoi_bytes: content of qoi file, any buffer (bytes, memoryview, mmap, ...)
+    :param stats: statistics to update in place (timings are kept), new statistics by default
+    """
+    if stats is None:
+        stats = QoiStats()
+    read_qoi_header(qoi_bytes)
+    data = np.frombuffer(qoi_bytes, dtype=np.uint8)
+    data = data[:len(data) - trailer_size(qoi_bytes)]  # checkpoint index is not a part of qoi stream
+    # indexing of memoryview gives python ints, which is much faster without numba
+    chunks: Union[np.ndarray, memoryview] = data if NUMBA_AVAILABLE else data.data
+    stats.counts[:] = 0
+    stats.sizes[:] = 0
+    stats.run_lengths[:] = 0
+    stats.n_pixels = int(count_chunks(chunks, QOI_HEADER_SIZE, len(data) - QOI_END_SIZE,
+                                      stats.counts, stats.sizes, stats.run_lengths))
+    return stats
@@ -0,0 +1,276 @@
+import time
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, Tuple
+import numpy as np
+from qoi_compress.qoi_encoder import EncoderState, make_qoi_header, qoi_end, resolve_engine
+from qoi_compress.qoi_decoder import DecoderState, QOI_HEADER_SIZE, get_decode_func, read_qoi_header
+from qoi_compress.read_png import read_png_array
+from qoi_compress.setup_logger import logger
+
+
+def get_stateful_encode_func(engine: str = "auto") -> Callable[..., np.ndarray]:
+    """
+    Return encoder function which keeps its state between calls:
+    func(pixels, state, flush) -> chunks
+
+    :param engine: "numpy", "numba" or "auto" (per-pixel "python" engine has no state)
+    """
+    engine = resolve_engine(engine)
+    if engine == "numba":
+        from qoi_compress.numba_engine import encode_chunks_numba
+        return encode_chunks_numba
+    elif engine == "numpy":
+        from qoi_compress.numpy_engine import encode_chunks_numpy
+        return encode_chunks_numpy
+    else:
+        raise ValueError(f"Engine {engine} can not be used for streaming encoding")
+
+
+
+class StreamEncoder:
+    """
+    Encode image row by row without keeping the whole image in memory
+    Encoded bytes are written to "sink" as soon as rows are fed
+
+    Usage:
+        with open(qoi_filename, 'wb') as file, StreamEncoder(file, width, height) as encoder:
+            for rows in ...:
+                encoder.feed_rows(rows)
+    """
+    def __init__(self, 
+                 sink: BinaryIO, 
+                 width: int, 
+                 height: int, 
+                 engine: str = "auto", 
+                 channels: int = 3, 
+                 strict: bool = False):
+        """
+        :param sink: writable binary stream, header is written right away
+        :param width: image width
+        :param height: image height (number of rows which will be fed)
+        :param engine: encoder engine, see get_stateful_encode_func()
+        :param channels: 3 or 4 (RGBA)
+        :param strict: follow QOI specification, see qoi_encoder.encode_array()
+        """
+        if channels not in (3, 4):
+            raise ValueError(f"Number of channels must be 3 or 4, got {channels}")
+        self.encode_func = get_stateful_encode_func(engine)
+        self.sink = sink
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.rows_fed = 0
+        self.bytes_written = 0
+        self.state = EncoderState(strict)
+        self.finished = False
+
+        self.write(make_qoi_header(height, width, channels))
+
+
+    def write(self, data) -> None:
+        self.sink.write(data)
+        self.bytes_written += len(data)
+
+
+    def feed_rows(self, rows: np.ndarray) -> None:
+        """
+        Encode next rows of image
+
+        :param rows: uint8 array, shape=(n_rows, width, channels) or shape=(width, channels) for a single row
+        """
+        if self.finished:
+            raise ValueError("Encoder is already finished")
+        rows = np.asarray(rows)
+        if rows.ndim == 2:
+            rows = rows[np.newaxis]
+        if rows.ndim != 3 or rows.shape[1] != self.width or rows.shape[2] != self.channels:
+            raise ValueError(f"Rows must have shape (n_rows, {self.width}, {self.channels}), got {rows.shape}")
+        if self.rows_fed + rows.shape[0] > self.height:
+            raise ValueError(f"Too many rows, image height is {self.height}")
+
+        chunks = self.encode_func(rows, self.state, flush=False)
+        self.write(chunks.data)
+        self.rows_fed += rows.shape[0]
+
+
+    def finish(self) -> None:
+        """
+        Write unfinished run and qoi end bytes
+        """
+        if self.finished:
+            return
+        if self.rows_fed != self.height:
+            raise ValueError(f"Only {self.rows_fed} rows of {self.height} were fed")
+
+        chunks = self.encode_func(np.empty((0, self.channels), dtype=np.uint8), self.state, flush=True)
+        self.write(chunks.data)
+        self.write(qoi_end())
+        self.finished = True
+
+
+    def __enter__(self) -> "StreamEncoder":
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.finish()
+
+
+
+def encode_rows(rows_iter: Iterable[np.ndarray],
+                sink: BinaryIO,
+                width: int,
+                height: int,
+                engine: str = "auto",
+                channels: int = 3,
+                strict: bool = False) -> int:
+    """
+    Encode image given as iterable of rows portions and write it to "sink"
+
+    :return: number of written bytes
+    """
+    with StreamEncoder(sink, width, height, engine, channels, strict) as encoder:
+        for rows in rows_iter:
+            encoder.feed_rows(rows)
+    return encoder.bytes_written
+
+
+
+def run_stream_encoder(png_filename: str,
+                       qoi_filename: str,
+                       rows_per_feed: int = 64,
+                       engine: str = "auto") -> Tuple[str, float]:
+    """
+    Run qoi encode algorithm on image "png_filename" portion by portion of "rows_per_feed" rows
+    Save encoded qoi image as "qoi_filename"
+    """
+    img = read_png_array(png_filename)
+    height, width, channels = img.shape
+
+    start_time = time.time()
+    with open(qoi_filename, 'wb') as file:
+        encode_rows((img[y:y + rows_per_feed] for y in range(0, height, rows_per_feed)),
+                    file, width, height, engine, channels)
+    end_time = time.time()
+
+    time_elapsed = end_time - start_time
+    logger.debug("Image encoded and saved as %s", qoi_filename)
+    logger.debug("Encoding time: %.3f ms", 1000 * time_elapsed)
+
+    return qoi_filename, time_elapsed
+
+
+
+class StreamDecoder:
+    """
+    Decode qoi bytes portion by portion, completed image rows are returned as soon as they are decoded
+    Previous pixel, hash array and unfinished run are kept between portions
+
+    Usage:
+        decoder = StreamDecoder()
+        for data in ...:
+            rows = decoder.feed(data)  # uint8 array, shape=(n_rows, width, channels)
+    """
+    def __init__(self, rows_per_block: int = 64, engine: str = "auto", strict: bool = False):
+        """
+        :param rows_per_block: max number of rows decoded into one temporary block
+        :param engine: decoder engine, see qoi_decoder.get_decode_func()
+        :param strict: qoi bytes follow QOI specification, see qoi_decoder.decode_into()
+        """
+        self.decode_func = get_decode_func(engine)
+        self.rows_per_block = rows_per_block
+        self.buffer = bytearray()
+        self.state = DecoderState(strict)
+        self.header: Optional[Tuple[int, ...]] = None
+        self.height = 0
+        self.width = 0
+        self.channels = 3
+        self.rows_done = 0
+        self.partial_row = np.empty(0, dtype=np.uint8)  # decoded pixels of unfinished row
+
+
+    @property
+    def finished(self) -> bool:
+        return self.header is not None and self.rows_done == self.height
+
+
+    def read_header(self) -> bool:
+        """
+        Read qoi header from buffer if it is not read yet
+
+        :return: True if header is read
+        """
+        if self.header is None and len(self.buffer) >= QOI_HEADER_SIZE:
+            self.header = read_qoi_header(bytes(self.buffer[:QOI_HEADER_SIZE]))
+            self.height, self.width, self.channels, _ = self.header
+            if self.channels not in (3, 4):
+                raise ValueError(f"Invalid number of channels in qoi header: {self.channels}")
+            del self.buffer[:QOI_HEADER_SIZE]
+        return self.header is not None
+
+
+    def decode_block(self) -> np.ndarray:
+        """
+        Decode next rows from buffer (at most rows_per_block rows)
+
+        :return: completed rows, shape=(n_rows, width, channels)
+        """
+        row_size = self.channels * self.width
+        n_rows = min(self.rows_per_block, self.height - self.rows_done)
+        block = np.empty((n_rows, self.width, self.channels), dtype=np.uint8)
+        flat = block.reshape(-1)
+
+        n_partial = len(self.partial_row)
+        flat[:n_partial] = self.partial_row
+        pos, n_bytes = self.decode_func(self.buffer, 0, len(self.buffer), 
+                                        flat[n_partial:].data, self.state, self.channels)
+        del self.buffer[:pos]
+
+        n_bytes += n_partial
+        n_completed = n_bytes // row_size if row_size else n_rows
+        self.partial_row = flat[n_completed * row_size:n_bytes].copy()
+        self.rows_done += n_completed
+        return block[:n_completed]
+
+
+    def feed(self, data: bytes) -> np.ndarray:
+        """
+        Decode next portion of qoi bytes
+
+        :return: rows completed after this portion, uint8 array with shape=(n_rows, width, channels)
+        """
+        self.buffer += data
+        if not self.read_header():
+            return np.empty((0, 0, 3), dtype=np.uint8)
+
+        blocks = []
+        while not self.finished:
+            rows = self.decode_block()
+            if len(rows) == 0:
+                break
+            blocks.append(rows)
+
+        if len(blocks) == 1:
+            return blocks[0]
+        return np.concatenate(blocks) if blocks else np.empty((0, self.width, self.channels), dtype=np.uint8)
+
+
+
+def iter_decode_rows(stream: BinaryIO,
+                     read_size: int = 1 << 16,
+                     engine: str = "auto",
+                     strict: bool = False) -> Iterator[np.ndarray]:
+    """
+    Read qoi bytes from binary stream (file, socket.makefile('rb'), ...) and 
+    yield completed rows as soon as they are decoded
+
+    :raises ValueError: if stream ends before all rows are decoded
+    """
+    decoder = StreamDecoder(engine=engine, strict=strict)
+    while not decoder.finished:
+        data = stream.read(read_size)
+        if not data:
+            raise ValueError(f"Unexpected end of qoi stream, {decoder.rows_done} rows of {decoder.height} decoded")
+        rows = decoder.feed(data)
+        if len(rows):
+            yield rows
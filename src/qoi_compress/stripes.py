@@ -0,0 +1,217 @@
+"""
+Multi-stream container: image is split into horizontal stripes,
+each stripe is encoded as an independent qoi stream (with its own header and end bytes)
+
+Container layout (big-endian):
+    magic "qoiS", width (4 bytes), height (4 bytes), channels (1 byte), colorspace (1 byte),
+    stripe height (4 bytes), number of stripes N (4 bytes),
+    N + 1 offsets of stripes streams from the beginning of container (8 bytes each),
+    N qoi streams
+"""
+import time
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple, TypeVar
+import numpy as np
+from qoi_compress.qoi_encoder import encode_array
+from qoi_compress.qoi_decoder import QoiBuffer, decode_into, read_qoi_header
+from qoi_compress.read_png import read_png_array
+from qoi_compress.setup_logger import logger
+
+STRIPES_MAGIC = b"qoiS"
+STRIPES_HEADER = struct.Struct(">4sIIBBII")
+STRIPES_OFFSET = struct.Struct(">Q")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class StripesHeader(NamedTuple):
+    """Header of multi-stream container"""
+    width: int
+    height: int
+    channels: int
+    colorspace: int
+    stripe_height: int
+    offsets: Tuple[int, ...]
+
+    @property
+    def n_stripes(self) -> int:
+        return len(self.offsets) - 1
+
+    def stripe_rows(self, i: int) -> Tuple[int, int]:
+        """First and last+1 image rows of stripe "i" """
+        return i * self.stripe_height, min((i + 1) * self.stripe_height, self.height)
+
+
+
+def parallel_map(func: Callable[[T], R], items: Iterable[T], workers: Optional[int]) -> List[R]:
+    """
+    Apply "func" to "items" in a pool of "workers" threads (sequentially if workers == 1)
+    Compiled numba engine releases the GIL, so stripes are processed truly in parallel
+    """
+    if workers == 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, items))
+
+
+
+def read_stripes_header(data: bytes) -> StripesHeader:
+    """
+    Read header of multi-stream container
+    """
+    if len(data) < STRIPES_HEADER.size or data[:4] != STRIPES_MAGIC:
+        raise ValueError("There is no magic bytes of multi-stream container in the file header")
+
+    _, width, height, channels, colorspace, stripe_height, n_stripes = STRIPES_HEADER.unpack_from(data)
+    if stripe_height < 1:
+        raise ValueError(f"Invalid stripe height in container header: {stripe_height}")
+    if n_stripes != -(-height // stripe_height):
+        raise ValueError(f"Container has {n_stripes} stripes, expected {-(-height // stripe_height)} "
+                         f"for image height {height} and stripe height {stripe_height}")
+    offsets = tuple(STRIPES_OFFSET.unpack_from(data, STRIPES_HEADER.size + i * STRIPES_OFFSET.size)[0]
+                    for i in range(n_stripes + 1))
+
+    return StripesHeader(width, height, channels, colorspace, stripe_height, offsets)
+
+
+
+def check_stream_shape(qoi_bytes: QoiBuffer, shape: Tuple[int, int, int], name: str) -> None:
+    """
+    Check that qoi stream of a container part has the size given by container header,
+    otherwise it would be decoded into a part of its output rows
+
+    :param shape: expected (height, width, channels)
+    :param name: name of the part for error message
+    """
+    height, width, channels, _ = read_qoi_header(qoi_bytes)
+    if (height, width, channels) != shape:
+        raise ValueError(f"{name} has size {height}x{width}x{channels}, "
+                         f"container header gives {shape[0]}x{shape[1]}x{shape[2]}")
+
+
+
+def encode_stripes(image: np.ndarray,
+                   stripe_height: int = 256,
+                   workers: Optional[int] = None,
+                   engine: str = "auto") -> bytes:
+    """
+    Encode image into multi-stream container, stripes are encoded in parallel
+
+    :param image: input image, shape=(height, width, 3) or shape=(height, width, 4)
+    :param stripe_height: number of image rows in each stripe
+    :param workers: number of threads (os.cpu_count() by default)
+    :param engine: encoder engine, see qoi_encoder.encode_array()
+    :return: content of container
+    """
+    if stripe_height < 1:
+        raise ValueError(f"Stripe height must be positive, got {stripe_height}")
+    height, width, channels = image.shape
+    bounds = [(y0, min(y0 + stripe_height, height)) for y0 in range(0, height, stripe_height)]
+
+    streams = parallel_map(lambda rows: encode_array(image[rows[0]:rows[1]], engine=engine),
+                           bounds, workers)
+
+    offset = STRIPES_HEADER.size + (len(streams) + 1) * STRIPES_OFFSET.size
+    offsets = [offset]
+    for stream in streams:
+        offset += len(stream)
+        offsets.append(offset)
+
+    header = STRIPES_HEADER.pack(STRIPES_MAGIC, width, height, channels, 0, stripe_height, len(streams))
+    index = b"".join(STRIPES_OFFSET.pack(offset) for offset in offsets)
+    return b"".join([header, index] + streams)
+
+
+
+def get_stripe(data: bytes, header: StripesHeader, i: int) -> memoryview:
+    """
+    Return qoi stream of stripe "i" (without copying), it is a valid qoi file itself
+    """
+    return memoryview(data)[header.offsets[i]:header.offsets[i + 1]]
+
+
+
+def decode_stripes(data: bytes,
+                   y0: int = 0,
+                   y1: Optional[int] = None,
+                   workers: Optional[int] = None,
+                   engine: str = "auto") -> np.ndarray:
+    """
+    Decode rows y0...y1-1 of image from multi-stream container
+    Only the stripes covering these rows are decoded, stripes are decoded in parallel
+
+    :param workers: number of threads (os.cpu_count() by default)
+    :param engine: decoder engine, see qoi_decoder.get_decode_func()
+    :return: decoded rows, uint8 array with shape=(y1 - y0, width, channels)
+    """
+    header = read_stripes_header(data)
+    if y1 is None:
+        y1 = header.height
+    if not 0 <= y0 <= y1 <= header.height:
+        raise ValueError(f"Invalid rows range [{y0}, {y1}) for image of height {header.height}")
+
+    stripe_height = header.stripe_height
+    first, last = y0 // stripe_height, (y1 - 1) // stripe_height
+    row_start = first * stripe_height
+    img_decoded = np.empty((min((last + 1) * stripe_height, header.height) - row_start, 
+                            header.width, header.channels), dtype=np.uint8)
+
+    for i in range(header.n_stripes):
+        s0, s1 = header.stripe_rows(i)
+        check_stream_shape(get_stripe(data, header, i), (s1 - s0, header.width, header.channels), f"Stripe {i}")
+
+    def decode_stripe(i: int) -> None:
+        s0, s1 = header.stripe_rows(i)
+        decode_into(get_stripe(data, header, i), img_decoded[s0 - row_start:s1 - row_start], engine)
+
+    parallel_map(decode_stripe, range(first, last + 1) if y1 > y0 else [], workers)
+    return img_decoded[y0 - row_start:y1 - row_start]
+
+
+
+def stripes_to_qoi(data: bytes, engine: str = "auto") -> bytes:
+    """
+    Convert multi-stream container into plain qoi file
+    """
+    return encode_array(decode_stripes(data, engine=engine), engine=engine)
+
+
+
+def run_stripes_encoder(png_filename: str,
+                        stripes_filename: str,
+                        stripe_height: int = 256,
+                        workers: Optional[int] = None) -> Tuple[str, float]:
+    """
+    Encode image "png_filename" into multi-stream container and save it as "stripes_filename"
+    """
+    img = read_png_array(png_filename)
+
+    start_time = time.time()
+    data = encode_stripes(img, stripe_height, workers)
+    with open(stripes_filename, 'wb') as file:
+        file.write(data)
+    time_elapsed = time.time() - start_time
+
+    logger.debug("Image encoded and saved as %s", stripes_filename)
+    logger.debug("Encoding time: %.3f ms", 1000 * time_elapsed)
+
+    return stripes_filename, time_elapsed
+
+
+
+def run_stripes_decoder(stripes_filename: str, workers: Optional[int] = None) -> Tuple[np.ndarray, float]:
+    """
+    Decode multi-stream container "stripes_filename"
+    """
+    start_time = time.time()
+    with open(stripes_filename, 'rb') as file:
+        data = file.read()
+    img_decoded = decode_stripes(data, workers=workers)
+    time_elapsed = time.time() - start_time
+
+    logger.debug("File %s decoded", stripes_filename)
+    logger.debug("Decoding time: %.3f ms", 1000 * time_elapsed)
+
+    return img_decoded, time_elapsed
@@ -0,0 +1,159 @@
+import struct
+import asyncio
+import threading
+import unittest
+import numpy as np
+from qoi_compress import aio
+from qoi_compress.aio import QoiService, ServiceBusy
+from qoi_compress.qoi_encoder import encode_to_bytes
+
+
+class TestQoiService(unittest.IsolatedAsyncioTestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.img = (rng.integers(0, 4, size=(30, 40, 3)) * 50).astype(np.uint8)
+        self.release = threading.Event()
+        
+        
+    def tearDown(self):
+        self.release.set()
+        
+        
+    def blocking_job(self, value):
+        self.release.wait(10)
+        return value
+    
+    
+    async def test_round_trip(self):
+        async with QoiService(workers=2) as service:
+            results = await asyncio.gather(*(service.encode(self.img) for _ in range(5)))
+            self.assertEqual(results, [encode_to_bytes(self.img)] * 5)
+            img_decoded = await service.decode(results[0])
+            self.assertTrue(np.array_equal(img_decoded, self.img))
+            self.assertEqual(service.metrics.completed, 6)
+            self.assertEqual(service.metrics.in_flight, 0)
+            
+        qoi_bytes = await aio.encode(self.img, strict=True)
+        self.assertTrue(np.array_equal(await aio.decode(qoi_bytes, strict=True), self.img))
+        
+        
+    async def test_backpressure(self):
+        service = QoiService(workers=1, max_in_flight=1, max_waiting=1)
+        first = asyncio.ensure_future(service.run(self.blocking_job, 1))
+        second = asyncio.ensure_future(service.run(self.blocking_job, 2))
+        await asyncio.sleep(0.05)
+        self.assertEqual((service.metrics.in_flight, service.metrics.waiting), (1, 1))
+        
+        with self.assertRaises(ServiceBusy):
+            await service.run(self.blocking_job, 3)
+        self.assertEqual(service.metrics.rejected, 1)
+        
+        self.release.set()
+        self.assertEqual(await asyncio.gather(first, second), [1, 2])
+        self.assertEqual(service.metrics.completed, 2)
+        service.close()
+        
+        
+    async def test_several_event_loops(self):
+        service = QoiService(workers=1, max_in_flight=1)
+        first = asyncio.ensure_future(service.run(self.blocking_job, 1))
+        await asyncio.sleep(0.05)
+        
+        async def run_in_other_loop():
+            # the second request waits for the slot of its own loop
+            return await asyncio.gather(service.run(self.blocking_job, 2), service.run(self.blocking_job, 3))
+        
+        results = []
+        thread = threading.Thread(target=lambda: results.append(asyncio.run(run_in_other_loop())), daemon=True)
+        thread.start()
+        for _ in range(100):  # wait until the other loop has a request in flight and a waiting one
+            if service.metrics.waiting == 1 or not thread.is_alive():
+                break
+            await asyncio.sleep(0.02)
+        self.assertEqual(service.metrics.in_flight, 2)
+        self.release.set()
+        self.assertEqual(await first, 1)
+        await asyncio.get_running_loop().run_in_executor(None, thread.join, 5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(results, [[2, 3]])
+        self.assertEqual(service.metrics.completed, 3)
+        service.close()
+        
+        
+    async def test_timeout_and_cancellation(self):
+        service = QoiService(workers=1, max_in_flight=1)
+        with self.assertRaises(asyncio.TimeoutError):
+            await service.run(self.blocking_job, 1, timeout=0.05)
+        # the job is still running, so it still occupies its slot
+        self.assertEqual(service.metrics.in_flight, 1)
+        
+        waiting = asyncio.ensure_future(service.run(self.blocking_job, 2))
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        
+        self.release.set()
+        self.assertEqual(await service.run(self.blocking_job, 3, timeout=5), 3)
+        metrics = service.metrics
+        self.assertEqual((metrics.timed_out, metrics.cancelled, metrics.completed, metrics.in_flight), (1, 1, 1, 0))
+        service.close()
+        
+        
+    async def test_job_errors_and_busy_time(self):
+        def failing_job():
+            raise asyncio.TimeoutError("raised by the job itself")
+        
+        service = QoiService(workers=1, max_in_flight=2)
+        with self.assertRaises(asyncio.TimeoutError):
+            await service.run(failing_job, timeout=5)
+        self.assertEqual((service.metrics.failed, service.metrics.timed_out), (1, 0))
+        
+        # the second job waits in the pool queue while the first one runs, waiting is not busy time
+        first = asyncio.ensure_future(service.run(self.blocking_job, 1))
+        second = asyncio.ensure_future(service.run(self.blocking_job, 2))
+        await asyncio.sleep(0.3)
+        self.release.set()
+        self.assertEqual(await asyncio.gather(first, second), [1, 2])
+        self.assertGreater(service.metrics.busy_time, 0.25)
+        self.assertLess(service.metrics.busy_time, 0.45)
+        service.close()
+        
+        
+    async def test_local_server(self):
+        # stand-in of a service: request is height, width and raw RGB pixels, response is qoi bytes
+        service = QoiService(workers=2)
+        
+        async def handle(reader, writer):
+            height, width = struct.unpack(">II", await reader.readexactly(8))
+            pixels = await reader.readexactly(height * width * 3)
+            img = np.frombuffer(pixels, dtype=np.uint8).reshape((height, width, 3))
+            qoi_bytes = await service.encode(img, timeout=5)
+            writer.write(struct.pack(">I", len(qoi_bytes)) + qoi_bytes)
+            await writer.drain()
+            writer.close()
+            
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        
+        async def request():
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(struct.pack(">II", *self.img.shape[:2]) + self.img.tobytes())
+            size, = struct.unpack(">I", await reader.readexactly(4))
+            qoi_bytes = await reader.readexactly(size)
+            writer.close()
+            return qoi_bytes
+        
+        try:
+            responses = await asyncio.gather(*(request() for _ in range(4)))
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+        self.assertEqual(responses, [encode_to_bytes(self.img)] * 4)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
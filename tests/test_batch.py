@@ -0,0 +1,62 @@
+import os
+import shutil
+from pathlib import Path
+import unittest
+import numpy as np
+from PIL import Image  # type: ignore
+from qoi_compress.batch import convert_dir, convert_file, main
+from qoi_compress.qoi_decoder import run_decoder
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+class TestBatch(unittest.TestCase):
+    
+    def setUp(self):
+        self.dir_with_png = str(BASE_DIR / "data/batch_png")
+        self.dir_with_qoi = str(BASE_DIR / "data/batch_qoi")
+        shutil.rmtree(self.dir_with_png, ignore_errors=True)
+        shutil.rmtree(self.dir_with_qoi, ignore_errors=True)
+        os.makedirs(self.dir_with_png)
+        
+        rng = np.random.default_rng(2)
+        for i in range(3):
+            img = rng.integers(0, 256, size=(10 + i, 20, 3)).astype(np.uint8)
+            Image.fromarray(img).save(os.path.join(self.dir_with_png, f"img_{i}.png"))
+        with open(os.path.join(self.dir_with_png, "broken.png"), 'wb') as file:
+            file.write(b"not a png")
+        
+        
+    def test_convert_dir(self):
+        for workers in [1, 2]:
+            results = list(convert_dir(self.dir_with_png, self.dir_with_qoi, workers=workers))
+            
+            self.assertEqual(len(results), 4)
+            failed = [result for result in results if not result.ok]
+            self.assertEqual([Path(result.png_filename).name for result in failed], ["broken.png"])
+            
+            for result in results:
+                if result.ok:
+                    self.assertTrue(os.path.exists(result.qoi_filename))
+                    self.assertGreater(result.compression_ratio, 0)
+                    img_decoded, _ = run_decoder(result.qoi_filename)
+                    img = np.asarray(Image.open(result.png_filename))
+                    self.assertTrue(np.all(img_decoded == img))
+                
+                
+    def test_convert_file_error(self):
+        result = convert_file(str(BASE_DIR / "data/missing.png"), str(BASE_DIR / "data/missing.qoi"))
+        self.assertFalse(result.ok)
+        self.assertIn("FileNotFoundError", result.error)
+        
+        
+    def test_cli(self):
+        os.remove(os.path.join(self.dir_with_png, "broken.png"))
+        self.assertEqual(main([self.dir_with_png, self.dir_with_qoi, "-j", "1"]), 0)
+        self.assertEqual(len(os.listdir(self.dir_with_qoi)), 3)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
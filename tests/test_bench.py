@@ -0,0 +1,71 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout, redirect_stderr
+import numpy as np
+from qoi_compress.bench import *
+
+
+class TestBench(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        
+        
+    def test_synthetic_images(self):
+        for kind in SYNTHETIC_KINDS:
+            img = synthetic_image(kind, 20, 30)
+            self.assertEqual(img.shape, (20, 30, 3))
+            self.assertEqual(img.dtype, np.uint8)
+            self.assertTrue(np.array_equal(img, synthetic_image(kind, 20, 30)))
+        with self.assertRaises(ValueError):
+            synthetic_image("stripes", 20, 30)
+            
+            
+    def test_run_benchmark(self):
+        corpus = [(kind, synthetic_image(kind, 16, 24)) for kind in SYNTHETIC_KINDS]
+        results = run_benchmark(corpus, warmup=0, repeats=2)
+        
+        self.assertEqual([result.name for result in results], list(SYNTHETIC_KINDS))
+        for result in results:
+            self.assertEqual((result.width, result.height), (24, 16))
+            self.assertGreater(result.encoding_mps, 0)
+            self.assertGreater(result.peak_memory_mb, 0)
+        flat, noise = results[2], results[1]
+        self.assertGreater(flat.compression_ratio, noise.compression_ratio)
+        
+        
+    def test_json_and_compare(self):
+        result = BenchResult("flat", 24, 16, "auto", "auto", 0.010, 0.005, 1.0, 2.0, 3.0, 0.1)
+        json_filename = os.path.join(self.tmp_dir.name, "bench.json")
+        save_results([result], json_filename)
+        baseline = load_results(json_filename)
+        self.assertEqual(baseline, [result])
+        
+        self.assertEqual(compare([result._replace(encoding_time=0.0105)], baseline, threshold=0.1), [])
+        regressions = compare([result._replace(decoding_time=0.006)], baseline, threshold=0.1)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("decoding_time", regressions[0])
+        # images missing in baseline are skipped
+        self.assertEqual(compare([result._replace(name="noise", encoding_time=1.0)], baseline), [])
+        
+        
+    def test_cli_fails_on_regression(self):
+        json_filename = os.path.join(self.tmp_dir.name, "bench_baseline.json")
+        args = ["--no-png", "--sizes", "460x460", "--kinds", "flat", "--warmup", "0", "--repeats", "1"]
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(main(args + ["--output", json_filename]), 0)
+        
+        # baseline which is 1000 times faster than any real run
+        baseline = [result._replace(encoding_time=result.encoding_time / 1000) 
+                    for result in load_results(json_filename)]
+        save_results(baseline, json_filename)
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            self.assertEqual(main(args + ["--baseline", json_filename]), 1)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
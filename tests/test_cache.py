@@ -0,0 +1,84 @@
+import os
+from pathlib import Path
+import unittest
+import numpy as np
+from qoi_compress.cache import DecodedImageCache
+from qoi_compress.qoi_encoder import encode_to_bytes
+from qoi_compress.qoi_decoder import run_decoder
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+class TestDecodedImageCache(unittest.TestCase):
+    
+    def setUp(self):
+        os.makedirs(BASE_DIR / "data", exist_ok=True)
+        rng = np.random.default_rng(6)
+        self.images = [(rng.integers(0, 4, size=(20, 25, 3)) * 60).astype(np.uint8) for _ in range(3)]
+        self.filenames = []
+        for i, img in enumerate(self.images):
+            filename = str(BASE_DIR / f"data/cache_{i}.qoi")
+            with open(filename, 'wb') as file:
+                file.write(encode_to_bytes(img))
+            self.filenames.append(filename)
+            
+            
+    def test_hits_and_read_only(self):
+        cache = DecodedImageCache()
+        img = cache.get_file(self.filenames[0])
+        self.assertTrue(np.array_equal(img, self.images[0]))
+        self.assertTrue(np.array_equal(cache.get_file(self.filenames[0]), self.images[0]))
+        self.assertEqual(cache.info()[:4], (1, 1, 0, 1))
+        
+        with self.assertRaises(ValueError):
+            img[0, 0] = 1
+        with self.assertRaises(ValueError):
+            img.flags.writeable = True
+            
+            
+    def test_lru_eviction(self):
+        cache = DecodedImageCache(max_bytes=2 * self.images[0].nbytes)
+        for i in [0, 1, 0, 2]:  # image 1 is the least recently used when image 2 is added
+            cache.get_file(self.filenames[i])
+        info = cache.info()
+        self.assertEqual((info.evictions, info.entries, info.nbytes), (1, 2, 2 * self.images[0].nbytes))
+        self.assertEqual(len(cache.file_keys), 2)  # paths of evicted files are forgotten
+        
+        cache.get_file(self.filenames[0])
+        self.assertEqual(cache.info().hits, 2)
+        cache.get_file(self.filenames[1])
+        self.assertEqual(cache.info().misses, 4)
+        
+        small_cache = DecodedImageCache(max_bytes=100)  # images larger than budget are not cached
+        self.assertTrue(np.array_equal(small_cache.get_file(self.filenames[0]), self.images[0]))
+        self.assertEqual((len(small_cache), len(small_cache.file_keys)), (0, 0))
+        
+        
+    def test_modified_file(self):
+        cache = DecodedImageCache()
+        cache.get_file(self.filenames[0])
+        with open(self.filenames[0], 'wb') as file:
+            file.write(encode_to_bytes(self.images[1]))
+        os.utime(self.filenames[0], ns=(0, 10**9))
+        
+        self.assertTrue(np.array_equal(cache.get_file(self.filenames[0]), self.images[1]))
+        self.assertEqual((cache.info().misses, len(cache), len(cache.file_keys)), (2, 1, 1))
+        
+        
+    def test_bytes_and_run_decoder(self):
+        cache = DecodedImageCache()
+        qoi_bytes = encode_to_bytes(self.images[2])
+        cache.get_bytes(qoi_bytes)
+        self.assertTrue(np.array_equal(cache.get_bytes(bytearray(qoi_bytes)), self.images[2]))
+        self.assertEqual(cache.info().hits, 1)
+        
+        for _ in range(2):
+            img_decoded, _ = run_decoder(self.filenames[1], cache=cache)
+            self.assertTrue(np.array_equal(img_decoded, self.images[1]))
+        self.assertEqual(cache.info()[:2], (2, 2))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+from qoi_compress.compressed import *
+from qoi_compress.qoi_encoder import encode_to_bytes
+from qoi_compress.qoi_decoder import decode_to_array
+
+
+class TestCompressed(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(8)
+        img = np.clip(128 + np.cumsum(rng.integers(-2, 3, size=(70, 33, 4)), axis=1), 0, 255)
+        img[30:40] = 17
+        self.img = img.astype(np.uint8)
+        
+        
+    def test_round_trip(self):
+        for codec in CODECS:
+            for block_rows in [1, 16, 100]:
+                for workers in [1, 3]:
+                    data = encode_compressed(self.img, codec, block_rows=block_rows, workers=workers)
+                    header = read_compressed_header(data)
+                    
+                    self.assertEqual((header.height, header.width, header.channels), self.img.shape)
+                    self.assertEqual((header.codec, header.n_blocks), (codec, -(-70 // block_rows)))
+                    self.assertTrue(np.array_equal(decode_compressed(data, workers=workers), self.img),
+                                    f"Codec {codec}, block rows {block_rows}")
+                    
+                    
+    def test_block_is_qoi_file(self):
+        data = encode_compressed(self.img, "lzma", level=9, block_rows=16, strict=True)
+        header = read_compressed_header(data)
+        
+        for i in range(header.n_blocks):
+            y0, y1 = header.block_bounds(i)
+            qoi_bytes = get_block(data, header, i)
+            self.assertEqual(qoi_bytes, encode_to_bytes(self.img[y0:y1], strict=True))
+            self.assertEqual(len(qoi_bytes), header.raw_sizes[i])
+        self.assertTrue(np.array_equal(decode_to_array(compressed_to_qoi(data, strict=True), strict=True), self.img))
+        
+        
+    def test_smaller_than_qoi(self):
+        img = np.tile(self.img, (4, 4, 1))
+        self.assertLess(len(encode_compressed(img, "zlib")), len(encode_to_bytes(img)))
+        
+        
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            encode_compressed(self.img, "zstd")
+        with self.assertRaises(ValueError):
+            read_compressed_header(b"qoif" + bytes(40))
+            
+        data = bytearray(encode_compressed(self.img, block_rows=16))
+        block_rows_pos = COMPRESSED_HEADER.size - 8
+        data[block_rows_pos:block_rows_pos + 4] = bytes(4)  # zero rows per block
+        with self.assertRaises(ValueError):
+            decode_compressed(bytes(data))
+            
+        data = bytearray(encode_compressed(self.img, block_rows=16))
+        data[4:8] = (33 + 1).to_bytes(4, 'big')  # blocks are narrower than container
+        with self.assertRaises(ValueError):
+            decode_compressed(bytes(data))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+from pathlib import Path
+import unittest
+import numpy as np
+from qoi_compress.qoi_decoder import decode, decode_to_array
+from qoi_compress.qoi_encoder import encode_to_bytes
+from qoi_compress.numba_engine import NUMBA_AVAILABLE
+from qoi_compress.read_png import read_png
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+if not os.path.exists(BASE_DIR / "data"):
+    os.mkdir(BASE_DIR / "data")
+
+
+class TestConformance(unittest.TestCase):
+    """
+    Compare every engine with the reference per-pixel encoder and decoder 
+    on all images from png_images/
+    """
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.images = {}
+        cls.reference = {}
+        
+        dir_with_png = str(BASE_DIR / "png_images")
+        for filename in sorted(os.listdir(dir_with_png)):
+            if Path(filename).suffix == ".png":
+                img, _, _, _ = read_png(os.path.join(dir_with_png, filename))
+                cls.images[filename] = img
+                cls.reference[filename] = encode_to_bytes(img, engine="python")
+                
+                
+    def check_encoder(self, engine):
+        for filename, img in self.images.items():
+            self.assertEqual(encode_to_bytes(img, engine=engine), self.reference[filename],
+                             f"Engine {engine} gives different qoi bytes for image {filename}")
+            
+            
+    def check_decoder(self, engine):
+        for filename, qoi_bytes in self.reference.items():
+            expected = self.images[filename]
+            if expected.shape[2] == 3:  # reference decoder supports only 3-channel images
+                qoi_filename = str(BASE_DIR / "data/tmp.qoi")
+                with open(qoi_filename, 'wb') as file:
+                    file.write(qoi_bytes)
+                R, G, B, height, width = decode(qoi_filename)
+                expected = np.stack([R, G, B], axis=-1).reshape((height, width, 3))
+            
+            img_decoded = decode_to_array(qoi_bytes, engine=engine)
+            self.assertTrue(np.all(img_decoded == expected),
+                            f"Engine {engine} decoded image {filename} incorrectly")
+            
+    
+    def test_numpy_encoder(self):
+        self.check_encoder("numpy")
+        
+        
+    @unittest.skipUnless(NUMBA_AVAILABLE, "numba is not installed")
+    def test_numba_encoder(self):
+        self.check_encoder("numba")
+        
+        
+    def test_python_decoder(self):
+        self.check_decoder("python")
+        
+        
+    @unittest.skipUnless(NUMBA_AVAILABLE, "numba is not installed")
+    def test_numba_decoder(self):
+        self.check_decoder("numba")
+        
+        
+    def test_auto_engine(self):
+        self.check_encoder("auto")
+        self.check_decoder("auto")
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,16 @@
 import unittest
+import os
+from pathlib import Path
+import numpy as np
 
-from qoi_compress.qoi_decoder import decode_byte_part
+from qoi_compress.qoi_decoder import *
+from qoi_compress.qoi_encoder import encode_to_bytes
+from qoi_compress.numba_engine import NUMBA_AVAILABLE
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+if not os.path.exists(BASE_DIR / "data"):
+    os.mkdir(BASE_DIR / "data")
 
 
 
@@ -36,6 +46,93 @@ class TestDecoder(unittest.TestCase):
         
         dr_dg = decode_byte_part(byte, right_offset=4, bits_num=4)
         self.assertEqual(dr_dg, 0b1111, f"Expected {bin(0b1111)} but got {bin(dr_dg)}")
+        
+        
+    def test_lookup_tables(self):
+        for byte in range(256):
+            self.assertEqual(DIFF_SMALL_TABLE[byte], decode_diff_small(byte & 0b00111111))
+            
+            dr, dg, db = decode_diff_med(0b10100000, byte)  # dg = 0
+            self.assertEqual(DIFF_MED_TABLE[byte], (dr, db))
+
+
+
+class TestDecodeToArray(unittest.TestCase):
+    
+    def test_same_as_decode(self):
+        rng = np.random.default_rng(1)
+        img = np.clip(100 + np.cumsum(rng.integers(-3, 4, size=(30, 40, 3)), axis=1), 0, 255)
+        img[10:12] = 255
+        img = img.astype(np.uint8)
+        qoi_bytes = encode_to_bytes(img)
+        
+        filename = str(BASE_DIR / "data/tmp.qoi")
+        with open(filename, 'wb') as file:
+            file.write(qoi_bytes)
+        R, G, B, height, width = decode(filename)
+        
+        img_decoded = decode_to_array(qoi_bytes)
+        self.assertEqual(img_decoded.dtype, np.uint8)
+        self.assertEqual(img_decoded.shape, (height, width, 3))
+        self.assertTrue(np.all(img_decoded[:, :, 0].ravel() == R))
+        self.assertTrue(np.all(img_decoded[:, :, 1].ravel() == G))
+        self.assertTrue(np.all(img_decoded[:, :, 2].ravel() == B))
+        self.assertTrue(np.all(img_decoded == img))
+        
+        
+    def test_truncated_stream(self):
+        img = np.arange(4 * 5 * 3).reshape((4, 5, 3)).astype(np.uint8)
+        qoi_bytes = encode_to_bytes(img)
+        truncated = qoi_bytes[:-12] + qoi_bytes[-8:]
+        
+        engines = ["python", "pure", "numba"] if NUMBA_AVAILABLE else ["python", "pure"]
+        for engine in engines:
+            with self.assertRaises(ValueError):
+                decode_to_array(truncated, engine=engine)
+
+
+            
+            
+class TestZeroCopyDecoding(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(6)
+        self.img = rng.integers(0, 3, size=(17, 23, 3)).astype(np.uint8) * 100
+        self.qoi_bytes = encode_to_bytes(self.img)
+        self.filename = str(BASE_DIR / "data/zero_copy.qoi")
+        with open(self.filename, 'wb') as file:
+            file.write(self.qoi_bytes)
+            
+            
+    def test_any_buffer(self):
+        for qoi_buffer in [self.qoi_bytes, bytearray(self.qoi_bytes), memoryview(self.qoi_bytes),
+                           np.frombuffer(self.qoi_bytes, dtype=np.uint8)]:
+            self.assertEqual(read_qoi_header(qoi_buffer), (17, 23, 3, 0))
+            self.assertTrue(np.all(decode_into(qoi_buffer) == self.img))
+            
+            
+    def test_decode_file(self):
+        for engine in ["python", "numba"] if NUMBA_AVAILABLE else ["python"]:
+            self.assertTrue(np.all(decode_file(self.filename, engine=engine) == self.img))
+            
+            
+    def test_reuse_output(self):
+        out = np.empty((17, 23, 3), dtype=np.uint8)
+        img_decoded, _ = run_decoder(self.filename, out=out)
+        self.assertIs(img_decoded, out)
+        self.assertTrue(np.all(out == self.img))
+        
+        # larger buffer is reused for smaller images
+        buffer = np.zeros(10000, dtype=np.uint8)
+        img_decoded = decode_file(self.filename, out=buffer)
+        self.assertEqual(img_decoded.shape, (17, 23, 3))
+        self.assertTrue(np.shares_memory(img_decoded, buffer))
+        self.assertTrue(np.all(img_decoded == self.img))
+        
+        with self.assertRaises(ValueError):
+            decode_file(self.filename, out=np.empty(100, dtype=np.uint8))
+        with self.assertRaises(ValueError):
+            decode_file(self.filename, out=np.empty((17, 23, 3), dtype=np.int64))
 
 
 
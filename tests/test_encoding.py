@@ -2,6 +2,7 @@ import unittest
 import os
 from pathlib import Path
 
+import numpy as np
 from qoi_compress.qoi_encoder import *
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -102,8 +103,162 @@ class TestEncodeChunk(unittest.TestCase):
             write_chunk(chunk, file)
         file_size = os.path.getsize(filename)
         self.assertEqual(file_size, 4, "File size should be 4 bytes")
+
+
+    def test_encode_rgba(self):
+        chunk = encode_rgba(59, 8, 147, 128)
+        
+        self.assertEqual(chunk, [0b11111111, 59, 8, 147, 128])
+        
+        
+
+class TestEncodeToBytes(unittest.TestCase):
+    
+    def test_header_and_end(self):
+        img = np.zeros((3, 5, 3), dtype=np.uint8)
+        qoi_bytes = encode_to_bytes(img)
+        
+        self.assertEqual(qoi_bytes[:4], b'qoif')
+        self.assertEqual(int.from_bytes(qoi_bytes[4:8], byteorder='big'), 5)
+        self.assertEqual(int.from_bytes(qoi_bytes[8:12], byteorder='big'), 3)
+        self.assertEqual(qoi_bytes[12], 3)
+        self.assertEqual(qoi_bytes[-8:], bytes([0, 0, 0, 0, 0, 0, 0, 1]))
+        
+        # 15 black pixels are encoded as a single QOI_RUN chunk
+        self.assertEqual(qoi_bytes[14:-8], bytes([0b11001110]))
+        
+        
+    def test_same_as_file_encoder(self):
+        img = np.array([[[10, 20, 30], [11, 20, 29], [11, 20, 29], [200, 0, 7]],
+                        [[10, 20, 30], [40, 30, 30], [0, 0, 0], [0, 0, 0]]], dtype=np.uint8)
+        R, G, B = (np.ravel(img[:, :, i]).tolist() for i in range(3))
+        
+        filename = str(BASE_DIR / "data/tmp.qoi")
+        with open(filename, 'wb') as file:
+            write_qoi_header(img, file)
+            encode(R, G, B, file)
+        with open(filename, 'rb') as file:
+            expected = file.read()
+            
+        self.assertEqual(encode_to_bytes(img), expected)
+        
+        
+
+class TestNumpyEngine(unittest.TestCase):
+    
+    def test_same_as_python_engine(self):
+        rng = np.random.default_rng(0)
+        
+        # small palette and small steps give runs, index hits and both diff chunks
+        palette = rng.integers(0, 256, size=(6, 3))
+        noise = rng.integers(-3, 3, size=(40, 50, 3))
+        img = np.clip(palette[rng.integers(0, 6, size=(40, 50))] + noise, 0, 255)
+        img[5:8] = 0  # long run of black pixels (> 62)
+        img[20] = img[19]
+        img = img.astype(np.uint8)
+        
+        self.assertEqual(encode_to_bytes(img, engine="numpy"), encode_to_bytes(img, engine="python"))
+        
+        
+    def test_runs_split(self):
+        img = np.full((1, 200, 3), 7, dtype=np.uint8)
+        self.assertEqual(encode_to_bytes(img, engine="numpy"), encode_to_bytes(img, engine="python"))
+        
+        
+    def test_unknown_engine(self):
+        img = np.zeros((1, 1, 3), dtype=np.uint8)
+        with self.assertRaises(ValueError):
+            encode_to_bytes(img, engine="fortran")
+
+
+
+class TestEncodeArray(unittest.TestCase):
+    
+    def test_strided_arrays(self):
+        from qoi_compress.numba_engine import NUMBA_AVAILABLE
+        
+        rng = np.random.default_rng(2)
+        big = (rng.integers(0, 3, size=(40, 50, 4)) * 40).astype(np.uint8)
+        views = [big[5:35, 10:40, :3],  # crop
+                 big[::2, ::3, 2::-1],  # every 2nd row, every 3rd column, BGR -> RGB
+                 big.transpose(1, 0, 2)]  # columns as rows, RGBA
+        engines = ["python", "numpy", "pure", "numba"] if NUMBA_AVAILABLE else ["python", "numpy", "pure"]
+        for view in views:
+            expected = encode_array(np.ascontiguousarray(view), engine="python")
+            for engine in engines:
+                self.assertEqual(encode_array(view, engine=engine), expected, f"Engine {engine}")
+                
+                
+    def test_pil_image(self):
+        from PIL import Image
+        
+        img = np.arange(4 * 6 * 3, dtype=np.uint8).reshape((4, 6, 3))
+        self.assertEqual(encode_array(Image.fromarray(img)), encode_array(img))
+        
+        
+    def test_invalid_arrays(self):
+        with self.assertRaises(ValueError):
+            encode_array(np.zeros((2, 2, 3), dtype=np.int64))
+        with self.assertRaises(ValueError):
+            encode_array(np.zeros((2, 2), dtype=np.uint8))
+            
+            
+    def test_package_api(self):
+        import qoi_compress
+        
+        img = np.zeros((2, 3, 3), dtype=np.uint8)
+        qoi_bytes = qoi_compress.encode_array(img)
+        self.assertEqual(qoi_bytes, encode_to_bytes(img))
+        self.assertTrue(np.array_equal(qoi_compress.decode_array(bytearray(qoi_bytes)), img))
+
+
+
+class TestRGBA(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        img = rng.integers(0, 256, size=(30, 40, 4))
+        img[:, :20] = img[:, :1]  # runs and index hits
+        img[10:15, :, 3] = 255  # opaque rows with small color steps
+        img[10:15, :, :3] = np.cumsum(rng.integers(-1, 2, size=(5, 40, 3)), axis=1) + 100
+        img[25:] = 0  # transparent black rows
+        self.img = img.astype(np.uint8)
         
         
+    def test_alpha_change_gives_rgba_chunk(self):
+        img = np.array([[[10, 20, 30, 255], [10, 20, 30, 128]]], dtype=np.uint8)
+        qoi_bytes = encode_to_bytes(img, engine="python")
+        
+        self.assertEqual(qoi_bytes[12], 4)
+        self.assertEqual(qoi_bytes[14:-8], bytes([0b11111111, 10, 20, 30, 255, 0b11111111, 10, 20, 30, 128]))
+        
+        
+    def test_same_as_python_engine(self):
+        from qoi_compress.numba_engine import NUMBA_AVAILABLE
+        
+        expected = encode_to_bytes(self.img, engine="python")
+        self.assertEqual(encode_to_bytes(self.img, engine="numpy"), expected)
+        if NUMBA_AVAILABLE:
+            self.assertEqual(encode_to_bytes(self.img, engine="numba"), expected)
+            
+            
+    def test_round_trip(self):
+        from qoi_compress.qoi_decoder import decode_to_array
+        
+        qoi_bytes = encode_to_bytes(self.img)
+        for engine in ["python", "auto"]:
+            img_decoded = decode_to_array(qoi_bytes, engine=engine)
+            self.assertEqual(img_decoded.shape, self.img.shape)
+            self.assertTrue(np.array_equal(img_decoded, self.img), f"Engine {engine} decoded image incorrectly")
+            
+            
+    def test_invalid_channels(self):
+        with self.assertRaises(ValueError):
+            encode_to_bytes(np.zeros((2, 2, 2), dtype=np.uint8))
+        
+        
+
+
 
 
 if __name__ == '__main__':
@@ -0,0 +1,65 @@
+import os
+import sys
+import json
+import unittest
+import subprocess
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# import of encoder and decoder, seconds (most of it is import of numpy)
+IMPORT_TIME_BUDGET = 1.0
+
+SCRIPT = """
+import sys, json, time
+start_time = time.perf_counter()
+import {modules}
+import_time = time.perf_counter() - start_time
+from qoi_compress.setup_logger import logger
+print(json.dumps({{"import_time": import_time, "modules": sorted(sys.modules), 
+                  "handlers": [type(handler).__name__ for handler in logger.handlers]}}))
+"""
+
+
+def run_import(modules: str) -> dict:
+    """
+    Import "modules" in a fresh interpreter
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(BASE_DIR / "src"), env.get("PYTHONPATH", "")])
+    env.pop("QOI_COMPRESS_LOGLEVEL", None)
+    output = subprocess.run([sys.executable, "-c", SCRIPT.format(modules=modules)], env=env,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+
+class TestImport(unittest.TestCase):
+    
+    def test_package_import_is_light(self):
+        result = run_import("qoi_compress")
+        self.assertNotIn("numpy", result["modules"])
+        
+        
+    def test_encoder_and_decoder_import(self):
+        result = run_import("qoi_compress.qoi_encoder, qoi_compress.qoi_decoder, qoi_compress.streaming")
+        
+        for module in ["matplotlib", "PIL", "numba"]:
+            self.assertNotIn(module, result["modules"], f"{module} is imported eagerly")
+        self.assertLess(result["import_time"], IMPORT_TIME_BUDGET)
+        
+        
+    def test_pure_engine_without_numpy(self):
+        result = run_import("qoi_compress.pure_engine")
+        self.assertNotIn("numpy", result["modules"])
+        
+        
+    def test_logger_is_silent_by_default(self):
+        result = run_import("qoi_compress.qoi_encoder")
+        self.assertEqual(result["handlers"], ["NullHandler"])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+from qoi_compress.near_lossless import encode_near_lossless, psnr
+from qoi_compress.qoi_encoder import encode_to_bytes
+from qoi_compress.qoi_decoder import decode_to_array
+from qoi_compress.numba_engine import NUMBA_AVAILABLE
+
+DECODERS = ["python", "numba"] if NUMBA_AVAILABLE else ["python"]
+
+
+class TestNearLossless(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(9)
+        img = np.clip(128 + np.cumsum(rng.integers(-6, 7, size=(40, 45, 4)), axis=1), 0, 255)
+        img[..., 3] = 255
+        img[10:15, 10:20, 3] = 0
+        img[20:25] = rng.integers(0, 256, size=(5, 45, 4))  # noise, alpha changes at every pixel
+        img[30:35, :, :3] = [[[0, 255, 3]]]  # channels at the ends of range
+        self.img = img.astype(np.uint8)
+        
+        
+    def test_max_error(self):
+        for channels in [3, 4]:
+            img = np.ascontiguousarray(self.img[..., :channels])
+            for strict in [False, True]:
+                sizes = []
+                for max_error in [0, 1, 3, 10, 40]:
+                    qoi_bytes, img_psnr = encode_near_lossless(img, max_error, strict)
+                    sizes.append(len(qoi_bytes))
+                    for engine in DECODERS:
+                        img_decoded = decode_to_array(qoi_bytes, engine=engine, strict=strict)
+                        errors = np.abs(img_decoded.astype(int) - img)
+                        self.assertLessEqual(errors.max(), max_error)
+                        self.assertEqual(errors[..., 3:].max(initial=0), 0)  # alpha is exact
+                    sse = np.sum(errors[..., :3] ** 2)
+                    self.assertAlmostEqual(img_psnr, psnr(sse, img[..., :3].size))
+                self.assertEqual(sizes, sorted(sizes, reverse=True))
+                self.assertLess(sizes[-1], sizes[0] / 2)
+                
+                
+    def test_lossless_is_reference(self):
+        qoi_bytes, img_psnr = encode_near_lossless(self.img, 0, strict=True)
+        self.assertEqual(qoi_bytes, encode_to_bytes(self.img, strict=True))
+        self.assertEqual(img_psnr, float("inf"))
+        
+        # differences that only fit into QOI_DIFF chunks when wrapped around
+        img = np.array([[[1, 1, 1], [255, 255, 255], [0, 0, 0], [250, 3, 128], [2, 250, 130]]], dtype=np.uint8)
+        self.assertEqual(encode_near_lossless(img, 0, strict=True)[0], encode_to_bytes(img, strict=True))
+        rng = np.random.default_rng(22)
+        for _ in range(15):
+            img = rng.choice(np.array([0, 1, 2, 127, 128, 253, 254, 255], dtype=np.uint8), size=(6, 7, 3))
+            self.assertEqual(encode_near_lossless(img, 0, strict=True)[0], encode_to_bytes(img, strict=True))
+        
+        
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            encode_near_lossless(self.img, -1)
+        with self.assertRaises(ValueError):
+            encode_near_lossless(self.img.astype(np.int32), 2)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
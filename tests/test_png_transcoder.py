@@ -0,0 +1,162 @@
+import io
+import os
+import zlib
+import struct
+import tempfile
+import tracemalloc
+from pathlib import Path
+import unittest
+import numpy as np
+from PIL import Image
+from qoi_compress.png_transcoder import transcode_png, run_png_transcoder, unfilter_row
+from qoi_compress.qoi_encoder import encode_array
+from qoi_compress.read_png import read_png_array
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def filter_row(filter_type: int, row: np.ndarray, prev: np.ndarray, bpp: int) -> bytes:
+    """
+    Apply PNG filter to scanline (reference implementation for tests)
+    """
+    row, prev = row.astype(np.int64), prev.astype(np.int64)
+    left = np.concatenate((np.zeros(bpp, dtype=np.int64), row[:-bpp]))
+    up_left = np.concatenate((np.zeros(bpp, dtype=np.int64), prev[:-bpp]))
+    if filter_type == 0:
+        predictor = np.zeros_like(row)
+    elif filter_type == 1:
+        predictor = left
+    elif filter_type == 2:
+        predictor = prev
+    elif filter_type == 3:
+        predictor = (left + prev) // 2
+    else:
+        p = left + prev - up_left
+        p_left, p_up, p_up_left = abs(p - left), abs(p - prev), abs(p - up_left)
+        predictor = np.where((p_left <= p_up) & (p_left <= p_up_left), left, np.where(p_up <= p_up_left, prev, up_left))
+    return bytes([filter_type]) + ((row - predictor) % 256).astype(np.uint8).tobytes()
+
+
+def make_png(img: np.ndarray, color_type: int, idat_size: int = 100) -> bytes:
+    """
+    PNG image with all filter types (cycled over scanlines), IDAT data is split into small chunks
+    """
+    height, width = img.shape[:2]
+    samples = img.reshape(height, -1)
+    bpp = samples.shape[1] // width
+    prev = np.zeros(samples.shape[1], dtype=np.uint8)
+    scanlines = b""
+    for y in range(height):
+        scanlines += filter_row(y % 5, samples[y], prev, bpp)
+        prev = samples[y]
+    idat = zlib.compress(scanlines)
+
+    chunks = [png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0))]
+    chunks += [png_chunk(b"IDAT", idat[i:i + idat_size]) for i in range(0, len(idat), idat_size)]
+    chunks.append(png_chunk(b"IEND", b""))
+    return b"\x89PNG\r\n\x1a\n" + b"".join(chunks)
+
+
+
+class TestPngTranscoder(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        rng = np.random.default_rng(25)
+        img = rng.integers(0, 4, size=(37, 29, 4)) * 60
+        img[5:9] = 255
+        img[20:] = np.clip(img[20:] + rng.integers(-3, 4, size=(17, 29, 4)), 0, 255)
+        self.img = img.astype(np.uint8)
+        
+        
+    def check_file(self, png_filename: str, **kwargs) -> None:
+        expected = encode_array(read_png_array(png_filename), **kwargs)
+        sink = io.BytesIO()
+        with open(png_filename, 'rb') as stream:
+            n_bytes = transcode_png(stream, sink, **kwargs)
+        self.assertEqual(sink.getvalue(), expected, png_filename)
+        self.assertEqual(n_bytes, len(expected))
+        
+        
+    def test_all_filters(self):
+        for color_type, img in [(2, self.img[..., :3]), (6, self.img), (0, self.img[..., 0]), (4, self.img[..., :2])]:
+            filename = os.path.join(self.tmp_dir.name, f"filters_{color_type}.png")
+            with open(filename, 'wb') as file:
+                file.write(make_png(np.ascontiguousarray(img), color_type))
+            self.check_file(filename)
+            self.check_file(filename, strict=True)
+            
+            
+    def test_pil_modes(self):
+        images = {
+            "RGB": Image.fromarray(self.img[..., :3]),
+            "RGBA": Image.fromarray(self.img),
+            "L": Image.fromarray(self.img[..., 0]),
+            "LA": Image.fromarray(self.img[..., :2], mode="LA"),
+            "P": Image.fromarray(self.img[..., :3]).quantize(16),  # saved as 4-bit image
+            "P_2_bits": Image.fromarray(self.img[..., :3]).quantize(4),
+            "1": Image.fromarray(self.img[..., 0] > 100),
+        }
+        for mode, image in images.items():
+            filename = os.path.join(self.tmp_dir.name, f"{mode}.png")
+            image.save(filename, bits=2) if mode == "P_2_bits" else image.save(filename)
+            self.check_file(filename)
+            
+        transparency = {"RGB": (0, 0, 0), "L": 120, "P": 3}
+        for mode, color in transparency.items():
+            filename = os.path.join(self.tmp_dir.name, f"{mode}_transparency.png")
+            images[mode].save(filename, transparency=color)
+            self.check_file(filename)
+            
+            
+    def test_reference_images(self):
+        for name in ["doge.png", "ColorBars.png"]:
+            png_filename = str(BASE_DIR / "png_images" / name)
+            qoi_filename = os.path.join(self.tmp_dir.name, name.replace(".png", ".qoi"))
+            run_png_transcoder(png_filename, qoi_filename, rows_per_feed=5)
+            with open(qoi_filename, 'rb') as file:
+                self.assertEqual(file.read(), encode_array(read_png_array(png_filename)), name)
+                
+                
+    def test_memory_is_bounded(self):
+        img = np.tile(self.img[..., :3], (20, 30, 1))  # 740x870, 1.9 MB of pixels
+        png_filename = os.path.join(self.tmp_dir.name, "memory.png")
+        Image.fromarray(img).save(png_filename)
+        qoi_filename = os.path.join(self.tmp_dir.name, "memory.qoi")
+        run_png_transcoder(png_filename, qoi_filename)  # compilation of numba functions
+        
+        tracemalloc.start()
+        try:
+            run_png_transcoder(png_filename, qoi_filename)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, img.nbytes // 4)
+        
+        
+    def test_invalid_png(self):
+        data = make_png(self.img[..., :3].copy(), 2)
+        for invalid in [data[:-30], data[:40] + bytes([data[40] ^ 1]) + data[41:], b"GIF89a" + data[6:]]:
+            with self.assertRaises(ValueError):
+                transcode_png(io.BytesIO(invalid), io.BytesIO())
+
+        ihdr = struct.pack(">IIBBBBB", 29, 37, 8, 2, 0, 0, 1)  # interlaced image
+        with self.assertRaises(ValueError):
+            transcode_png(io.BytesIO(data[:8] + png_chunk(b"IHDR", ihdr) + data[33:]), io.BytesIO())
+                    
+                    
+    def test_unfilter_row(self):
+        rng = np.random.default_rng(0)
+        prev = rng.integers(0, 256, size=24).astype(np.int32)
+        row = rng.integers(0, 256, size=24).astype(np.int32)
+        for filter_type in range(5):
+            filtered = np.frombuffer(filter_row(filter_type, row, prev, 3)[1:], dtype=np.uint8).astype(np.int32)
+            unfilter_row(filter_type, filtered, prev, 3)
+            self.assertTrue(np.array_equal(filtered, row), f"Filter type {filter_type}")
+
@@ -0,0 +1,65 @@
+import io
+import os
+import unittest
+from pathlib import Path
+import numpy as np
+from qoi_compress.probe import QoiInfo, probe, probe_many
+from qoi_compress.qoi_encoder import encode_to_bytes
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+if not os.path.exists(BASE_DIR / "data"):
+    os.mkdir(BASE_DIR / "data")
+
+
+class TestProbe(unittest.TestCase):
+    
+    def setUp(self):
+        self.filenames = []
+        for i in range(5):
+            img = np.full((10 + i, 30 - i, 3), i, dtype=np.uint8)
+            filename = str(BASE_DIR / f"data/probe_{i}.qoi")
+            with open(filename, 'wb') as file:
+                file.write(encode_to_bytes(img))
+            self.filenames.append(filename)
+        
+        
+    def test_probe(self):
+        filename = self.filenames[2]
+        expected = QoiInfo(width=28, height=12, channels=3, colorspace=0, file_size=os.path.getsize(filename))
+        
+        self.assertEqual(probe(filename), expected)
+        self.assertEqual(probe(Path(filename)), expected)
+        with open(filename, 'rb') as file:
+            qoi_bytes = file.read()
+            file.seek(0)
+            self.assertEqual(probe(file), expected)
+        self.assertEqual(probe(qoi_bytes), expected)
+        self.assertEqual(probe(memoryview(qoi_bytes)), expected)
+        self.assertEqual(probe(io.BytesIO(qoi_bytes)), expected._replace(file_size=None))
+        
+        
+    def test_not_qoi(self):
+        with self.assertRaises(ValueError):
+            probe(b"qoif")
+        with self.assertRaises(ValueError):
+            probe(b"\x89PNG" + bytes(20))
+        
+        
+    def test_probe_many(self):
+        infos = probe_many(self.filenames, workers=3)
+        self.assertEqual([(info.height, info.width) for info in infos], 
+                         [(10 + i, 30 - i) for i in range(5)])
+        
+        missing = str(BASE_DIR / "data/missing.qoi")
+        with self.assertRaises(FileNotFoundError):
+            probe_many(self.filenames + [missing])
+        infos = probe_many([missing] + self.filenames, skip_errors=True)
+        self.assertIsNone(infos[0])
+        self.assertEqual(infos[1:], probe_many(self.filenames))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
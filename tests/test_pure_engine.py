@@ -0,0 +1,46 @@
+import unittest
+import numpy as np
+from qoi_compress.pure_engine import decode_pixels, encode_pixels
+from qoi_compress.qoi_encoder import encode_to_bytes
+from qoi_compress.qoi_decoder import decode_to_array
+
+
+class TestPureEngine(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(10)
+        img = np.clip(128 + np.cumsum(rng.integers(-20, 21, size=(30, 41, 4)), axis=1), 0, 255)
+        img[5:10] = 0  # black pixels: empty hash slots in legacy mode
+        img[12:14] = rng.integers(0, 256, size=(2, 41, 4))
+        img[20:, :, 3] = 255
+        img[25, :] = [255, 0, 255, 255]  # wraparound in strict mode
+        self.img = img.astype(np.uint8)
+        
+        
+    def test_same_bitstream(self):
+        for channels in [3, 4]:
+            img = np.ascontiguousarray(self.img[..., :channels])
+            for strict in [False, True]:
+                expected = encode_to_bytes(img, engine="numpy", strict=strict)
+                self.assertEqual(encode_to_bytes(img, engine="pure", strict=strict), expected)
+                self.assertEqual(encode_pixels(img.tobytes(), 41, 30, channels, strict), expected)
+                
+                self.assertTrue(np.array_equal(decode_to_array(expected, engine="pure", strict=strict), img))
+                height, width, channels_decoded, pixels = decode_pixels(expected, strict)
+                self.assertEqual((height, width, channels_decoded), img.shape)
+                self.assertEqual(bytes(pixels), img.tobytes())
+                
+                
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            encode_pixels(bytes(10), 2, 2, 3)
+        with self.assertRaises(ValueError):
+            decode_pixels(b"qoif" + bytes(4))
+        qoi_bytes = encode_pixels(bytes(range(48)), 4, 4, 3)
+        with self.assertRaises(ValueError):
+            decode_pixels(qoi_bytes[:-12] + qoi_bytes[-8:])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
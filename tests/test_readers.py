@@ -0,0 +1,113 @@
+import os
+from pathlib import Path
+import unittest
+import numpy as np
+from PIL import Image
+from qoi_compress import readers
+from qoi_compress.readers import detect_format, read_image, register_reader
+from qoi_compress.qoi_encoder import encode_array, run_encoder
+from qoi_compress.read_png import read_png_array
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+class TestReaders(unittest.TestCase):
+    
+    def setUp(self):
+        os.makedirs(BASE_DIR / "data", exist_ok=True)
+        rng = np.random.default_rng(24)
+        self.img = (rng.integers(0, 4, size=(21, 34, 3)) * 60).astype(np.uint8)
+        self.img_rgba = (rng.integers(0, 4, size=(13, 9, 4)) * 60).astype(np.uint8)
+        
+        
+    def write(self, name: str, content: bytes) -> str:
+        filename = str(BASE_DIR / "data" / name)
+        with open(filename, 'wb') as file:
+            file.write(content)
+        return filename
+    
+    
+    def assert_mapped(self, img: np.ndarray, expected: np.ndarray) -> None:
+        self.assertTrue(np.array_equal(img, expected))
+        self.assertFalse(img.flags.owndata)  # view of memory map, not a copy
+        self.assertFalse(img.flags.writeable)
+    
+    
+    def test_npy(self):
+        filename = str(BASE_DIR / "data/readers.npy")
+        np.save(filename, self.img_rgba)
+        self.assertEqual(detect_format(filename), "npy")
+        self.assert_mapped(read_image(filename), self.img_rgba)
+        
+        
+    def test_ppm_with_comment(self):
+        height, width, _ = self.img.shape
+        header = f"P6\n# comment\n{width} {height}\n255\n".encode()
+        filename = self.write("readers.ppm", header + self.img.tobytes())
+        self.assertEqual(detect_format(filename), "ppm")
+        self.assert_mapped(read_image(filename), self.img)
+        
+        
+    def test_pam_rgba(self):
+        height, width, _ = self.img_rgba.shape
+        header = f"P7\nWIDTH {width}\nHEIGHT {height}\nDEPTH 4\nMAXVAL 255\nTUPLTYPE RGB_ALPHA\nENDHDR\n".encode()
+        filename = self.write("readers.pam", header + self.img_rgba.tobytes())
+        self.assert_mapped(read_image(filename), self.img_rgba)
+        
+        
+    def test_16_bit_ppm(self):
+        filename = self.write("readers_16.ppm", b"P6 2 1 65535\n" + bytes(12))
+        with self.assertRaises(ValueError):
+            read_image(filename)
+            
+            
+    def test_other_pil_formats(self):
+        for extension in ["bmp", "tiff"]:  # lossless formats, so pixels are the same
+            filename = str(BASE_DIR / f"data/readers.{extension}")
+            Image.fromarray(self.img).save(filename)
+            self.assertIsNone(detect_format(filename))
+            self.assertTrue(np.array_equal(read_image(filename), self.img))
+            
+        jpg_filename = str(BASE_DIR / "data/readers.jpg")
+        Image.fromarray(self.img).save(jpg_filename)
+        qoi_filename = str(BASE_DIR / "data/readers_jpg.qoi")
+        run_encoder(jpg_filename, qoi_filename)
+        with open(qoi_filename, 'rb') as file:
+            self.assertEqual(file.read(), encode_array(read_png_array(jpg_filename)))
+            
+            
+    def test_raw(self):
+        filename = self.write("readers.raw", self.img.tobytes())
+        self.assertIsNone(detect_format(filename))
+        with self.assertRaises(ValueError):
+            read_image(filename)
+        with self.assertRaises(ValueError):
+            read_image(filename, raw_shape=(21, 33, 3))
+        self.assert_mapped(read_image(filename, raw_shape=self.img.shape), self.img)
+        
+        
+    def test_register_reader(self):
+        filename = self.write("readers.custom", b"CUSTOM" + self.img.tobytes())
+        readers_before = list(readers.READERS)
+        try:
+            register_reader("custom", lambda head: head.startswith(b"CUSTOM"),
+                            lambda path: readers.map_file(path, 6, self.img.shape))
+            self.assertEqual(detect_format(filename), "custom")
+            self.assert_mapped(read_image(filename), self.img)
+        finally:
+            readers.READERS[:] = readers_before
+            
+            
+    def test_run_encoder_autodetect(self):
+        expected = encode_array(self.img)
+        npy_filename = str(BASE_DIR / "data/readers_encoder.npy")
+        np.save(npy_filename, self.img)
+        raw_filename = self.write("readers_encoder.raw", self.img.tobytes())
+        qoi_filename = str(BASE_DIR / "data/readers_encoder.qoi")
+        
+        for filename, raw_shape in [(npy_filename, None), (raw_filename, self.img.shape)]:
+            run_encoder(filename, qoi_filename, raw_shape=raw_shape)
+            with open(qoi_filename, 'rb') as file:
+                self.assertEqual(file.read(), expected)
+
@@ -0,0 +1,113 @@
+import os
+from pathlib import Path
+import unittest
+import numpy as np
+from qoi_compress.region import *
+from qoi_compress.qoi_encoder import encode_to_bytes, run_encoder
+from qoi_compress.qoi_decoder import decode_to_array, decode_file
+from qoi_compress.stats import collect_stats
+from qoi_compress.numba_engine import NUMBA_AVAILABLE
+from qoi_compress.read_png import read_png_array
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+DECODERS = ["python", "numba"] if NUMBA_AVAILABLE else ["python"]
+
+
+class TestRegion(unittest.TestCase):
+    
+    def setUp(self):
+        os.makedirs(BASE_DIR / "data", exist_ok=True)
+        rng = np.random.default_rng(7)
+        img = np.clip(128 + np.cumsum(rng.integers(-3, 4, size=(53, 37, 4)), axis=1), 0, 255)
+        img[20:30, :, :3] = 9  # long run through several rows
+        img[..., 3] = 255
+        img[40:45, 5:9, 3] = 100
+        self.img = img.astype(np.uint8)
+        self.qoi_bytes = encode_to_bytes(self.img)
+        self.qoi_filename = str(BASE_DIR / "data/region.qoi")
+        
+        
+    def write(self, data):
+        if os.path.exists(self.qoi_filename + SIDECAR_SUFFIX):
+            os.remove(self.qoi_filename + SIDECAR_SUFFIX)
+        with open(self.qoi_filename, 'wb') as file:
+            file.write(data)
+            
+            
+    def test_trailer_is_ignored_by_decoders(self):
+        data = add_checkpoints(self.qoi_bytes, rows_per_checkpoint=8)
+        self.assertEqual(bytes(strip_checkpoints(data)), self.qoi_bytes)
+        self.assertEqual(add_checkpoints(data, 8), data)
+        for engine in DECODERS:
+            self.assertTrue(np.array_equal(decode_to_array(data, engine=engine), self.img))
+        self.assertTrue(np.array_equal(collect_stats(data).counts, collect_stats(self.qoi_bytes).counts))
+        
+        
+    def test_region(self):
+        for rows_per_checkpoint in [None, 1, 8, 100]:
+            if rows_per_checkpoint is None:
+                self.write(self.qoi_bytes)
+            else:
+                self.write(add_checkpoints(self.qoi_bytes, rows_per_checkpoint))
+            for engine in DECODERS:
+                for y0, y1, x0, x1 in [(0, 53, 0, 37), (22, 25, 3, 10), (16, 17, 0, 37), (45, 53, 30, 37), (5, 5, 0, 0)]:
+                    region = decode_region(self.qoi_filename, y0, y1, x0, x1, engine=engine)
+                    self.assertTrue(np.array_equal(region, self.img[y0:y1, x0:x1]),
+                                    f"Region {y0}:{y1}, {x0}:{x1}, checkpoints {rows_per_checkpoint}")
+                    
+        with self.assertRaises(ValueError):
+            decode_region(self.qoi_filename, 50, 54)
+            
+            
+    def test_thumbnail(self):
+        for sidecar in [False, True]:
+            self.write(self.qoi_bytes)
+            write_checkpoints(self.qoi_filename, rows_per_checkpoint=4, sidecar=sidecar)
+            self.assertEqual(os.path.exists(self.qoi_filename + SIDECAR_SUFFIX), sidecar)
+            self.assertIsNotNone(read_checkpoints(decode_file_bytes(self.qoi_filename), self.qoi_filename))
+            for scale in [1, 3, 8, 60]:
+                thumbnail = decode_thumbnail(self.qoi_filename, scale)
+                self.assertTrue(np.array_equal(thumbnail, self.img[::scale, ::scale]), f"Scale {scale}")
+                
+                
+    def test_invalid_index(self):
+        data = add_checkpoints(self.qoi_bytes, rows_per_checkpoint=8)
+        index = read_checkpoints(data)
+        with self.assertRaises(ValueError):
+            unpack_checkpoints(pack_checkpoints(index._replace(rows_per_checkpoint=0)))
+            
+        # sidecar of an image which was rewritten after indexing
+        self.write(self.qoi_bytes)
+        write_checkpoints(self.qoi_filename, rows_per_checkpoint=4, sidecar=True)
+        img = self.img.copy()
+        img[30:] = 255 - img[30:]
+        with open(self.qoi_filename, 'wb') as file:
+            file.write(encode_to_bytes(img))
+        with self.assertRaises(ValueError):
+            decode_region(self.qoi_filename, 40, 45)
+            
+            
+    def test_strict_and_run_encoder(self):
+        img = read_png_array(str(BASE_DIR / "tests/reference_qoi/wraparound.png"))
+        data = add_checkpoints(encode_to_bytes(img, strict=True), 3, strict=True)
+        self.write(data)
+        self.assertTrue(np.array_equal(decode_region(self.qoi_filename, 4, 9, strict=True), img[4:9]))
+        
+        png_filename = str(BASE_DIR / "png_images/doge.png")
+        run_encoder(png_filename, self.qoi_filename, checkpoint_rows=64)
+        doge = read_png_array(png_filename)
+        self.assertTrue(np.array_equal(decode_file(self.qoi_filename), doge))
+        self.assertTrue(np.array_equal(decode_region(self.qoi_filename, 300, 310), doge[300:310]))
+
+
+
+def decode_file_bytes(filename):
+    with open(filename, 'rb') as file:
+        return file.read()
+
+
+
+if __name__ == '__main__':
+    unittest.main()
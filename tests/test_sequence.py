@@ -0,0 +1,91 @@
+import io
+import unittest
+import numpy as np
+from qoi_compress.sequence import *
+from qoi_compress.qoi_decoder import decode_to_array
+
+
+class TestSequence(unittest.TestCase):
+    
+    def setUp(self):
+        # screen capture: static background, small moving rectangle
+        rng = np.random.default_rng(4)
+        background = rng.integers(0, 4, size=(40, 50, 3)).astype(np.uint8) * 60
+        self.frames = []
+        for t in range(12):
+            frame = background.copy()
+            frame[10:15, 2 * t:2 * t + 6] = (250, 20, 20)
+            self.frames.append(frame)
+        self.frames = np.array(self.frames)
+        
+        
+    def test_round_trip(self):
+        for delta in DELTA_MODES:
+            for keyframe_interval in [1, 5, 100]:
+                data = encode_sequence(self.frames, delta, keyframe_interval)
+                header = read_sequence_header(data)
+                
+                self.assertEqual(header.n_frames, len(self.frames))
+                self.assertEqual((header.height, header.width, header.channels), self.frames.shape[1:])
+                self.assertEqual(header.delta, delta)
+                for workers in [1, 3]:
+                    self.assertTrue(np.array_equal(decode_sequence(data, workers=workers), self.frames),
+                                    f"Delta {delta}, keyframe interval {keyframe_interval}")
+                self.assertTrue(np.array_equal(np.array(list(iter_frames(data))), self.frames))
+                
+                
+    def test_random_access(self):
+        data = encode_sequence(self.frames, "sub", keyframe_interval=5)
+        
+        for i in [0, 4, 5, 7, 11]:
+            self.assertTrue(np.array_equal(decode_frame(data, i), self.frames[i]), f"Frame {i}")
+        for start, stop in [(3, 8), (5, 5), (6, 12)]:
+            self.assertTrue(np.array_equal(decode_sequence(data, start, stop), self.frames[start:stop]))
+            
+        with self.assertRaises(IndexError):
+            decode_frame(data, 12)
+        with self.assertRaises(ValueError):
+            decode_sequence(data, 5, 13)
+            
+            
+    def test_frame_is_qoi_file(self):
+        data = encode_sequence(self.frames, "xor", keyframe_interval=5)
+        header = read_sequence_header(data)
+        
+        self.assertTrue(header.is_keyframe(5))
+        self.assertTrue(np.array_equal(decode_to_array(get_frame_stream(data, header, 5)), self.frames[5]))
+        delta_frame = decode_to_array(get_frame_stream(data, header, 6))
+        self.assertTrue(np.array_equal(delta_frame, self.frames[6] ^ self.frames[5]))
+        
+        
+    def test_delta_is_smaller(self):
+        sizes = {delta: len(encode_sequence(self.frames, delta)) for delta in DELTA_MODES}
+        self.assertLess(sizes["xor"], sizes["none"] / 3)
+        self.assertLess(sizes["sub"], sizes["none"] / 3)
+        
+        
+    def test_writer(self):
+        rgba = np.concatenate([self.frames, np.full(self.frames.shape[:3] + (1,), 128, dtype=np.uint8)], axis=-1)
+        sink = io.BytesIO()
+        buffer = np.empty_like(rgba[0])
+        with SequenceWriter(sink, 50, 40, channels=4, keyframe_interval=4, strict=True) as writer:
+            for frame in rgba:
+                buffer[...] = frame  # capture into the same buffer
+                writer.add_frame(buffer)
+        self.assertEqual(writer.n_frames, len(rgba))
+        self.assertTrue(np.array_equal(decode_sequence(sink.getvalue(), strict=True), rgba))
+        
+        with self.assertRaises(ValueError):
+            writer.add_frame(buffer)
+        with self.assertRaises(ValueError):
+            SequenceWriter(io.BytesIO(), 50, 40).add_frame(rgba[0])
+            
+            
+    def test_not_container(self):
+        with self.assertRaises(ValueError):
+            read_sequence_header(b"qoif" + bytes(40))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import io
+import os
+from pathlib import Path
+import unittest
+import numpy as np
+from qoi_compress.qoi_decoder import decode_to_array
+from qoi_compress.qoi_encoder import encode_to_bytes
+from qoi_compress.streaming import encode_rows, iter_decode_rows
+from qoi_compress.numba_engine import NUMBA_AVAILABLE
+from qoi_compress.read_png import read_png_array
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+REFERENCE_DIR = BASE_DIR / "tests/reference_qoi"
+
+ENCODERS = ["python", "numpy", "pure", "numba"] if NUMBA_AVAILABLE else ["python", "numpy", "pure"]
+DECODERS = ["python", "pure", "numba"] if NUMBA_AVAILABLE else ["python", "pure"]
+
+
+class TestSpecConformance(unittest.TestCase):
+    """
+    Compare strict mode with reference .qoi files from tests/reference_qoi/,
+    encoded by the reference encoder (qoi.h algorithm, colorspace byte 0 - sRGB).
+    Source image of each file is tests/reference_qoi/<name>.png or png_images/<name>.png
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.images = {}
+        cls.reference = {}
+
+        for filename in sorted(os.listdir(REFERENCE_DIR)):
+            if Path(filename).suffix == ".qoi":
+                name = Path(filename).stem
+                png_filename = REFERENCE_DIR / f"{name}.png"
+                if not png_filename.exists():
+                    png_filename = BASE_DIR / f"png_images/{name}.png"
+                cls.images[name] = read_png_array(str(png_filename))
+                with open(REFERENCE_DIR / filename, 'rb') as file:
+                    cls.reference[name] = file.read()
+
+
+    def test_encoders(self):
+        for engine in ENCODERS:
+            for name, img in self.images.items():
+                self.assertEqual(encode_to_bytes(img, engine=engine, strict=True), self.reference[name],
+                                 f"Engine {engine} gives different qoi bytes for image {name}")
+
+
+    def test_decoders(self):
+        for engine in DECODERS:
+            for name, qoi_bytes in self.reference.items():
+                img_decoded = decode_to_array(qoi_bytes, engine=engine, strict=True)
+                self.assertTrue(np.array_equal(img_decoded, self.images[name]),
+                                f"Engine {engine} decoded image {name} incorrectly")
+
+
+    def test_streaming(self):
+        for name, img in self.images.items():
+            height, width, channels = img.shape
+            sink = io.BytesIO()
+            encode_rows((img[y:y + 5] for y in range(0, height, 5)), sink, width, height,
+                        channels=channels, strict=True)
+            self.assertEqual(sink.getvalue(), self.reference[name], f"Image {name}")
+
+            stream = io.BytesIO(self.reference[name])
+            img_decoded = np.concatenate(list(iter_decode_rows(stream, read_size=100, strict=True)))
+            self.assertTrue(np.array_equal(img_decoded, img), f"Image {name}")
+
+
+    def test_wraparound_and_black_index(self):
+        # 0 -> 255 and 255 -> 0 are small differences, black pixel is an index hit
+        img = np.array([[[255, 255, 255], [0, 0, 0], [7, 7, 7], [0, 0, 0]]], dtype=np.uint8)
+        expected = bytes([0b01010101,  # QOI_DIFF_SMALL, dr = dg = db = -1
+                          0b01111111,  # QOI_DIFF_SMALL, dr = dg = db = 1
+                          0b10100111, 0b10001000,  # QOI_DIFF_MED, dg = 7
+                          53])  # QOI_INDEX of (0, 0, 0, 255)
+        for engine in ENCODERS:
+            qoi_bytes = encode_to_bytes(img, engine=engine, strict=True)
+            self.assertEqual(qoi_bytes[14:-8], expected, f"Engine {engine}")
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import unittest
+from pathlib import Path
+import numpy as np
+from qoi_compress.stats import *
+from qoi_compress.stats import count_chunks
+from qoi_compress.qoi_encoder import encode_to_bytes, run_encoder
+from qoi_compress.qoi_decoder import run_decoder
+from qoi_compress.numba_engine import NUMBA_AVAILABLE
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+if not os.path.exists(BASE_DIR / "data"):
+    os.mkdir(BASE_DIR / "data")
+
+
+class TestStats(unittest.TestCase):
+    
+    def test_opcode_counts(self):
+        img = np.array([[[10, 20, 30], [10, 20, 30], [10, 20, 30], [11, 20, 29],    # RGB, RUN(2), DIFF_SMALL
+                         [10, 20, 30], [20, 25, 30], [200, 0, 7], [0, 0, 0]]],      # INDEX, DIFF_MED, RGB, RGB
+                       dtype=np.uint8)
+        stats = collect_stats(encode_to_bytes(img))
+        
+        self.assertEqual(stats.n_pixels, 8)
+        self.assertEqual(stats.opcode_counts, {"QOI_RUN": 1, "QOI_INDEX": 1, "QOI_DIFF_SMALL": 1, 
+                                               "QOI_DIFF_MED": 1, "QOI_RGB": 3, "QOI_RGBA": 0})
+        self.assertEqual(stats.opcode_bytes["QOI_RGB"], 12)
+        self.assertEqual(stats.opcode_bytes["QOI_DIFF_MED"], 2)
+        self.assertEqual(stats.run_lengths[2], 1)
+        self.assertEqual(stats.run_pixels, 2)
+        self.assertAlmostEqual(stats.index_hit_rate, 1 / 6)
+        
+        
+    def test_long_runs_and_rgba(self):
+        img = np.zeros((1, 200, 4), dtype=np.uint8)
+        img[0, 100:, 3] = 255
+        stats = collect_stats(encode_to_bytes(img))
+        
+        self.assertEqual(stats.n_pixels, 200)
+        self.assertEqual(stats.counts[RGBA], 1)
+        self.assertEqual(stats.run_lengths[62], 2)
+        self.assertEqual(stats.run_lengths[38] + stats.run_lengths[37], 2)
+        self.assertEqual(stats.run_pixels, 199)
+        self.assertEqual(int(stats.sizes.sum()), len(encode_to_bytes(img)) - 22)
+        
+        
+    @unittest.skipUnless(NUMBA_AVAILABLE, "numba is not installed")
+    def test_same_as_python_walk(self):
+        rng = np.random.default_rng(7)
+        img = (rng.integers(0, 3, size=(30, 40, 3)) * 3).astype(np.uint8)
+        qoi_bytes = encode_to_bytes(img)
+        
+        stats = collect_stats(qoi_bytes)
+        counts, sizes, run_lengths = np.zeros(6, np.int64), np.zeros(6, np.int64), np.zeros(63, np.int64)
+        n_pixels = count_chunks.py_func(memoryview(qoi_bytes), 14, len(qoi_bytes) - 8, counts, sizes, run_lengths)
+        
+        self.assertEqual(n_pixels, stats.n_pixels)
+        self.assertTrue(np.array_equal(counts, stats.counts))
+        self.assertTrue(np.array_equal(sizes, stats.sizes))
+        self.assertTrue(np.array_equal(run_lengths, stats.run_lengths))
+        
+        
+    def test_run_encoder_and_decoder(self):
+        png_filename = str(BASE_DIR / "png_images/doge.png")
+        qoi_filename = str(BASE_DIR / "data/doge_stats.qoi")
+        
+        encoder_stats = QoiStats()
+        run_encoder(png_filename, qoi_filename, stats=encoder_stats)
+        self.assertEqual(set(encoder_stats.timings), {"read_png", "encode", "write"})
+        self.assertEqual(encoder_stats.n_pixels, 463 * 464)
+        self.assertEqual(int(encoder_stats.sizes.sum()) + 22, os.path.getsize(qoi_filename))
+        
+        decoder_stats = QoiStats()
+        run_decoder(qoi_filename, stats=decoder_stats)
+        self.assertEqual(set(decoder_stats.timings), {"decode"})
+        self.assertEqual(decoder_stats.opcode_counts, encoder_stats.opcode_counts)
+        self.assertEqual(decoder_stats.to_dict()["n_pixels"], 463 * 464)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import io
+import unittest
+from pathlib import Path
+import numpy as np
+from qoi_compress.streaming import *
+from qoi_compress.qoi_encoder import encode_to_bytes
+from qoi_compress.numba_engine import NUMBA_AVAILABLE
+from qoi_compress.read_png import read_png_array
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+ENGINES = ["numpy", "numba"] if NUMBA_AVAILABLE else ["numpy"]
+
+
+class TestStreamEncoder(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        img = rng.integers(0, 4, size=(30, 25, 3)) * 60
+        img[3:9] = 0  # runs cross the rows boundaries
+        img[12:14, 5:] = 200
+        img[20:] = np.clip(img[20:] + rng.integers(-1, 2, size=(10, 25, 3)), 0, 255)
+        self.img = img.astype(np.uint8)
+        self.expected = encode_to_bytes(self.img, engine="python")
+        
+        
+    def test_same_as_encode_to_bytes(self):
+        for engine in ENGINES:
+            for rows_per_feed in [1, 2, 7, 30]:
+                sink = io.BytesIO()
+                n_bytes = encode_rows((self.img[y:y + rows_per_feed] for y in range(0, 30, rows_per_feed)),
+                                      sink, 25, 30, engine=engine)
+                
+                self.assertEqual(sink.getvalue(), self.expected, 
+                                 f"Engine {engine}, {rows_per_feed} rows per feed")
+                self.assertEqual(n_bytes, len(self.expected))
+                
+                
+    def test_bytes_are_written_incrementally(self):
+        sink = io.BytesIO()
+        encoder = StreamEncoder(sink, 25, 30)
+        self.assertEqual(len(sink.getvalue()), 14)
+        
+        encoder.feed_rows(self.img[:10])
+        self.assertGreater(len(sink.getvalue()), 14)
+        
+        for row in self.img[10:]:
+            encoder.feed_rows(row)
+        encoder.finish()
+        self.assertEqual(sink.getvalue(), self.expected)
+        
+        
+    def test_wrong_rows(self):
+        encoder = StreamEncoder(io.BytesIO(), 25, 30)
+        with self.assertRaises(ValueError):
+            encoder.feed_rows(np.zeros((2, 24, 3), dtype=np.uint8))
+        with self.assertRaises(ValueError):
+            encoder.feed_rows(np.zeros((31, 25, 3), dtype=np.uint8))
+        with self.assertRaises(ValueError):
+            encoder.finish()
+        with self.assertRaises(ValueError):
+            StreamEncoder(io.BytesIO(), 25, 30, engine="python")
+            
+            
+    def test_rgba(self):
+        img = np.concatenate([self.img, (self.img[:, :, :1] // 60) * 80], axis=2)
+        for engine in ENGINES:
+            sink = io.BytesIO()
+            encode_rows((img[y:y + 4] for y in range(0, 30, 4)), sink, 25, 30, engine=engine, channels=4)
+            self.assertEqual(sink.getvalue(), encode_to_bytes(img, engine="python"), f"Engine {engine}")
+            
+            img_decoded = np.concatenate(list(iter_decode_rows(io.BytesIO(sink.getvalue()), read_size=50)))
+            self.assertTrue(np.all(img_decoded == img))
+            
+            
+    def test_run_stream_encoder(self):
+        png_filename = str(BASE_DIR / "png_images/doge.png")
+        qoi_filename = str(BASE_DIR / "data/doge_stream.qoi")
+        run_stream_encoder(png_filename, qoi_filename, rows_per_feed=10)
+        
+        with open(qoi_filename, 'rb') as file:
+            self.assertEqual(file.read(), encode_to_bytes(read_png_array(png_filename)))
+
+
+    
+class TestStreamDecoder(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        img = rng.integers(0, 4, size=(40, 21, 3)) * 60
+        img[3:9] = 0
+        img[12:14, 5:] = 200
+        img[20:] = np.clip(img[20:] + rng.integers(-1, 2, size=(20, 21, 3)), 0, 255)
+        self.img = img.astype(np.uint8)
+        self.qoi_bytes = encode_to_bytes(self.img)
+        
+        
+    def test_feed(self):
+        engines = ["python", "numba"] if NUMBA_AVAILABLE else ["python"]
+        for engine in engines:
+            for portion in [1, 3, 10, 100, len(self.qoi_bytes)]:
+                for rows_per_block in [1, 5, 64]:
+                    decoder = StreamDecoder(rows_per_block=rows_per_block, engine=engine)
+                    decoded = [decoder.feed(self.qoi_bytes[i:i + portion]) 
+                               for i in range(0, len(self.qoi_bytes), portion)]
+                    
+                    self.assertTrue(decoder.finished)
+                    img_decoded = np.concatenate([rows for rows in decoded if rows.size])
+                    self.assertTrue(np.all(img_decoded == self.img), 
+                                    f"Engine {engine}, portion {portion}, {rows_per_block} rows per block")
+                    
+                    
+    def test_rows_before_the_end(self):
+        decoder = StreamDecoder()
+        rows = decoder.feed(self.qoi_bytes[:len(self.qoi_bytes) // 2])
+        self.assertGreater(len(rows), 0)
+        self.assertTrue(np.all(rows == self.img[:len(rows)]))
+        self.assertFalse(decoder.finished)
+        
+        
+    def test_iter_decode_rows(self):
+        stream = io.BytesIO(self.qoi_bytes)
+        img_decoded = np.concatenate(list(iter_decode_rows(stream, read_size=50)))
+        self.assertTrue(np.all(img_decoded == self.img))
+        
+        with self.assertRaises(ValueError):
+            list(iter_decode_rows(io.BytesIO(self.qoi_bytes[:-30])))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
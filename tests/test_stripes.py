@@ -0,0 +1,82 @@
+import unittest
+import numpy as np
+from qoi_compress.stripes import *
+from qoi_compress.qoi_decoder import decode_to_array
+
+
+class TestStripes(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        img = np.clip(128 + np.cumsum(rng.integers(-2, 3, size=(70, 33, 3)), axis=1), 0, 255)
+        img[30:40] = 17
+        self.img = img.astype(np.uint8)
+        
+    
+    def test_round_trip(self):
+        for stripe_height in [1, 16, 70, 100]:
+            for workers in [1, 3]:
+                data = encode_stripes(self.img, stripe_height=stripe_height, workers=workers)
+                header = read_stripes_header(data)
+                
+                self.assertEqual((header.height, header.width, header.channels), self.img.shape)
+                self.assertEqual(header.n_stripes, -(-70 // stripe_height))
+                self.assertTrue(np.all(decode_stripes(data, workers=workers) == self.img))
+                
+                
+    def test_stripe_is_qoi_file(self):
+        data = encode_stripes(self.img, stripe_height=16)
+        header = read_stripes_header(data)
+        
+        for i in range(header.n_stripes):
+            y0, y1 = header.stripe_rows(i)
+            stripe = decode_to_array(get_stripe(data, header, i))
+            self.assertTrue(np.all(stripe == self.img[y0:y1]))
+            
+            
+    def test_region(self):
+        data = encode_stripes(self.img, stripe_height=16)
+        
+        for y0, y1 in [(0, 1), (5, 20), (16, 32), (31, 70), (69, 70), (10, 10)]:
+            rows = decode_stripes(data, y0, y1)
+            self.assertTrue(np.all(rows == self.img[y0:y1]), f"Rows {y0}-{y1} decoded incorrectly")
+            
+        with self.assertRaises(ValueError):
+            decode_stripes(data, 10, 71)
+            
+            
+    def test_to_qoi(self):
+        data = encode_stripes(self.img, stripe_height=16)
+        self.assertTrue(np.all(decode_to_array(stripes_to_qoi(data)) == self.img))
+        
+        
+    def test_not_container(self):
+        with self.assertRaises(ValueError):
+            read_stripes_header(b"qoif" + bytes(40))
+            
+            
+    def test_invalid_stripe_height(self):
+        data = bytearray(encode_stripes(self.img, stripe_height=16))
+        stripe_height_pos = STRIPES_HEADER.size - 8
+        for stripe_height in [0, 15]:
+            data[stripe_height_pos:stripe_height_pos + 4] = stripe_height.to_bytes(4, 'big')
+            with self.assertRaises(ValueError):
+                decode_stripes(bytes(data))
+                
+                
+    def test_stripe_size_mismatch(self):
+        data = encode_stripes(self.img, stripe_height=16)
+        header = read_stripes_header(data)
+        
+        wide = bytearray(data)
+        wide[4:8] = (33 + 1).to_bytes(4, 'big')  # stripes are narrower than container
+        short = bytearray(data)
+        short[header.offsets[1] + 8:header.offsets[1] + 12] = (8).to_bytes(4, 'big')  # stripe 1 has 8 rows
+        for corrupted in [wide, short]:
+            with self.assertRaises(ValueError):
+                decode_stripes(bytes(corrupted))
+
+
+
+if __name__ == '__main__':
+    unittest.main()